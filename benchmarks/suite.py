@@ -0,0 +1,267 @@
+"""
+Scaling benchmarks of building, running, laying out and plotting graphs.
+
+Each benchmark is run over a grid of graph_k/graph_d (up to 10^6 nodes) for
+the basic_model and shape_changing_graph models, keeping the best of a few
+repeats. Results are written as JSON and can be compared to a baseline from
+an earlier run; the comparison fails when a benchmark got slower than the
+tolerance allows.
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --baseline bench.json --max-nodes 100000
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import platform
+import sys
+import time
+
+import matplotlib
+import networkx as nx
+import numpy as np
+
+from orga import nxe
+from orga import orga
+
+from examples import basic_model
+from examples import shape_changing_graph
+
+log = logging.getLogger(__name__)
+
+# (graph_k, graph_d) from tens to about a million nodes, wide and deep
+GRID = [
+    (3, 3), (3, 6), (3, 9), (3, 12), (3, 13),
+    (10, 3), (10, 4), (10, 5), (10, 6), (10, 7),
+    (2, 17), (2, 20),
+]
+
+MAX_NODES = 2 * 10 ** 6
+
+MODELS = {
+    'basic_model': basic_model.generate_employee,
+    'shape_changing_graph': shape_changing_graph.RandomChildrenModel,
+}
+
+# plot_hierarchy draws every node with networkx, so it stops at smaller
+# graphs (render, the persistent artists of plot_animation, does not)
+PLOT_MAX_NODES = 2000
+CYCLES = 3
+REPEATS = 3
+# each benchmark is repeated until it ran this long, keeping the best time
+MIN_SECONDS = 0.2
+TOLERANCE = 0.25
+# timings below this are too noisy to call regressions
+NOISE_FLOOR = 1e-3
+
+
+def bench_build(node_gen_fn, graph_k, graph_d):
+    """Seconds to create the hierarchy."""
+    start = time.perf_counter()
+    orga.create_hierarchy_graph(graph_k, graph_d, node_gen_fn)
+    return time.perf_counter() - start
+
+
+def bench_cycles(node_gen_fn, graph_k, graph_d):
+    """Seconds per engine cycle (work and feedback)."""
+    engine = orga.Engine(node_gen_fn, graph_k, graph_d, seed=0)
+    steps = iter(engine)
+    next(steps)  # builds the schedule
+    start = time.perf_counter()
+    for _ in zip(range(CYCLES), steps):
+        pass
+    return (time.perf_counter() - start) / CYCLES
+
+
+def bench_layout(node_gen_fn, graph_k, graph_d):
+    """Seconds to lay the hierarchy out."""
+    graph = orga.create_hierarchy_graph(graph_k, graph_d, node_gen_fn)
+    head = next(iter(graph.nodes))
+    start = time.perf_counter()
+    nxe.hierarchy_pos(graph, head)
+    return time.perf_counter() - start
+
+
+def bench_plot(node_gen_fn, graph_k, graph_d):
+    """Seconds to plot the hierarchy and render it with Agg."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from orga import orga_plots
+
+    engine = orga.Engine(node_gen_fn, graph_k, graph_d, seed=0)
+    fig = Figure(figsize=(8, 6))
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    start = time.perf_counter()
+    orga_plots.plot_hierarchy(ax, engine)
+    canvas.draw()
+    return time.perf_counter() - start
+
+
+def bench_render(node_gen_fn, graph_k, graph_d):
+    """Seconds to redraw the hierarchy after a cycle with HierarchyRenderer."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from orga import orga_plots
+
+    engine = orga.Engine(node_gen_fn, graph_k, graph_d, seed=0)
+    fig = Figure(figsize=(8, 6))
+    canvas = FigureCanvasAgg(fig)
+    renderer = orga_plots.HierarchyRenderer(fig.add_subplot(1, 1, 1), engine)
+    steps = iter(engine)
+    next(steps)
+    renderer.draw()
+    next(steps)
+    start = time.perf_counter()
+    renderer.draw()
+    canvas.draw()
+    return time.perf_counter() - start
+
+
+BENCHMARKS = {
+    'build': bench_build,
+    'cycles': bench_cycles,
+    'layout': bench_layout,
+    'plot': bench_plot,
+    'render': bench_render,
+}
+
+
+def measure(fn, args, repeats=REPEATS, min_seconds=MIN_SECONDS):
+    """Best of at least repeats calls of fn(*args) -> seconds, calling it
+    again until min_seconds were measured. The garbage collector is off
+    while measuring."""
+    times = []
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while len(times) < repeats or sum(times) < min_seconds:
+            times.append(fn(*args))
+    finally:
+        if enabled:
+            gc.enable()
+    return min(times)
+
+
+def nodes(graph_k, graph_d):
+    return sum(graph_k ** d for d in range(graph_d))
+
+
+def run(grid=GRID, models=None, benchmarks=None, max_nodes=MAX_NODES,
+        repeats=REPEATS, plot_max_nodes=PLOT_MAX_NODES,
+        min_seconds=MIN_SECONDS):
+    """Runs the benchmarks, returning a list of result dicts."""
+    models = models or list(MODELS)
+    benchmarks = benchmarks or list(BENCHMARKS)
+    results = []
+    for graph_k, graph_d in sorted(grid, key=lambda kd: nodes(*kd)):
+        n = nodes(graph_k, graph_d)
+        if n > max_nodes:
+            continue
+        for bench in benchmarks:
+            if bench == 'plot' and n > plot_max_nodes:
+                continue
+            for model in models:
+                seconds = measure(
+                    BENCHMARKS[bench], (MODELS[model], graph_k, graph_d),
+                    repeats, min_seconds)
+                result = {
+                    'benchmark': bench, 'model': model, 'graph_k': graph_k,
+                    'graph_d': graph_d, 'nodes': n, 'seconds': seconds,
+                    'nodes_per_second': n / seconds if seconds else float('inf'),
+                }
+                log.info('%(benchmark)s %(model)s k=%(graph_k)d d=%(graph_d)d '
+                         'nodes=%(nodes)d %(seconds).4fs', result)
+                results.append(result)
+    return results
+
+
+def environment():
+    return {
+        'date': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'networkx': nx.__version__,
+        'matplotlib': matplotlib.__version__,
+    }
+
+
+def key(result):
+    return (result['benchmark'], result['model'], result['graph_k'],
+            result['graph_d'])
+
+
+def compare(results, baseline, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR):
+    """Ratios of seconds to the baseline's for the benchmarks in both.
+
+    Returns (comparisons, regressions), each a list of dicts with the
+    result's key, seconds, baseline seconds and ratio; regressions are
+    those more than tolerance slower that took at least noise_floor
+    seconds.
+    """
+    before = {key(r): r for r in baseline}
+    comparisons = []
+    for result in results:
+        old = before.get(key(result))
+        if old is None:
+            continue
+        comparisons.append(dict(
+            result, baseline_seconds=old['seconds'],
+            ratio=result['seconds'] / old['seconds']))
+    regressions = [
+        c for c in comparisons
+        if c['ratio'] > 1 + tolerance and c['seconds'] >= noise_floor]
+    return comparisons, regressions
+
+
+def format_table(results):
+    lines = ['{:<8} {:<22} {:>4} {:>4} {:>9} {:>11} {:>13} {:>7}'.format(
+        'bench', 'model', 'k', 'd', 'nodes', 'seconds', 'nodes/s', 'ratio')]
+    for r in results:
+        ratio = r.get('ratio')
+        lines.append('{:<8} {:<22} {:>4} {:>4} {:>9} {:>11.5f} {:>13.0f} {:>7}'.format(
+            r['benchmark'], r['model'], r['graph_k'], r['graph_d'], r['nodes'],
+            r['seconds'], r['nodes_per_second'],
+            '' if ratio is None else '{:.2f}'.format(ratio)))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='allowed slow down before failing (0.2 is 20%%)')
+    parser.add_argument('--max-nodes', type=int, default=MAX_NODES)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--benchmark', action='append', choices=list(BENCHMARKS))
+    parser.add_argument('--model', action='append', choices=list(MODELS))
+    args = parser.parse_args(argv)
+
+    results = run(models=args.model, benchmarks=args.benchmark,
+                  max_nodes=args.max_nodes, repeats=args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f,
+                      indent=1)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        results, regressions = compare(results, baseline, args.tolerance)
+    print(format_table(results))
+    for r in regressions:
+        print('REGRESSION {} {} k={} d={}: {:.2f}x slower'.format(
+            r['benchmark'], r['model'], r['graph_k'], r['graph_d'], r['ratio']))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr, level=logging.INFO)
+    sys.exit(main())
@@ -7,11 +7,7 @@ import math
 import random
 import sys
 
-import matplotlib.pyplot as plt
-import numpy as np
-
 from orga.orga import Engine
-from orga.orga_plots import plot_hierarchy
 
 from examples import basic_model as model
 
@@ -29,6 +25,9 @@ def create_engine():
 
 
 def plot(eng):
+    import matplotlib.pyplot as plt
+    from orga.orga_plots import plot_hierarchy
+
     plt.figure(figsize=(16, 8))
     plt.tick_params(
         axis='both', left='off', top='off', right='off', bottom='off',
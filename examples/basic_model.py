@@ -15,7 +15,8 @@
 """
 
 import logging
-import random
+
+from orga import rng
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +28,8 @@ class Employee(object):
     if the employee has reportees          : WORK_RATE
     if the employee does not have reportees: MGMT_RATE * reportee.tribute
     """
+    __slots__ = ('name', 'tribute', 'perf')
+
     COLOR     = None
     WORK_RATE = None
     MGMT_RATE = None
@@ -73,11 +76,11 @@ def performance_review(reportee, peers, manager_perf):
     nodes higher up.
     """
     perf = (0.9 + 0.1 * manager_perf) * (reportee.tribute) / max(peers)
-    if random.random() > perf:
+    if rng.random() > perf:
         replacement = generate_employee(reportee.name)
-        # TODO: currently the graph cannot be modified during each iteration
-        # so have to change class like this. Next version will have modifiable
-        # graphs.
+        # Changes the class in place, keeping the node (and its tribute and
+        # perf) so the graph's structure is unchanged; models replacing the
+        # node itself use graph.journal.replace_node instead.
         reportee.__class__ = replacement.__class__
     #log.debug('{} perf: {:.2f} trib: {:.2f}'.format(reportee, perf, reportee.tribute))
     return perf
@@ -85,6 +88,8 @@ def performance_review(reportee, peers, manager_perf):
 
 class Ceo(Employee):
     """Does not really have an effect, just a placeholder for head of graph."""
+    __slots__ = ()
+
     COLOR     = 'gray'
     WORK_RATE = 0.0
     MGMT_RATE = 1
@@ -92,6 +97,8 @@ class Ceo(Employee):
 
 class Red(Employee):
     """Higher than normal management rate."""
+    __slots__ = ()
+
     COLOR     = 'r'
     WORK_RATE = 0.1
     MGMT_RATE = 1
@@ -99,6 +106,8 @@ class Red(Employee):
 
 class Gre(Employee):
     """Average everything."""
+    __slots__ = ()
+
     COLOR     = 'g'
     WORK_RATE =  0.1
     MGMT_RATE =  0.1
@@ -106,6 +115,8 @@ class Gre(Employee):
 
 class Blu(Employee):
     """Higher than normal work rate"""
+    __slots__ = ()
+
     COLOR     = 'b'
     WORK_RATE = 1.0
     MGMT_RATE = 0.1
@@ -116,5 +127,20 @@ def generate_employee(nid):
     if nid == 'a0':
         return Ceo('CEO')
     else:
-        return random.choice([Red, Gre, Blu])(nid)
+        return rng.choice([Red, Gre, Blu])(nid)
+
+
+def rate_table():
+    """The model as a table of rates for orga.vector.ArrayEngine."""
+    from orga.vector import RateTable
+    return RateTable.from_classes(
+        [Ceo, Red, Gre, Blu], replacements=[Red, Gre, Blu])
+
+
+def review(tributes, peer_max, manager_perf):
+    """Array version of performance_review for orga.vector.ArrayEngine.
+
+    Returns the performance only, the engine does the replacing.
+    """
+    return (0.9 + 0.1 * manager_perf) * tributes / peer_max
 
@@ -7,11 +7,8 @@ import math
 import random
 import sys
 
-import matplotlib.pyplot as plt
-import numpy as np
-
+from orga.convergence import TypesStable
 from orga.orga import Engine
-from orga.orga_plots import plot_hierarchy
 
 from examples import basic_model as model
 
@@ -34,6 +31,9 @@ def exponential_backoff(x):
 
 
 def plot(eng):
+    import matplotlib.pyplot as plt
+    from orga.orga_plots import plot_hierarchy
+
     plt.figure(figsize=(16, 8))
     ax = plt.subplot(111)
     plt.tick_params(
@@ -45,6 +45,8 @@ def plot(eng):
 
 
 def plot_income(income):
+    import matplotlib.pyplot as plt
+
     plt.figure(figsize=(16, 8))
     plt.plot(income, label='total income over time')
     plt.scatter(range(0, len(income)), income)
@@ -58,6 +60,8 @@ if __name__ == '__main__':
     random.seed(42)  # for debugging repeatability
 
     engine = create_engine()
+    # stop early once no one has been replaced for a while
+    engine.convergence = TypesStable(window=10)
     income = []
     for it, _ in zip(range(ITERATIONS), engine):
         income.append(engine.graphHead.tribute)
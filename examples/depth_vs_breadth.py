@@ -7,11 +7,8 @@ import math
 import random
 import sys
 
-import matplotlib.pyplot as plt
-import numpy as np
-
+from orga.montecarlo import run_samples
 from orga.orga import Engine
-from orga.orga_plots import plot_hierarchy
 
 from examples import basic_model as model
 
@@ -41,6 +38,9 @@ def ticks_off(ax):
 
 
 def plot(deep, wide):
+    import matplotlib.pyplot as plt
+    from orga.orga_plots import plot_hierarchy
+
     plt.figure(figsize=(16, 8))
     ax = plt.subplot(121)
     ticks_off(ax)
@@ -55,6 +55,8 @@ def plot(deep, wide):
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     logging.basicConfig(stream=sys.stdout, level=logging.INFO)
     random.seed(42)  # for debugging repeatability
 
@@ -63,30 +65,19 @@ if __name__ == '__main__':
     plot(deep, wide)
 
     log.info('averaging %d wide runs...' % SAMPLES)
-    wide_vals = np.zeros(ITERATIONS)
-    for _ in range(SAMPLES):
-        wide = create_wide_engine()
-        wide_vals += np.asarray([
-            wide.graphHead.tribute
-            for _ in zip(range(ITERATIONS), wide)
-        ])
+    wide_vals = run_samples(create_wide_engine, SAMPLES, ITERATIONS).mean
 
     log.info('averaging %d deep runs...' % SAMPLES)
-    deep_vals = np.zeros(ITERATIONS)
-    for _ in range(SAMPLES):
-        deep = create_deep_engine()
-        deep_vals += np.asarray([
-            deep.graphHead.tribute
-            for _ in zip(range(ITERATIONS), deep)
-        ])
+    deep_vals = run_samples(create_deep_engine, SAMPLES, ITERATIONS).mean
 
+    for _ in zip(range(ITERATIONS), deep, wide): pass
     plot(deep, wide)
 
     plt.figure(figsize=(16, 8))
     ax = plt.subplot(111)
     ticks_off(ax)
-    ax.plot(wide_vals/SAMPLES, label='wide hierarchy performance')
-    ax.plot(deep_vals/SAMPLES, label='deep hierarchy performance')
+    ax.plot(wide_vals, label='wide hierarchy performance')
+    ax.plot(deep_vals, label='deep hierarchy performance')
     plt.legend()
     plt.show()
 
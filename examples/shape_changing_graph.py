@@ -8,11 +8,8 @@ import random
 import string
 import sys
 
-import matplotlib.pyplot as plt
-import numpy as np
-
+from orga import rng
 from orga.orga import Engine
-from orga.orga_plots import plot_hierarchy
 
 
 GRAPH_D = 3
@@ -33,14 +30,13 @@ class RandomChildrenModel(object):
         pass
 
     def feedback(self, reportees, graph):
-        r = random.random()
+        r = rng.random()
         if r < 0.1:
           to_add = RandomChildrenModel()
-          graph.add_node(to_add)
-          graph.add_edge(self, to_add)
+          graph.journal.add_edge(self, to_add)
         elif r < 0.15 and reportees:
-          to_remove = random.choice(list(reportees))
-          graph.remove_node(to_remove)
+          to_remove = rng.choice(list(reportees))
+          graph.journal.remove_node(to_remove)
 
     def color(self):
         return 'k'
@@ -54,6 +50,9 @@ def create_engine():
 
 
 def plot(eng):
+    import matplotlib.pyplot as plt
+    from orga.orga_plots import plot_hierarchy
+
     plt.figure(figsize=(16, 8))
     plt.tick_params(
         axis='both', left='off', top='off', right='off', bottom='off',
@@ -0,0 +1,228 @@
+"""
+Stepping engines from asyncio.
+
+An engine's cycles run in a thread (or a process of its own) so an event
+loop following simulations is never blocked by a long cycle. After each
+cycle a snapshot of the engine (by default a small dict, see snapshot) is
+taken where the engine runs and handed to the loop.
+
+Consumers pull snapshots: an engine is only stepped again once its last
+snapshot was taken from the (bounded) buffer, so a slow consumer slows the
+simulations down rather than piling up snapshots, and 'interval' limits how
+often each engine is stepped.
+
+    async for snap in engine:  # see Engine.__aiter__
+        ...
+
+    scheduler = Scheduler(workers=4)
+    for seed in range(24):
+        scheduler.add(functools.partial(Engine, generate_employee, seed=seed))
+    async for name, snap in scheduler:
+        ...
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+
+log = logging.getLogger(__name__)
+
+
+def snapshot(engine):
+    """Default snapshot: iteration, head tribute, node count, converged."""
+    return {
+        'iteration': engine.iteration,
+        'head_tribute': engine.graphHead.tribute,
+        'nodes': len(engine.graph),
+        'converged': engine.converged,
+    }
+
+
+class _Stepper(object):
+    """Steps an engine, or one made by a factory on the first step."""
+
+    def __init__(self, engine, iterations, snapshot):
+        self.engine = engine
+        self.iterations = iterations
+        self.snapshot = snapshot
+        self._steps = None
+
+    def step(self):
+        """(True, snapshot) after the next cycle, (False, None) when done."""
+        if self._steps is None:
+            if not hasattr(self.engine, 'graphHead'):
+                self.engine = self.engine()
+            self._steps = iter(self.engine)
+            if self.iterations is not None:
+                self._steps = zip(range(self.iterations), self._steps)
+        for _ in self._steps:
+            return True, self.snapshot(self.engine)
+        return False, None
+
+    def close(self):
+        pass
+
+
+class _ProcessStepper(object):
+    """Steps an engine made by a factory in a process of its own."""
+
+    def __init__(self, factory, iterations, snapshot):
+        self._conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(child, _Stepper(factory, iterations, snapshot)),
+            daemon=True)
+        self.process.start()
+        child.close()
+
+    def step(self):
+        self._conn.send(True)
+        found, value = self._conn.recv()
+        if isinstance(value, Exception):
+            raise value
+        return found, value
+
+    def close(self):
+        try:
+            self._conn.send(False)
+        except OSError:
+            pass
+        self._conn.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def _serve(conn, stepper):
+    """Main of an engine's process: steps it on request."""
+    try:
+        while conn.recv():
+            try:
+                conn.send(stepper.step())
+            except Exception as e:
+                conn.send((False, e))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+
+async def iterate(engine, iterations=None, snapshot=snapshot, executor=None,
+                  interval=0):
+    """Async iterator of snapshots of the engine after each cycle.
+
+    The cycles run in executor (the loop's default one if None) and are
+    only run as the snapshots are consumed, at most one per interval
+    seconds.
+    """
+    loop = asyncio.get_running_loop()
+    stepper = _Stepper(engine, iterations, snapshot)
+    last = None
+    while True:
+        if interval and last is not None:
+            await asyncio.sleep(last + interval - loop.time())
+        last = loop.time()
+        found, snap = await loop.run_in_executor(executor, stepper.step)
+        if not found:
+            return
+        yield snap
+
+
+class _Done(object):
+    def __init__(self, error=None):
+        self.error = error
+
+
+class Scheduler(object):
+    """Steps many engines concurrently, merging their snapshots.
+
+    args:
+        workers: engines stepped at the same time, None for the number of
+            cores
+        processes: run each engine in a process of its own (engines must
+            then be given as picklable factories), at most workers processes
+            at a time, otherwise in threads
+        buffer: snapshots waiting for the consumer before engines pause
+        interval: minimum seconds between the cycles of an engine
+    """
+
+    def __init__(self, workers=None, processes=False, buffer=16, interval=0):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.processes = processes
+        self.buffer = buffer
+        self.interval = interval
+        self._engines = []
+
+    def add(self, engine, iterations=None, name=None, snapshot=snapshot):
+        """Adds an engine (or a function making one) to run.
+
+        Snapshots are tagged with name, by default the order it was added.
+        """
+        if self.processes and hasattr(engine, 'graphHead'):
+            raise TypeError('processes need an engine factory, not an engine')
+        if name is None:
+            name = len(self._engines)
+        self._engines.append((name, engine, iterations, snapshot))
+        return name
+
+    def __aiter__(self):
+        return self.stream()
+
+    async def stream(self):
+        """Async iterator of (name, snapshot) until every engine is done."""
+        queue = asyncio.Queue(self.buffer)
+        executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+        stepper = _ProcessStepper if self.processes else _Stepper
+        # a process lives as long as its engine runs, so is started only
+        # once a slot is free; threads are bounded by the executor
+        slots = asyncio.Semaphore(self.workers) if self.processes else None
+        tasks = [
+            asyncio.ensure_future(self._produce(
+                name, functools.partial(stepper, engine, iterations, snap),
+                executor, queue, slots))
+            for name, engine, iterations, snap in self._engines]
+        running = len(tasks)
+        try:
+            while running:
+                name, item = await queue.get()
+                if isinstance(item, _Done):
+                    running -= 1
+                    if item.error is not None:
+                        raise item.error
+                else:
+                    yield name, item
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False)
+
+    async def _produce(self, name, make_stepper, executor, queue, slots):
+        done = _Done()
+        try:
+            if slots is None:
+                await self._run(name, make_stepper(), executor, queue)
+            else:
+                async with slots:
+                    await self._run(name, make_stepper(), executor, queue)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.debug('engine %s failed', name, exc_info=True)
+            done = _Done(e)
+        await queue.put((name, done))
+
+    async def _run(self, name, stepper, executor, queue):
+        loop = asyncio.get_running_loop()
+        last = None
+        try:
+            while True:
+                if self.interval and last is not None:
+                    await asyncio.sleep(last + self.interval - loop.time())
+                last = loop.time()
+                found, snap = await loop.run_in_executor(executor, stepper.step)
+                if not found:
+                    break
+                await queue.put((name, snap))
+        finally:
+            await loop.run_in_executor(None, stepper.close)
@@ -0,0 +1,225 @@
+"""
+Saves and restores the state of an Engine as arrays.
+
+A checkpoint is an .npz file holding the tree in the graph's node order (the
+number of children of each node and the flat indices of the children, in
+the graph's child order), a type code per node with the list of types, the
+names, tribute and perf of the nodes, and the engine's iteration and random
+stream. A restored engine continues the run exactly as the saved one would.
+
+Nodes are rebuilt without calling their __init__: only their class (or
+compact type), name, tribute and perf are kept. Convergence criteria are not
+saved, pass them again when restoring.
+
+Arrays of an .npz are only read when used, so a Checkpoint can be opened to
+eg look at its iteration cheaply, and a warmed up run can be forked into
+many engines (Checkpoint.fork) without simulating it again.
+"""
+
+import importlib
+import itertools
+import json
+import logging
+import math
+
+import numpy as np
+
+from orga import compact
+from orga import orga
+from orga import rng
+
+log = logging.getLogger(__name__)
+
+FORMAT = 1
+
+
+def save(engine, path, compressed=False):
+    """Write the engine's state to path (a file name or file object)."""
+    graph = engine.graph
+    order = list(graph.nodes)
+    n = len(order)
+    index = dict(zip(order, range(n)))
+    # the raw adjacency dicts, the views cost a call per node
+    succ = getattr(graph, '_succ', graph.adj)
+    adj = list(map(succ.__getitem__, order))
+    n_children = np.fromiter(map(len, adj), np.int32, n)
+    arrays = {
+        'n_children': n_children,
+        'children': np.fromiter(
+            map(index.__getitem__, itertools.chain.from_iterable(adj)),
+            np.int32, int(n_children.sum())),
+    }
+    if isinstance(engine.graphHead, compact.CompactNode):
+        kind, type_names = 'compact', _compact_arrays(order, arrays)
+    else:
+        kind, type_names = 'object', _object_arrays(order, arrays)
+
+    state = engine.rng.state()
+    arrays['uniforms'] = np.array(state.pop('uniforms'), dtype=np.float64)
+    meta = {
+        'format': FORMAT,
+        'kind': kind,
+        'name': graph.name,
+        'nodes': n,
+        'head': index[engine.graphHead],
+        'type_names': type_names,
+        'iteration': engine.iteration,
+        'converged': engine.converged,
+        'feedback_due': engine.feedback_due,
+        'rng': state,
+    }
+    arrays['meta'] = np.array(json.dumps(meta))
+    (np.savez_compressed if compressed else np.savez)(path, **arrays)
+    log.debug('saved %d nodes at iteration %d', n, engine.iteration)
+
+
+def _compact_arrays(order, arrays):
+    store = order[0].store
+    idx = np.fromiter(order, np.int64, len(order))
+    arrays['types'] = np.frombuffer(store.types, np.int8)[idx]
+    arrays['tribute'] = np.frombuffer(store.tribute, np.float64)[idx]
+    arrays['perf'] = np.frombuffer(store.perf, np.float64)[idx]
+    if store.names is not None:
+        arrays['names'] = np.array([store.names[i] for i in idx.tolist()])
+    return list(store.table.names)
+
+
+def _object_arrays(order, arrays):
+    n = len(order)
+    classes = {}
+    arrays['types'] = np.fromiter(
+        (classes.setdefault(orga.node_type(node), len(classes)) for node in order),
+        np.int16, n)
+    names = [getattr(node, 'name', None) for node in order]
+    if all(isinstance(name, str) for name in names):
+        arrays['names'] = np.array(names)
+    arrays['tribute'] = np.fromiter(
+        (getattr(node, 'tribute', math.nan) for node in order), np.float64, n)
+    arrays['perf'] = np.fromiter(
+        (getattr(node, 'perf', math.nan) for node in order), np.float64, n)
+    return ['{}:{}'.format(c.__module__, c.__qualname__) for c in classes]
+
+
+def load(path, **kwargs):
+    """Engine restored from path, see Checkpoint.engine for the args."""
+    with Checkpoint(path) as checkpoint:
+        return checkpoint.engine(**kwargs)
+
+
+class Checkpoint(object):
+    """A saved engine state, read lazily.
+
+    args:
+        path: file name or file object written by save
+    """
+
+    def __init__(self, path):
+        self._file = np.load(path)
+        self.meta = json.loads(str(self._file['meta']))
+        if self.meta['format'] != FORMAT:
+            raise ValueError(
+                'unsupported checkpoint format {}'.format(self.meta['format']))
+        self.iteration = self.meta['iteration']
+
+    def __len__(self):
+        return self.meta['nodes']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def graph(self, table=None, review_fn=None, graph_cls=None):
+        """The saved tree as a new graph_cls (with from_children) and its
+        head.
+
+        Compact checkpoints need the RateTable and review function of a new
+        NodeStore (see orga.compact) the nodes are created in.
+        """
+        if graph_cls is None:
+            from orga import tree
+            graph_cls = tree.Tree
+        if self.meta['kind'] == 'compact':
+            if table is None or review_fn is None:
+                raise ValueError('compact checkpoints need table and review_fn')
+            nodes = self._compact_nodes(table, review_fn)
+        else:
+            nodes = self._object_nodes()
+
+        f = self._file
+        graph = graph_cls.from_children(
+            nodes, f['n_children'].tolist(), f['children'].tolist(),
+            name=self.meta['name'])
+        return graph, nodes[self.meta['head']]
+
+    def _object_nodes(self):
+        f = self._file
+        classes = [resolve(name) for name in self.meta['type_names']]
+        nodes = [
+            cls.__new__(cls)
+            for cls in map(classes.__getitem__, f['types'].tolist())]
+        if 'names' in f:
+            for node, name in zip(nodes, f['names'].tolist()):
+                node.name = name
+        for attr in ('tribute', 'perf'):
+            for node, value in zip(nodes, f[attr].tolist()):
+                if not math.isnan(value):
+                    setattr(node, attr, value)
+        return nodes
+
+    def _compact_nodes(self, table, review_fn):
+        f = self._file
+        codes = np.array(
+            [table.code(name) for name in self.meta['type_names']], np.int8)
+        store = compact.NodeStore(table, review_fn, names='names' in f)
+        store.types.frombytes(codes[f['types']].tobytes())
+        store.tribute.frombytes(f['tribute'].astype(np.float64).tobytes())
+        store.perf.frombytes(f['perf'].astype(np.float64).tobytes())
+        if store.names is not None:
+            store.names.extend(f['names'].tolist())
+        return list(map(store.node_class, range(len(store))))
+
+    def stream(self):
+        """The saved random stream of the engine."""
+        state = dict(self.meta['rng'], uniforms=self._file['uniforms'].tolist())
+        return rng.Stream.from_state(state)
+
+    def engine(self, seed=None, table=None, review_fn=None,
+               graph_cls=None, **kwargs):
+        """The saved engine, continuing where it was saved.
+
+        args:
+            seed: seed (or orga.rng.Stream) of a new random stream, by
+                default the saved stream is continued
+            table, review_fn: for compact checkpoints, see graph
+            graph_cls: class of the restored graph, eg
+                orga.native.NativeTree (default orga.tree.Tree)
+            kwargs: other orga.Engine.from_graph args (eg convergence)
+        """
+        graph, head = self.graph(table, review_fn, graph_cls)
+        engine = orga.Engine.from_graph(
+            graph, head, self.stream() if seed is None else seed, **kwargs)
+        engine.iteration = self.iteration
+        engine.converged = self.meta['converged']
+        engine.feedback_due = self.meta['feedback_due']
+        return engine
+
+    def fork(self, n, **kwargs):
+        """n engines starting from the saved state with independent streams
+        spawned from the saved one."""
+        return [
+            self.engine(seed=stream, **kwargs)
+            for stream in self.stream().spawn(n)]
+
+
+def resolve(name):
+    """The object named 'module:qualname'."""
+    module, qualname = name.split(':')
+    obj = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj
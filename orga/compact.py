@@ -0,0 +1,147 @@
+"""
+Compact nodes for rate table models.
+
+Instead of one Python object with its own __dict__ per employee the state of
+every node lives in a NodeStore (struct of arrays: type code, tribute, perf)
+and the nodes in the graph are flyweights that are nothing but their index
+into it (an int subclass without a __dict__, with the store on its class).
+Behaviour comes from the store's RateTable (see orga.vector) so a type
+change is an integer write rather than a __class__ swap.
+
+As nodes are ints they compare equal to the same index of another store, so
+a graph should only hold nodes of one store.
+
+The nodes behave like examples/basic_model.py's employees and draw from the
+engine's random stream in the same order, so an Engine of compact nodes
+follows the same trajectory as one of employees for the same seed.
+"""
+
+import array
+
+from orga import rng
+
+
+class NodeStore(object):
+    """Struct of arrays holding the state of CompactNodes.
+
+    args:
+        table: RateTable of the node types (orga.vector)
+        review_fn: performance review of one node,
+            review_fn(tribute, peer_max, manager_perf) -> perf
+        names: keep the names nodes are created with, otherwise a node's
+            name is its index
+    """
+
+    def __init__(self, table, review_fn, names=True):
+        self.node_class = type(
+            'CompactNode', (CompactNode,), {'__slots__': (), 'store': self})
+        self.table = table
+        self.review_fn = review_fn
+        # plain lists as per node Python access is faster than NumPy's
+        self.work_rate = table.work_rate.tolist()
+        self.mgmt_rate = table.mgmt_rate.tolist()
+        self.replacements = table.replacements.tolist()
+
+        self.names = [] if names else None
+        self.types = array.array('b')
+        self.tribute = array.array('d')
+        self.perf = array.array('d')
+
+    def __len__(self):
+        return len(self.types)
+
+    def new_node(self, name):
+        """node_gen_fn for Engine: the first node created is the head."""
+        if not self.types:
+            code = self.table.head
+        else:
+            code = rng.choice(self.replacements)
+        if self.names is not None:
+            self.names.append(name)
+        self.types.append(code)
+        self.tribute.append(0)
+        self.perf.append(1)
+        return self.node_class(len(self.types) - 1)
+
+    def name(self, index):
+        if self.names is None:
+            return str(index)
+        return self.names[index]
+
+    def type_names(self):
+        names = self.table.names
+        return [names[t] for t in self.types]
+
+    def colors(self):
+        """Colour of every node, by index."""
+        colors = self.table.colors
+        return [colors[t] for t in self.types]
+
+
+class CompactNode(int):
+    """Flyweight view of one node of a NodeStore: its index."""
+    __slots__ = ()
+    store = None
+
+    @property
+    def name(self):
+        return self.store.name(self)
+
+    @property
+    def type(self):
+        return self.store.types[self]
+
+    @type.setter
+    def type(self, code):
+        self.store.types[self] = code
+
+    @property
+    def type_name(self):
+        return self.store.table.names[self.store.types[self]]
+
+    @property
+    def tribute(self):
+        return self.store.tribute[self]
+
+    @tribute.setter
+    def tribute(self, value):
+        self.store.tribute[self] = value
+
+    @property
+    def perf(self):
+        return self.store.perf[self]
+
+    @perf.setter
+    def perf(self, value):
+        self.store.perf[self] = value
+
+    def do_work(self, reportees):
+        store = self.store
+        if reportees:
+            reportees_work = sum(store.tribute[n] for n in reportees)
+            store.tribute[self] = store.mgmt_rate[store.types[self]] * reportees_work
+        else:
+            store.tribute[self] = store.work_rate[store.types[self]]
+
+    def feedback(self, reportees, graph):
+        if reportees:
+            store = self.store
+            tribute, perf, types = store.tribute, store.perf, store.types
+            peer_max = max(tribute[n] for n in reportees)
+            manager_perf = perf[self]
+            for reportee in reportees:
+                perf[reportee] = p = store.review_fn(
+                    tribute[reportee], peer_max, manager_perf)
+                if rng.random() > p:
+                    types[reportee] = rng.choice(store.replacements)
+
+    def color(self):
+        return self.store.table.colors[self.type]
+
+    def alpha(self):
+        return 1
+
+    def __str__(self):
+        return '<{}({})>'.format(self.name, self.color())
+
+    __repr__ = __str__
@@ -0,0 +1,93 @@
+"""
+Convergence criteria for Engine.
+
+A criterion is updated by the engine once per iteration, after the work
+cycle, and returns True once the run has converged. Each keeps its own
+running state so no criterion rescans the graph.
+"""
+
+import collections
+import operator
+
+
+def head_tribute(engine):
+    return engine.graphHead.tribute
+
+
+class TributeStable(object):
+    """The head tribute stayed within tolerance over the last window cycles.
+
+    The window's min and max are kept in monotonic queues so each update is
+    O(1) amortised.
+    """
+    needs_changes = False
+
+    def __init__(self, tolerance=1e-9, window=10, observe=head_tribute):
+        self.tolerance = tolerance
+        self.window = window
+        self.observe = observe
+        self._count = 0
+        self._min = collections.deque()
+        self._max = collections.deque()
+
+    def update(self, engine):
+        value = self.observe(engine)
+        i = self._count
+        self._count += 1
+        for queue, dominates in ((self._min, operator.le), (self._max, operator.ge)):
+            while queue and dominates(value, queue[-1][1]):
+                queue.pop()
+            queue.append((i, value))
+            if queue[0][0] <= i - self.window:
+                queue.popleft()
+        return (self._count >= self.window and
+                self._max[0][1] - self._min[0][1] <= self.tolerance)
+
+
+class TypesStable(object):
+    """No node changed type (or structure) for window feedback cycles.
+
+    Relies on the engine counting the changes made in each feedback cycle.
+    """
+    needs_changes = True
+
+    def __init__(self, window=10):
+        self.window = window
+        self._stable = 0
+
+    def update(self, engine):
+        if engine.changes is None or engine.changes:
+            self._stable = 0
+        else:
+            self._stable += 1
+        return self._stable >= self.window
+
+
+class Predicate(object):
+    """A user function of the engine."""
+    needs_changes = False
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def update(self, engine):
+        return bool(self.fn(engine))
+
+
+class AnyOf(object):
+    """Converged as soon as any of the criteria has."""
+
+    def __init__(self, *criteria):
+        self.criteria = criteria
+        self.needs_changes = any(c.needs_changes for c in criteria)
+
+    def update(self, engine):
+        # update all of them so each keeps its running state
+        return any([c.update(engine) for c in self.criteria])
+
+
+class AllOf(AnyOf):
+    """Converged once all of the criteria have."""
+
+    def update(self, engine):
+        return all([c.update(engine) for c in self.criteria])
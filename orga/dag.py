@@ -0,0 +1,362 @@
+"""
+Organisations where a node can have more than one manager (matrix orgs,
+dotted line reporting), as a directed acyclic graph.
+
+A Dag keeps the level of every node, the longest path to it from a node
+without managers, so every manager is on a lower level than its reportees.
+Levels are updated as edges change, visiting each node whose level changed
+once, and the engine's schedule is the nodes level by level: each node is
+worked on and gives feedback exactly once per cycle however many managers
+it has. Changes made by feedback are patched into the rest of the
+cycle's schedule by the nodes whose level changed (see LevelSchedule.patch).
+
+    graph = dag.Dag(orga.create_hierarchy_graph(3, 4, generate_employee))
+    graph.add_edge(manager, shared_reportee)
+    engine = orga.Engine.from_graph(graph)
+"""
+
+import bisect
+import heapq
+import itertools
+
+import networkx as nx
+
+from orga import tree
+
+
+class Dag(tree.Tree):
+    """A Tree whose nodes may have several managers.
+
+    Adding an edge that would make a cycle raises ValueError (and the
+    graph is left as it was). Removing a subtree removes the reportees that
+    are left without a manager, nodes with other managers stay.
+    """
+
+    # edge batches larger than this fraction of the nodes recompute all the
+    # levels in one pass rather than updating them edge by edge
+    BULK_FRACTION = 0.25
+
+    def __init__(self, *args, **kwargs):
+        self._level = {}
+        self._buckets = []
+        # old level (None if new) of the nodes added, moved or removed since
+        # the last LevelSchedule, by last move; None after a full recompute
+        self._moved = None
+        self._moved_since = None
+        super().__init__(*args, **kwargs)
+
+    def level(self, node):
+        return self._level[node]
+
+    def levels(self):
+        """Nodes of each level, managers first."""
+        return [list(b) for b in self._buckets if b]
+
+    def schedule(self, root=None):
+        """Cached LevelSchedule of the whole graph (root is not used)."""
+        schedule = self._schedules.get(None)
+        if schedule is None:
+            schedule = self._schedules[None] = LevelSchedule(self)
+        return schedule
+
+    def work_order(self, nodes):
+        """The nodes in the graph and all their managers, deepest first."""
+        pred = self._pred
+        seen = set()
+        stack = [n for n in nodes if n in self]
+        while stack:
+            n = stack.pop()
+            if n not in seen:
+                seen.add(n)
+                stack.extend(pred[n])
+        level = self._level
+        return sorted(seen, key=level.__getitem__, reverse=True)
+
+    def _moving(self, node, old):
+        moved = self._moved
+        if moved is not None:
+            moved[node] = moved.pop(node, old)
+
+    def _set_level(self, node, level):
+        old = self._level.get(node)
+        self._moving(node, old)
+        if old is not None:
+            del self._buckets[old][node]
+        while len(self._buckets) <= level:
+            self._buckets.append({})
+        self._buckets[level][node] = None
+        self._level[node] = level
+
+    def _add_levels(self, nodes):
+        for node in nodes:
+            if node not in self._level:
+                self._set_level(node, 0)
+
+    def _raise_levels(self, u, v):
+        """Levels below v after adding the edge u, v.
+
+        Returns the (node, old level) changed, raises ValueError with the
+        levels restored if the edge makes a cycle.
+        """
+        level, pred = self._level, self._pred
+        changed = []
+        for node, queue in self._in_level_order((v,)):
+            new = max(level[p] + 1 for p in pred[node])
+            if new <= level[node]:
+                continue
+            changed.append((node, level[node]))
+            self._set_level(node, new)
+            if u in self._succ[node]:
+                self._restore(changed)
+                raise ValueError('edge {} -> {} makes a cycle'.format(u, v))
+            queue(self._succ[node])
+        return changed
+
+    def _restore(self, changed):
+        for node, old in reversed(changed):
+            self._set_level(node, old)
+
+    def _lower_levels(self, nodes):
+        """Updates the levels below nodes that may have lost a manager."""
+        level, pred = self._level, self._pred
+        nodes = [n for n in nodes if n in self]
+        for node, queue in self._in_level_order(nodes):
+            new = max((level[p] + 1 for p in pred[node]), default=0)
+            if new < level[node]:
+                self._set_level(node, new)
+                queue(self._succ[node])
+
+    def _in_level_order(self, nodes):
+        """Yields nodes, and the nodes queued, by level before the change.
+
+        Yields (node, queue) where queue(nodes) adds reportees of node.
+        Every manager of a node is on a lower level, so each node comes
+        after all of its queued managers and settles when it is visited.
+        """
+        heap, queued = [], set()
+        order = itertools.count()
+
+        def queue(nodes):
+            for node in nodes:
+                if node not in queued:
+                    queued.add(node)
+                    item = self._level[node], next(order), node
+                    heapq.heappush(heap, item)
+
+        queue(nodes)
+        while heap:
+            yield heapq.heappop(heap)[2], queue
+
+    def _compute_levels(self):
+        """All the levels in one topological pass."""
+        indegree = {n: len(p) for n, p in self._pred.items()}
+        frontier = [n for n, d in indegree.items() if d == 0]
+        self._level = {}
+        self._buckets = []
+        self._moved = None
+        level = 0
+        while frontier:
+            next_frontier = []
+            for node in frontier:
+                self._set_level(node, level)
+                for child in self._succ[node]:
+                    indegree[child] -= 1
+                    if not indegree[child]:
+                        next_frontier.append(child)
+            frontier = next_frontier
+            level += 1
+        return len(self._level) == len(self)
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._add_levels((node_for_adding,))
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes = list(nodes_for_adding)
+        super().add_nodes_from(nodes, **attr)
+        self._add_levels(n[0] if isinstance(n, tuple) else n for n in nodes)
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        new = v_of_edge not in self._succ.get(u_of_edge, ())
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._add_levels((u_of_edge, v_of_edge))
+        if new:
+            try:
+                self._raise_levels(u_of_edge, v_of_edge)
+            except ValueError:
+                tree.Tree.remove_edge(self, u_of_edge, v_of_edge)
+                raise
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        edges = [
+            e for e in ebunch_to_add
+            if e[1] not in self._succ.get(e[0], ())]
+        super().add_edges_from(edges, **attr)
+        self._add_levels(n for e in edges for n in e[:2])
+        if len(edges) > self.BULK_FRACTION * len(self):
+            if not self._compute_levels():
+                tree.Tree.remove_edges_from(self, [e[:2] for e in edges])
+                self._compute_levels()
+                raise ValueError('edges make a cycle')
+            return
+        for i, (u, v) in enumerate(e[:2] for e in edges):
+            try:
+                self._raise_levels(u, v)
+            except ValueError:
+                tree.Tree.remove_edges_from(self, [e[:2] for e in edges[i:]])
+                raise
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._lower_levels((v,))
+
+    def remove_edges_from(self, ebunch):
+        edges = [e[:2] for e in ebunch]
+        super().remove_edges_from(edges)
+        self._lower_levels(v for _, v in edges)
+
+    def remove_subtrees(self, nodes):
+        """Removes the nodes and the reportees left without a manager."""
+        succ, pred = self._succ, self._pred
+        removed = list(dict.fromkeys(n for n in nodes if n in self))
+        seen = set(removed)
+        for n in removed:
+            for child in succ[n]:
+                if child not in seen and all(p in seen for p in pred[child]):
+                    seen.add(child)
+                    removed.append(child)
+        self.remove_nodes_from(removed)
+
+    def remove_nodes_from(self, nodes):
+        # kept in order (not sets) so levels change the same way every run
+        nodes = list(dict.fromkeys(n for n in nodes if n in self))
+        removed = set(nodes)
+        managers = [p for n in nodes for p in self._pred[n] if p not in removed]
+        reportees = list(dict.fromkeys(
+            c for n in nodes for c in self._succ[n] if c not in removed))
+        nx.DiGraph.remove_nodes_from(self, nodes)
+        self._changed(managers)
+        for node in nodes:
+            level = self._level.pop(node)
+            self._moving(node, level)
+            del self._buckets[level][node]
+        self._lower_levels(reportees)
+
+    def replace_node(self, old, new):
+        """Puts new in the place of old, keeping its managers, reportees and
+        its position among each manager's reportees."""
+        managers = list(self._pred[old])
+        self._node[new] = self._node.pop(old)
+        self._succ[new] = children = self._succ.pop(old)
+        self._pred[new] = self._pred.pop(old)
+        for child in children:
+            pred = self._pred[child]
+            pred[new] = pred.pop(old)
+        for manager in managers:
+            siblings = self._succ[manager]
+            items = list(siblings.items())
+            siblings.clear()
+            siblings.update((new if n == old else n, d) for n, d in items)
+        level = self._level.pop(old)
+        self._moving(old, level)
+        self._moving(new, None)
+        del self._buckets[level][old]
+        self._buckets[level][new] = None
+        self._level[new] = level
+        self._changed(managers + [new])
+
+    def clear(self):
+        super().clear()
+        self._level = {}
+        self._buckets = []
+        self._moved = None
+
+
+class LevelSchedule(object):
+    """Traversal orders of a Dag, level by level.
+
+    Like tree.Schedule: pre_order holds (node, children, level) triples
+    with managers before their reportees and post_order (node, children)
+    pairs with reportees first, every node once.
+    """
+
+    def __init__(self, graph):
+        adj = graph.adj
+        self.generation = graph.generation
+        self.root = None
+        self.levels = [
+            [(n, adj[n]) for n in bucket] for bucket in graph._buckets if bucket]
+        self.pre_order = [
+            (n, children, d)
+            for d, level in enumerate(self.levels) for n, children in level]
+        self.post_order = [
+            entry for level in reversed(self.levels) for entry in level]
+        # the moves patch applies are those since this schedule
+        graph._moved = {}
+        graph._moved_since = self.generation
+        self._synced = self.generation
+        self._skip = set()
+
+    def __len__(self):
+        return len(self.pre_order)
+
+    def patch(self, graph, order, i, node, level):
+        """Bring the rest of a copy of pre_order, after order[i-1] (node),
+        up to date with the graph.
+
+        Only the nodes added, removed or moved to another level since the
+        last patch are touched: a moved node's new entry is inserted at the
+        end of its level (found by bisection) and its old entry, like a
+        removed node's, is left in place but returned among the (node,
+        level) entries to skip. Nodes already visited are not visited
+        again. A patch is O(moved nodes * log n) plus the list insertions.
+
+        The whole rest is rebuilt (O(n)) only when that cannot be done:
+        after a bulk change of the levels, when a node moves from or to the
+        current level or above it (eg it lost its only manager below), or
+        back to a level it left this cycle.
+        """
+        moved = graph._moved
+        if moved is None or graph._moved_since != self._synced:
+            return self._rebuild(graph, order, i)
+        skip = self._skip
+        levels = _Levels(order)
+        adj = graph.adj
+        current = graph._level
+        for n, old in moved.items():
+            new = current.get(n)
+            if old is not None:
+                if old == new or old < level:
+                    continue  # in place, or already visited
+                if old == level:
+                    return self._rebuild(graph, order, i)
+                skip.add((n, old))
+            if new is None:
+                continue  # removed
+            if new <= level or (n, new) in skip:
+                return self._rebuild(graph, order, i)
+            order.insert(bisect.bisect_right(levels, new, i), (n, adj[n], new))
+        graph._moved = {}
+        graph._moved_since = self._synced = graph.generation
+        return skip
+
+    def _rebuild(self, graph, order, i):
+        skip = self._skip
+        visited = {n for n, _, d in order[:i] if (n, d) not in skip}
+        order[i:] = [e for e in graph.schedule().pre_order if e[0] not in visited]
+        self._skip = set()
+        self._synced = graph.generation
+        return self._skip
+
+
+class _Levels(object):
+    """The levels of a pre_order, for bisect."""
+
+    def __init__(self, order):
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.order[i][2]
@@ -0,0 +1,195 @@
+"""
+Renders simulation runs to files without a display.
+
+The engine is stepped in this process, which only takes a Frame (node
+positions, colours and edges as arrays, see orga_plots.Snapshots) of each
+iteration. The frames are drawn by a pool of worker processes, each keeping
+one Agg figure, so the simulation never waits for matplotlib and the export
+scales with the number of cores.
+
+Frames are written as numbered PNGs (export_frames) or piped in order to a
+video encoder such as ffmpeg (export_video).
+"""
+
+import concurrent.futures
+import logging
+import os
+import queue
+import subprocess
+import threading
+
+from orga import orga_plots
+
+log = logging.getLogger(__name__)
+
+FIGSIZE = (8, 6)
+DPI = 100
+
+
+def frames(orga_engine, iterations=12):
+    """Steps the engine, yielding a Frame after each iteration.
+
+    With iterations None runs until the engine stops.
+    """
+    snapshots = orga_plots.Snapshots(orga_engine)
+    steps = iter(orga_engine)
+    if iterations is not None:
+        steps = zip(range(iterations), steps)
+    for i, _ in enumerate(steps):
+        yield snapshots.take(label=str(i + 1))
+
+
+def export_frames(orga_engine, directory, iterations=12, workers=None,
+                  pattern='frame_{:05d}.png', figsize=FIGSIZE, dpi=DPI):
+    """Renders each iteration of the engine to a numbered PNG.
+
+    args:
+        orga_engine: orga.Engine
+        directory: where the images are written, created if missing
+        iterations: number of cycles to step, None to run until the engine
+            stops
+        workers: number of processes, None for all cores or 0 to render in
+            this process
+        pattern: file name of a frame, formatted with its index
+    returns:
+        paths of the images in frame order
+    """
+    os.makedirs(directory, exist_ok=True)
+    with _pool(workers) as pool:
+        futures = [
+            pool.submit(
+                _render_png, frame, figsize, dpi,
+                os.path.join(directory, pattern.format(i)))
+            for i, frame in enumerate(frames(orga_engine, iterations))]
+        log.debug('rendering %d frames', len(futures))
+        return [f.result() for f in futures]
+
+
+def export_video(orga_engine, path, iterations=12, workers=None, fps=2,
+                 figsize=FIGSIZE, dpi=DPI, encoder=None):
+    """Renders each iteration of the engine to a video.
+
+    Frames are rendered in parallel as raw RGBA and written in order to the
+    encoder's stdin by a separate thread. If a frame fails to render (or
+    to be written) no more are written and its exception is raised once
+    the encoder exits.
+
+    args:
+        path: the video file
+        fps: frames per second
+        encoder: command reading raw frames from stdin, by default ffmpeg
+            writing path; formatted with width, height, fps and path
+        (the others as for export_frames)
+    returns:
+        number of frames written
+    """
+    width, height = int(figsize[0] * dpi), int(figsize[1] * dpi)
+    if encoder is None:
+        encoder = [
+            'ffmpeg', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', '{width}x{height}',
+            '-r', '{fps}', '-i', '-', '-pix_fmt', 'yuv420p', '{path}']
+    command = [
+        arg.format(width=width, height=height, fps=fps, path=path)
+        for arg in encoder]
+    log.debug('encoding with %s', command)
+
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    pending = queue.Queue()
+    # frames written and the first error, set by the writer thread
+    written = {'count': 0, 'error': None}
+    writer = threading.Thread(
+        target=_write_frames, args=(pending, process.stdin, written))
+    writer.start()
+    try:
+        with _pool(workers) as pool:
+            for frame in frames(orga_engine, iterations):
+                pending.put(pool.submit(_render_rgba, frame, figsize, dpi))
+            pending.put(None)
+            writer.join()
+    finally:
+        if writer.is_alive():
+            pending.put(None)
+            writer.join()
+        process.stdin.close()
+        returncode = process.wait()
+    if written['error'] is not None:
+        raise written['error']
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, command)
+    return written['count']
+
+
+def _write_frames(pending, stream, written):
+    # keeps taking frames after a failure so the pool is not left waiting
+    while True:
+        future = pending.get()
+        if future is None:
+            return
+        if written['error'] is not None:
+            continue
+        try:
+            stream.write(future.result())
+        except Exception as e:
+            log.error('writing frame %d failed: %s', written['count'], e)
+            written['error'] = e
+        else:
+            written['count'] += 1
+
+
+def _pool(workers):
+    if workers == 0:
+        return _InProcess()
+    return concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count())
+
+
+class _InProcess(object):
+    """Executor running each call straight away in this process."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+# the figure of each worker process, by size
+_renderers = {}
+
+
+def _renderer(figsize, dpi):
+    renderer = _renderers.get((figsize, dpi))
+    if renderer is None:
+        # imported here so workers only pay for the Agg canvas
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+        orga_plots.hide_ticks(ax)
+        renderer = _renderers[(figsize, dpi)] = orga_plots.HierarchyRenderer(ax)
+    return renderer
+
+
+def _render_png(frame, figsize, dpi, path):
+    renderer = _renderer(tuple(figsize), dpi)
+    renderer.show(frame)
+    renderer.ax.figure.savefig(path, dpi=dpi)
+    return path
+
+
+def _render_rgba(frame, figsize, dpi):
+    renderer = _renderer(tuple(figsize), dpi)
+    renderer.show(frame)
+    canvas = renderer.ax.figure.canvas
+    canvas.draw()
+    return bytes(canvas.buffer_rgba())
@@ -0,0 +1,150 @@
+"""
+Tributes of a hierarchy as sparse linear algebra.
+
+With rate table models (see orga.vector.RateTable) the work cycle is linear:
+a leaf's tribute is its WORK_RATE and a manager's is its MGMT_RATE times the
+sum of its reportees' tributes, so for the level ordered tributes t
+
+    t = b + M t
+
+where b holds the leaves' work rates and M is the adjacency (manager to
+reportee) with each manager's row weighted by its mgmt rate. M is strictly
+upper triangular, so t = (I - M)^-1 b is one back substitution, done here a
+layer at a time with one sparse product per layer.
+
+A TributeOperator keeps the (unweighted) CSR adjacency of a fixed structure
+and evaluates any number of type assignments at once: a (candidates, nodes)
+array of types gives every candidate organisation's tributes without
+stepping engines. The influence of each node on the head (the product of the
+mgmt rates above it) makes single type swaps what-if queries that cost O(1)
+each, see swap_effects.
+
+    operator = linear.TributeOperator.from_graph(
+        engine.graph, engine.graphHead, basic_model.rate_table())
+    operator.head_tribute()
+    effects = operator.swap_effects()  # head tribute for every node, type
+"""
+
+import numpy as np
+import scipy.sparse
+
+from orga import vector
+
+
+class TributeOperator(object):
+    """The work cycle of a fixed level ordered hierarchy as sparse products.
+
+    args:
+        table: RateTable of the node types
+        parent: parent index of each node, level ordered (-1 for the head)
+        offsets: start of each layer (with the node count appended)
+        types: type code of each node, the default for every query
+    """
+
+    def __init__(self, table, parent, offsets, types):
+        self.table = table
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.types = np.asarray(types, dtype=np.int64)
+        n = len(self.parent)
+        rows = self.parent[1:]
+        self.adjacency = scipy.sparse.csr_matrix(
+            (np.ones(n - 1), (rows, np.arange(1, n))), shape=(n, n))
+        self.is_leaf = np.diff(self.adjacency.indptr) == 0
+        # the rows of each layer and columns of the next: the reportees of a
+        # layer are all in the one below
+        o = self.offsets
+        self._blocks = [
+            self.adjacency[o[d]:o[d + 1], o[d + 1]:o[d + 2]].tocsr()
+            for d in range(len(o) - 2)]
+
+    @classmethod
+    def from_graph(cls, graph, head, table):
+        """Operator of an object graph (eg Engine.graph), types by class name."""
+        order, parent, offsets = vector.level_order(graph, head)
+        types = [table.code(node.__class__.__name__) for node in order]
+        return cls(table, parent, offsets, types)
+
+    @classmethod
+    def from_array_engine(cls, engine):
+        """Operator of an ArrayEngine (of its first replica if it has any)."""
+        types = engine.types if engine.replicas is None else engine.types[0]
+        return cls(engine.table, engine.parent, engine.offsets, types)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def _types(self, types):
+        return self.types if types is None else np.asarray(types)
+
+    def matrix(self, types=None):
+        """The weighted adjacency M of one type assignment (CSR)."""
+        weights = self.table.mgmt_rate[self._types(types)]
+        return scipy.sparse.diags(weights).dot(self.adjacency).tocsr()
+
+    def tributes(self, types=None):
+        """Tribute of every node after a work cycle.
+
+        types may be (candidates, nodes) to solve for many organisations at
+        once, the tributes then have the same shape.
+        """
+        types = self._types(types)
+        work = np.where(self.is_leaf, self.table.work_rate[types], 0.)
+        mgmt = self.table.mgmt_rate[types]
+        tributes = work.copy()
+        o = self.offsets
+        for d in reversed(range(len(self._blocks))):
+            s, e = o[d], o[d + 1]
+            below = tributes[..., e:o[d + 2]]
+            sums = self._blocks[d].dot(below.T).T
+            tributes[..., s:e] += mgmt[..., s:e] * sums
+        return tributes
+
+    def head_tribute(self, types=None):
+        """Tribute of the head (of every candidate)."""
+        return self.tributes(types)[..., 0]
+
+    def influence(self, types=None):
+        """Weight of each node's tribute in the head's: the product of the
+        mgmt rates of its managers."""
+        mgmt = self.table.mgmt_rate[self._types(types)]
+        weights = np.ones(mgmt.shape)
+        o = self.offsets
+        for d, block in enumerate(self._blocks):
+            s, e = o[d], o[d + 1]
+            above = weights[..., s:e] * mgmt[..., s:e]
+            weights[..., e:o[d + 2]] = block.T.dot(above.T).T
+        return weights
+
+    def swap_effects(self, types=None):
+        """Head tribute if one node had another type, for every node and type.
+
+        Returns a (nodes, types) array (for one type assignment), entry
+        [i, c] being the head's tribute with node i of type c and every
+        other node unchanged.
+        """
+        table = self.table
+        head, tributes, influence, sums = self._swap_terms(types)
+        # tribute of each node as each type
+        as_type = np.where(
+            self.is_leaf[:, None], table.work_rate[None, :],
+            table.mgmt_rate[None, :] * sums[:, None])
+        return head + influence[:, None] * (as_type - tributes[:, None])
+
+    def swap(self, nodes, new_types, types=None):
+        """Head tribute after each single swap of nodes[i] to new_types[i]."""
+        nodes = np.asarray(nodes)
+        new_types = np.asarray(new_types)
+        head, tributes, influence, sums = self._swap_terms(types)
+        as_type = np.where(
+            self.is_leaf[nodes], self.table.work_rate[new_types],
+            self.table.mgmt_rate[new_types] * sums[nodes])
+        return head + influence[nodes] * (as_type - tributes[nodes])
+
+    def _swap_terms(self, types):
+        types = self._types(types)
+        if types.ndim != 1:
+            raise ValueError('swaps are of one type assignment')
+        tributes = self.tributes(types)
+        return (tributes[0], tributes, self.influence(types),
+                self.adjacency.dot(tributes))
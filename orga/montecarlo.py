@@ -0,0 +1,149 @@
+"""
+Runs replicas of a simulation across a pool of processes.
+
+Each replica gets its own seed derived from the run seed and its sample
+index, and traces are reduced in sample order whichever worker finished
+first, so the aggregates are identical for any number of workers.
+"""
+
+import concurrent.futures
+import logging
+import os
+import random
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+def head_tribute(engine):
+    """Default observable: the tribute of the head of the graph."""
+    if hasattr(engine, 'graphHead'):
+        return engine.graphHead.tribute
+    return engine.head_tribute
+
+
+class TraceStats(object):
+    """Per iteration statistics over sample traces, updated as they arrive.
+
+    Mean and variance are kept as running (Welford) sums; the traces are
+    kept too for quantiles.
+    """
+
+    def __init__(self, samples, iterations):
+        self.count = 0
+        self.mean = np.zeros(iterations)
+        self._m2 = np.zeros(iterations)
+        self.traces = np.empty((samples, iterations))
+
+    def add(self, trace):
+        trace = np.asarray(trace, dtype=np.float64)
+        self.traces[self.count] = trace
+        self.count += 1
+        delta = trace - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (trace - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance per iteration."""
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def quantiles(self, q):
+        """Quantiles per iteration of the traces seen so far."""
+        return np.quantile(self.traces[:self.count], q, axis=0)
+
+
+def replica_seeds(seed, samples):
+    """Independent seeds for each sample of a run."""
+    return [
+        int(s.generate_state(1, np.uint64)[0])
+        for s in np.random.SeedSequence(seed).spawn(samples)]
+
+
+def run_samples(engine_factory, samples, iterations, workers=None, seed=0,
+                observe=head_tribute, chunksize=1, callback=None):
+    """Run replicas of engine_factory() and reduce their traces.
+
+    args:
+        engine_factory: picklable function returning a new engine
+        samples: number of replicas to run
+        iterations: number of cycles to step each replica
+        workers: number of processes, None for all cores or 0 to run in
+            this process
+        seed: seed the replica seeds are derived from
+        observe: picklable function of the engine recorded every iteration
+        chunksize: replicas sent to a worker at a time
+        callback: called with the TraceStats after each sample is reduced
+    returns:
+        TraceStats over all the samples
+    """
+    seeds = replica_seeds(seed, samples)
+    chunks = [
+        (i, seeds[i:i + chunksize])
+        for i in range(0, samples, chunksize)]
+    stats = TraceStats(samples, iterations)
+
+    def reduce(pending):
+        while stats.count in pending:
+            stats.add(pending.pop(stats.count))
+            if callback:
+                callback(stats)
+
+    pending = {}
+    if workers == 0:
+        for start, chunk_seeds in chunks:
+            traces = _run_chunk(engine_factory, iterations, observe, chunk_seeds)
+            pending.update(zip(range(start, samples), traces))
+            reduce(pending)
+        return stats
+
+    workers = workers or os.cpu_count()
+    log.debug('running %d samples on %d workers', samples, workers)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(
+                _run_chunk, engine_factory, iterations, observe, chunk_seeds): start
+            for start, chunk_seeds in chunks}
+        for future in concurrent.futures.as_completed(futures):
+            start = futures[future]
+            pending.update(zip(range(start, samples), future.result()))
+            reduce(pending)
+    return stats
+
+
+def run_replicas(engine, iterations, observe=head_tribute):
+    """Step a batched engine (eg ArrayEngine with replicas) and reduce.
+
+    observe(engine) should return one value per replica.
+    returns:
+        TraceStats over the replicas
+    """
+    traces = np.array([
+        observe(engine) for _ in zip(range(iterations), engine)]).T
+    stats = TraceStats(len(traces), iterations)
+    for trace in traces:
+        stats.add(trace)
+    return stats
+
+
+def _run_chunk(engine_factory, iterations, observe, seeds):
+    return [_run_replica(engine_factory, iterations, observe, s) for s in seeds]
+
+
+def _run_replica(engine_factory, iterations, observe, seed):
+    # unseeded engines seed their streams from the global random module,
+    # which is seeded per replica and then restored for the caller
+    state = random.getstate()
+    try:
+        random.seed(seed)
+        engine = engine_factory()
+        return [observe(engine) for _ in zip(range(iterations), engine)]
+    finally:
+        random.setstate(state)
@@ -0,0 +1,506 @@
+"""
+A tree of its own, without networkx.
+
+NativeTree keeps the structure as index arrays rather than networkx's dicts
+of dicts: every node has a slot, the parent of each slot and a range of
+slots in one shared pool of children. A node's children are contiguous in
+the pool (a range that fills up is moved to the end of the pool with twice
+the room, and the pool is compacted once half of it is garbage), removed
+nodes' slots are reused.
+
+It implements the part of the networkx DiGraph API the engine, the journal,
+the layouts and checkpoints use (adj, nodes, add/remove nodes and edges,
+name...) and the TreeBase schedules, change log and journal, so it can be
+used in place of a Tree:
+
+    graph = orga.create_hierarchy_graph(
+        10, 6, generate_employee, graph_cls=native.NativeTree)
+    engine = orga.Engine.from_graph(graph)
+
+Nodes and edges have no attribute dicts. to_networkx() converts it to a
+Tree for plotting or analysis (and NativeTree.from_networkx back).
+"""
+
+import array
+import itertools
+
+import numpy as np
+
+from orga import treebase
+
+# pools smaller than this are not compacted
+MIN_COMPACT = 1024
+
+
+def _slots(n, value=0):
+    return array.array('q', [value]) * n
+
+
+class NativeTree(treebase.TreeBase):
+    """A tree stored as parent and child range arrays.
+
+    Iterating over the nodes follows their slots: the order they were added
+    in, except that nodes added after removals take the freed slots first.
+    Unlike a DiGraph a node has at most one parent (adding an edge to a
+    node with another parent raises ValueError).
+    """
+
+    def __init__(self, incoming_graph_data=None, **attr):
+        self._start_tracking()
+        self.graph = dict(attr)
+        self._clear()
+        if incoming_graph_data is not None:
+            self._copy(incoming_graph_data)
+
+    def _clear(self):
+        self._index = {}
+        self._nodes = []
+        self._parent = _slots(0)
+        self._start = _slots(0)
+        self._count = _slots(0)
+        self._capacity = _slots(0)
+        self._children = _slots(0)
+        self._garbage = 0
+        self._free = []
+        self._edges = 0
+
+    def _copy(self, graph):
+        self.add_nodes_from(graph)
+        self.add_edges_from(
+            (u, v) for u in graph for v in graph.adj[u])
+
+    @classmethod
+    def from_children(cls, nodes, n_children, children, **attr):
+        """Tree of nodes built in bulk from arrays, see Tree.from_children."""
+        graph = cls(**attr)
+        n = len(nodes)
+        counts = np.asarray(n_children, dtype=np.int64).reshape(n)
+        children = np.asarray(children, dtype=np.int64).reshape(-1)
+        parent = np.full(n, -1, dtype=np.int64)
+        parent[children] = np.repeat(np.arange(n), counts)
+        if len(children) and np.bincount(children, minlength=n).max() > 1:
+            raise ValueError('a node has several parents')
+        graph._nodes = list(nodes)
+        graph._index = dict(zip(graph._nodes, range(n)))
+        graph._parent.frombytes(parent.tobytes())
+        graph._start.frombytes((np.cumsum(counts) - counts).tobytes())
+        graph._count.frombytes(counts.tobytes())
+        graph._capacity.frombytes(counts.tobytes())
+        graph._children.frombytes(children.tobytes())
+        graph._edges = len(children)
+        graph._changed()
+        return graph
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """NativeTree with the nodes and child order of a networkx tree."""
+        nodes = list(graph)
+        index = dict(zip(nodes, range(len(nodes))))
+        adj = graph.adj
+        return cls.from_children(
+            nodes, [len(adj[n]) for n in nodes],
+            [index[c] for n in nodes for c in adj[n]],
+            **graph.graph)
+
+    def to_networkx(self):
+        """The tree as an orga.tree.Tree (a networkx DiGraph)."""
+        from orga import tree
+        nodes = list(self)
+        position = dict(zip(self._live_slots(), range(len(nodes))))
+        children = self._children
+        count, start = self._count, self._start
+        flat = []
+        counts = []
+        for slot in self._live_slots():
+            s = start[slot]
+            c = count[slot]
+            counts.append(c)
+            flat.extend(map(position.__getitem__, children[s:s + c]))
+        return tree.Tree.from_children(nodes, counts, flat, **self.graph)
+
+    @property
+    def name(self):
+        return self.graph.get('name', '')
+
+    @name.setter
+    def name(self, value):
+        self.graph['name'] = value
+
+    def __repr__(self):
+        return '<{} {!r} of {} nodes>'.format(
+            self.__class__.__name__, self.name, len(self))
+
+    # nodes and views
+
+    def _live_slots(self):
+        if not self._free:
+            return range(len(self._nodes))
+        free = set(self._free)
+        return (s for s in range(len(self._nodes)) if s not in free)
+
+    def __iter__(self):
+        if not self._free:
+            return iter(self._nodes)
+        return (n for n in self._nodes if n is not None)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, node):
+        try:
+            return node in self._index
+        except TypeError:
+            return False
+
+    def _kids(self, slot):
+        s = self._start[slot]
+        return tuple(map(
+            self._nodes.__getitem__, self._children[s:s + self._count[slot]]))
+
+    def children(self, node):
+        """The node's children in order (a tuple)."""
+        return self._kids(self._index[node])
+
+    def subtree(self, node):
+        """All the nodes below and including node, see tree.subtree."""
+        slots = [self._index[node]]
+        start, count, pool = self._start, self._count, self._children
+        for slot in slots:
+            s = start[slot]
+            slots.extend(pool[s:s + count[slot]])
+        return list(map(self._nodes.__getitem__, slots))
+
+    def parent(self, node):
+        """The node's manager, None for the head."""
+        p = self._parent[self._index[node]]
+        return None if p < 0 else self._nodes[p]
+
+    @property
+    def nodes(self):
+        return NodeView(self)
+
+    @property
+    def adj(self):
+        return AdjacencyView(self, self.children)
+
+    succ = adj
+
+    @property
+    def pred(self):
+        return AdjacencyView(self, self._parents)
+
+    def _parents(self, node):
+        p = self.parent(node)
+        return () if p is None else (p,)
+
+    def edges(self):
+        """(parent, child) pairs, by parent in node order."""
+        for slot in self._live_slots():
+            if self._count[slot]:
+                node = self._nodes[slot]
+                for child in self._kids(slot):
+                    yield node, child
+
+    def number_of_nodes(self):
+        return len(self)
+
+    def number_of_edges(self):
+        return self._edges
+
+    def schedule(self, root):
+        """Cached NativeSchedule of the tree below root."""
+        schedule = self._schedules.get(root)
+        if schedule is None:
+            schedule = self._schedules[root] = NativeSchedule(self, root)
+        return schedule
+
+    # building
+
+    def _add(self, node):
+        slot = self._index.get(node)
+        if slot is not None:
+            return slot
+        if self._free:
+            slot = self._free.pop()
+            self._nodes[slot] = node
+        else:
+            slot = len(self._nodes)
+            self._nodes.append(node)
+            for a in (self._parent, self._start, self._count, self._capacity):
+                a.append(0)
+        self._parent[slot] = -1
+        self._index[node] = slot
+        return slot
+
+    def add_node(self, node_for_adding):
+        self._add(node_for_adding)
+        self._changed(())
+
+    def add_nodes_from(self, nodes_for_adding):
+        index = self._index
+        new = [n for n in dict.fromkeys(nodes_for_adding) if n not in index]
+        if self._free:
+            for node in new:
+                self._add(node)
+        else:
+            n = len(self._nodes)
+            self._nodes.extend(new)
+            index.update(zip(new, range(n, n + len(new))))
+            self._parent.extend(_slots(len(new), -1))
+            for a in (self._start, self._count, self._capacity):
+                a.extend(_slots(len(new)))
+        self._changed(())
+
+    def add_edge(self, u_of_edge, v_of_edge):
+        self._add_edges([(u_of_edge, v_of_edge)])
+
+    def add_edges_from(self, ebunch_to_add):
+        self._add_edges(ebunch_to_add)
+
+    def _add_edges(self, edges):
+        # children by parent slot, to give each parent room for all at once
+        grouped = {}
+        parent = self._parent
+        try:
+            for edge in edges:
+                p = self._add(edge[0])
+                c = self._add(edge[1])
+                current = parent[c]
+                if current == p:
+                    continue
+                if current >= 0:
+                    raise ValueError('{} already has a parent'.format(edge[1]))
+                parent[c] = p
+                grouped.setdefault(p, []).append(c)
+        finally:
+            # the edges before an error are kept, as networkx would
+            for p, kids in grouped.items():
+                self._append_children(p, kids)
+                self._edges += len(kids)
+            self._changed({self._nodes[p] for p in grouped})
+
+    def _append_children(self, p, kids):
+        count = self._count[p]
+        if count + len(kids) > self._capacity[p]:
+            self._move(p, max(2 * count, count + len(kids)))
+        s = self._start[p] + count
+        self._children[s:s + len(kids)] = array.array('q', kids)
+        self._count[p] = count + len(kids)
+
+    def _move(self, p, capacity):
+        """Moves p's children to the end of the pool with room for capacity."""
+        self._maybe_compact()
+        s, count = self._start[p], self._count[p]
+        self._garbage += self._capacity[p]
+        pool = self._children
+        self._start[p] = len(pool)
+        self._capacity[p] = capacity
+        pool.extend(pool[s:s + count])
+        pool.extend(_slots(capacity - count))
+
+    def _compact(self):
+        """Copies the live child ranges to a new pool, without room."""
+        pool = self._children
+        new = _slots(0)
+        start, count, capacity = self._start, self._count, self._capacity
+        for slot in range(len(self._nodes)):
+            c = count[slot]
+            s = start[slot]
+            start[slot] = len(new)
+            capacity[slot] = c
+            if c:
+                new.extend(pool[s:s + c])
+        self._children = new
+        self._garbage = 0
+
+    # removing
+
+    def _detach(self, slot):
+        """Removes slot from its parent's children."""
+        p = self._parent[slot]
+        s, count = self._start[p], self._count[p]
+        pool = self._children
+        i = pool[s:s + count].index(slot)
+        pool[s + i:s + count - 1] = pool[s + i + 1:s + count]
+        self._count[p] = count - 1
+        self._parent[slot] = -1
+        self._edges -= 1
+
+    def _release(self, slot):
+        node = self._nodes[slot]
+        del self._index[node]
+        self._nodes[slot] = None
+        self._garbage += self._capacity[slot]
+        self._edges -= self._count[slot]
+        self._count[slot] = self._capacity[slot] = 0
+        self._parent[slot] = -1
+        self._free.append(slot)
+
+    def remove_edge(self, u, v):
+        index = self._index
+        if u not in index or v not in index or (
+                self._parent[index[v]] != index[u]):
+            raise KeyError('no edge {} -> {}'.format(u, v))
+        self._detach(index[v])
+        self._changed((u,))
+
+    def remove_edges_from(self, ebunch):
+        index = self._index
+        parents = set()
+        for edge in ebunch:
+            u, v = edge[0], edge[1]
+            if u in index and v in index and (
+                    self._parent[index[v]] == index[u]):
+                self._detach(index[v])
+                parents.add(u)
+        self._changed(parents)
+
+    def remove_node(self, node):
+        """Removes the node and everything below it."""
+        self.remove_subtrees([node])
+
+    def remove_subtrees(self, nodes):
+        """Removes the nodes and everything below them in one pass."""
+        index = self._index
+        roots = [index[n] for n in dict.fromkeys(nodes) if n in index]
+        removed = set()
+        stack = list(roots)
+        start, count, pool = self._start, self._count, self._children
+        while stack:
+            slot = stack.pop()
+            if slot not in removed:
+                removed.add(slot)
+                s = start[slot]
+                stack.extend(pool[s:s + count[slot]])
+        parents = set()
+        for slot in roots:
+            p = self._parent[slot]
+            if p >= 0 and p not in removed:
+                parents.add(self._nodes[p])
+                self._detach(slot)
+        for slot in removed:
+            self._release(slot)
+        self._maybe_compact()
+        self._changed(parents)
+
+    def remove_nodes_from(self, nodes):
+        """Removes the nodes only, their children become roots."""
+        index = self._index
+        slots = [index[n] for n in dict.fromkeys(nodes) if n in index]
+        removed = set(slots)
+        parents = set()
+        start, count, pool = self._start, self._count, self._children
+        for slot in slots:
+            p = self._parent[slot]
+            if p >= 0:
+                self._detach(slot)
+                if p not in removed:
+                    parents.add(self._nodes[p])
+            s = start[slot]
+            for child in pool[s:s + count[slot]]:
+                self._parent[child] = -1
+        for slot in slots:
+            self._release(slot)
+        self._maybe_compact()
+        self._changed(parents)
+
+    def _maybe_compact(self):
+        if (self._garbage > len(self._children) // 2 and
+                len(self._children) > MIN_COMPACT):
+            self._compact()
+
+    def replace_node(self, old, new):
+        """Puts new in the place (the slot) of old, keeping its reportees."""
+        slot = self._index.pop(old)
+        self._index[new] = slot
+        self._nodes[slot] = new
+        p = self._parent[slot]
+        self._changed((None if p < 0 else self._nodes[p], new))
+
+    def clear(self):
+        self._clear()
+        self._changed()
+
+
+class NodeView(object):
+    """The nodes of a NativeTree, like networkx's graph.nodes (also
+    callable)."""
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __call__(self):
+        return self
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node):
+        return node in self._graph
+
+
+class AdjacencyView(object):
+    """Node to children (or parents) of a NativeTree, like graph.adj."""
+    __slots__ = ('_graph', '_get')
+
+    def __init__(self, graph, get):
+        self._graph = graph
+        self._get = get
+
+    def __getitem__(self, node):
+        return self._get(node)
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, node):
+        return node in self._graph
+
+    def items(self):
+        return ((n, self._get(n)) for n in self._graph)
+
+
+class NativeSchedule(treebase.Schedule):
+    """Schedule of a NativeTree, built from its arrays.
+
+    The same orders as tree.Schedule, with each node's children as the one
+    tuple in both.
+    """
+
+    def __init__(self, graph, root):
+        self.generation = graph.generation
+        self.root = root
+        nodes = graph._nodes
+        start, count, pool = graph._start, graph._count, graph._children
+        get = nodes.__getitem__
+
+        pre_order = []
+        kids = {}
+        stack = [(graph._index[root], 0)]
+        while stack:
+            slot, depth = stack.pop()
+            s = start[slot]
+            own = pool[s:s + count[slot]]
+            children = kids[slot] = tuple(map(get, own))
+            pre_order.append((nodes[slot], children, depth))
+            if own:
+                own.reverse()
+                stack.extend(zip(own, itertools.repeat(depth + 1)))
+        self.pre_order = pre_order
+
+        # the reverse of a pre-order visiting the last child first
+        mirrored = []
+        stack = [graph._index[root]]
+        while stack:
+            slot = stack.pop()
+            mirrored.append(slot)
+            s = start[slot]
+            stack.extend(pool[s:s + count[slot]])
+        self.post_order = [(nodes[s], kids[s]) for s in reversed(mirrored)]
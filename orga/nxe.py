@@ -1,12 +1,14 @@
-import networkx as nx
+import weakref
+
+import numpy as np
+
 
-#
-# Thanks to:
-#  https://stackoverflow.com/questions/29586520/can-one-get-hierarchical-graphs-from-networkx-with-python-3
-#
 def hierarchy_pos(G, root, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5 ):
     '''If there is a cycle that is reachable from root, then result will not be a hierarchy.
 
+       Each node gets an equal share of its parent's width. Runs in O(n) with
+       the positions of each layer computed as arrays.
+
        G: the graph
        root: the root node of current branch
        width: horizontal space allocated for this branch - avoids overlap with other branches
@@ -14,26 +16,174 @@ def hierarchy_pos(G, root, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5
        vert_loc: vertical location of root
        xcenter: horizontal location of root
     '''
+    nodes, x, y, _ = subtree_layout(G, root, width, vert_gap, vert_loc, xcenter)
+    return dict(zip(nodes, zip(x.tolist(), y.tolist())))
+
+
+def subtree_layout(G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5,
+                   seen=None):
+    '''Layout of the nodes below root as arrays.
+
+       Returns the nodes in breadth first order with their x, y and width.
+       Nodes already in seen (which is updated) are not visited again.
+    '''
+    seen = set() if seen is None else seen
+    seen.add(root)
+    nodes = [root]
+    parent = [-1]
+    rank = [0]
+    n_children = []
+    offsets = [0]
+    adj = G.adj
+    s = 0
+    while s < len(nodes):
+        offsets.append(len(nodes))
+        for i in range(s, offsets[-1]):
+            children = [c for c in adj[nodes[i]] if c not in seen]
+            seen.update(children)
+            n_children.append(len(children))
+            nodes.extend(children)
+            parent.extend([i] * len(children))
+            rank.extend(range(len(children)))
+        s = offsets[-1]
+
+    parent = np.array(parent)
+    rank = np.array(rank)
+    n_children = np.array(n_children)
+    x = np.empty(len(nodes))
+    y = np.empty(len(nodes))
+    w = np.empty(len(nodes))
+    x[0], y[0], w[0] = xcenter, vert_loc, width
+    for d in range(1, len(offsets) - 1):
+        s, e = offsets[d], offsets[d + 1]
+        p = parent[s:e]
+        w[s:e] = w[p] / n_children[p]
+        x[s:e] = x[p] - w[p] / 2 + w[s:e] * (rank[s:e] + 0.5)
+        y[s:e] = vert_loc - d * vert_gap
+    return nodes, x, y, w
+
+
+def dag_pos(G, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5):
+    '''Positions of a directed acyclic graph, one row per level.
+
+       A node's level is the longest path to it from a node without
+       predecessors (orga.dag.Dag keeps them, otherwise they are worked out
+       in one topological pass). Each row is ordered by the mean x of the
+       nodes' predecessors so shared reportees sit between their managers.
+    '''
+    levels = G.levels() if hasattr(G, 'levels') else topological_levels(G)
+    pos = {}
+    pred = G.pred
+    for d, level in enumerate(levels):
+        if d:
+            keys = np.array([
+                np.mean([pos[p][0] for p in pred[n]]) for n in level])
+            level = [level[i] for i in np.argsort(keys, kind='stable')]
+        x = xcenter - width / 2 + width * (np.arange(len(level)) + 0.5) / len(level)
+        y = vert_loc - d * vert_gap
+        pos.update(zip(level, ((xi, y) for xi in x.tolist())))
+    return pos
+
+
+def topological_levels(G):
+    '''Nodes of G by longest path from a node without predecessors.'''
+    indegree = {n: len(p) for n, p in G.pred.items()}
+    level = [n for n, d in indegree.items() if d == 0]
+    levels = []
+    while level:
+        levels.append(level)
+        next_level = []
+        for n in level:
+            for c in G.adj[n]:
+                indegree[c] -= 1
+                if not indegree[c]:
+                    next_level.append(c)
+        level = next_level
+    return levels
+
+
+class Layout(object):
+    '''hierarchy_pos of a tree that is kept up to date as it changes.
+
+       Uses the tree's change log (orga.tree.Tree.changes_since) to lay out
+       again only the subtrees below nodes whose children changed; graphs
+       without one are laid out again whenever asked.
+
+       Only keeps a weak reference to G, so it can be cached per graph.
+    '''
+
+    def __init__(self, G, root, width=1., vert_gap=0.2, vert_loc=0, xcenter=0.5):
+        self._graph = weakref.ref(G)
+        self.root = root
+        self.vert_gap = vert_gap
+        self.args = (width, vert_gap, vert_loc, xcenter)
+        self.generation = None
+        self.pos = {}
+        self._width = {}
+        self._children = {}
+
+    @property
+    def G(self):
+        return self._graph()
+
+    def positions(self):
+        '''Dict of node to (x, y), updated if the tree changed.'''
+        generation = getattr(self.G, 'generation', None)
+        if generation is None or self.generation is None:
+            changed = None
+        elif generation == self.generation:
+            return self.pos
+        else:
+            changed = self.G.changes_since(self.generation)
+
+        if changed is None or self.root in changed:
+            self.pos, self._width, self._children = {}, {}, {}
+            self._layout(self.root, *self.args)
+        else:
+            for node in self._topmost(changed):
+                x, y = self.pos[node]
+                self._drop_below(node)
+                self._layout(
+                    node, self._width[node], self.vert_gap, y, x)
+        self.generation = generation
+        return self.pos
+
+    def _topmost(self, changed):
+        '''The laid out changed nodes that have no changed ancestor.'''
+        changed = {n for n in changed if n in self.pos and n in self.G}
+        topmost = []
+        for node in changed:
+            ancestor, parent = node, self.G.parent(node)
+            while parent is not None and parent not in changed:
+                ancestor, parent = parent, self.G.parent(parent)
+            if parent is None and ancestor == self.root:
+                topmost.append(node)
+        return topmost
+
+    def _drop_below(self, node):
+        stack = list(self._children.pop(node, ()))
+        while stack:
+            n = stack.pop()
+            self.pos.pop(n, None)
+            self._width.pop(n, None)
+            stack.extend(self._children.pop(n, ()))
+
+    def _layout(self, node, width, vert_gap, vert_loc, xcenter):
+        nodes, x, y, w = subtree_layout(
+            self.G, node, width, vert_gap, vert_loc, xcenter)
+        self.pos.update(zip(nodes, zip(x.tolist(), y.tolist())))
+        self._width.update(zip(nodes, w.tolist()))
+        adj = self.G.adj
+        self._children.update((n, tuple(adj[n])) for n in nodes)
+
+
+_layouts = weakref.WeakKeyDictionary()
+
 
-    def h_recur(G, root, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5, 
-                  pos = None, parent = None, parsed = [] ):
-        if(root not in parsed):
-            parsed.append(root)
-            if pos == None:
-                pos = {root:(xcenter,vert_loc)}
-            else:
-                pos[root] = (xcenter, vert_loc)
-            neighbors = list(G.neighbors(root))
-            #if parent != None:
-                #neighbors.remove(parent)
-            if len(neighbors)!=0:
-                dx = width/len(neighbors) 
-                nextx = xcenter - width/2 - dx/2
-                for neighbor in neighbors:
-                    nextx += dx
-                    pos = h_recur(G,neighbor, width = dx, vert_gap = vert_gap, 
-                                        vert_loc = vert_loc-vert_gap, xcenter=nextx, pos=pos, 
-                                        parent = root, parsed = parsed)
-        return pos
-
-    return h_recur(G, root, width=1., vert_gap = 0.2, vert_loc = 0, xcenter = 0.5)
+def cached_hierarchy_pos(G, root):
+    '''hierarchy_pos of G kept in a Layout cached per graph and root.'''
+    layouts = _layouts.setdefault(G, {})
+    layout = layouts.get(root)
+    if layout is None:
+        layout = layouts[root] = Layout(G, root)
+    return layout.positions()
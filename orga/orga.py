@@ -1,9 +1,15 @@
+import collections
+import itertools
 import logging
+import numbers
 import random
 import string
+import time
+import tracemalloc
 
-from orga import nxe
-from orga import tree
+from orga import rng
+from orga import stats
+from orga import treebase
 
 log = logging.getLogger(__name__)
 
@@ -13,22 +19,153 @@ class Engine(object):
 
     node_gen_fn should return generate nodes required to have towo functions
     'do_work' and 'feedback' while will be called in each cycle.
+
+    The engine owns a random stream (self.rng) which is active while nodes
+    are created and run, models should draw from it through orga.rng.
+
+    Changes to the graph queued in graph.journal during feedback are applied
+    together at the end of each feedback cycle.
     """
 
-    def __init__(self, node_gen_fn, graph_k=3, graph_d=3):
+    def __init__(self, node_gen_fn, graph_k=3, graph_d=3, seed=None,
+                 convergence=None, stop=True, incremental=False):
         """
         args:
             graph_k: number of children per node
             graph_d: how many layers the graph should have
+            seed: seed of the engine's random stream (see orga.rng)
+            convergence: criterion from orga.convergence checked after each
+                work cycle
+            stop: end the iteration once converged, otherwise only set
+                'converged'
+            incremental: after the first cycle only redo the work of nodes
+                changed by feedback and of their managers (for models whose
+                'do_work' only depends on the node's class and reportees)
+        """
+        stream = rng.Stream(seed)
+        with stream.active():
+            graph = create_hierarchy_graph(graph_k, graph_d, node_gen_fn)
+        self._start(graph, next(iter(graph.nodes)), stream, convergence, stop,
+                    incremental)
+
+    @classmethod
+    def from_graph(cls, graph, head=None, seed=None, convergence=None,
+                   stop=True, incremental=False):
+        """Engine over an existing tree (eg a restored checkpoint).
+
+        head defaults to the first node of the graph and seed may also be an
+        orga.rng.Stream to continue.
+        """
+        if head is None:
+            head = next(iter(graph.nodes))
+        stream = seed if isinstance(seed, rng.Stream) else rng.Stream(seed)
+        engine = cls.__new__(cls)
+        engine._start(graph, head, stream, convergence, stop, incremental)
+        return engine
+
+    def _start(self, graph, head, stream, convergence, stop, incremental):
+        self.rng = stream
+        self.graph = graph
+        self.graphHead = head
+        self.convergence = convergence
+        # updated with the engine after each work cycle (eg orga.recorder)
+        self.observers = []
+        self.stop = stop
+        self.incremental = incremental
+        self.iteration = 0
+        self.converged = False
+        # nodes changed (type or structure) by the last feedback cycle, only
+        # tracked when the convergence criterion or incremental work need it
+        self.changes = None
+        self._generation = None
+        # the last work cycle has not had its feedback cycle yet, so a new
+        # iteration continues the run rather than repeating the work cycle
+        self.feedback_due = False
+        # see start_stats
+        self.stats = None
+        self._stats = None
+
+    def start_stats(self, per_node=False):
+        """Instrument the following cycles, see orga.stats.
+
+        Returns the Stats, also kept in self.stats after stop_stats.
         """
-        self.graph = create_hierarchy_graph(graph_k, graph_d, node_gen_fn)
-        self.graphHead = next(iter(self.graph.nodes))
+        self.stats = self._stats = stats.Stats(per_node)
+        return self.stats
+
+    def stop_stats(self):
+        self._stats = None
+        return self.stats
 
     def __iter__(self):
+        if self.feedback_due:
+            self._feedback(external=True)
         while True:  # Let the caller dictate the duration
-            work_cycle(self.graph, self.graphHead)
+            instrument = self._stats
+            if instrument is None:
+                self._work()
+            else:
+                with instrument.phase('work', self):
+                    self._work(instrument.call)
+            self.iteration += 1
+            generation = self.graph.generation
+            if instrument is None:
+                self._observe()
+            else:
+                with instrument.phase('observe', self):
+                    self._observe()
+            self.feedback_due = True
             yield None
-            feedback_cycle(self.graph, self.graphHead)
+            if self.converged and self.stop:
+                return
+            # changes made by the caller rather than by feedback mean the
+            # next work cycle has to be a full one
+            self._feedback(external=generation != self.graph.generation)
+
+    def __aiter__(self):
+        """Async iterator of snapshots, stepping the engine in a thread.
+
+        See orga.aio.iterate for more options.
+        """
+        from orga import aio
+        return aio.iterate(self)
+
+    def _work(self, call=None):
+        with self.rng.active():
+            if self.incremental and self._generation == self.graph.generation:
+                dirty_work_cycle(self.graph, self.changes, call)
+            else:
+                work_cycle(self.graph, self.graphHead, call)
+
+    def _observe(self):
+        if self.convergence is not None and not self.converged:
+            self.converged = self.convergence.update(self)
+            if self.converged:
+                log.debug('converged after %d iterations', self.iteration)
+        for observer in self.observers:
+            observer.update(self)
+
+    def _feedback(self, external):
+        track = self.incremental or (
+            self.convergence is not None and self.convergence.needs_changes)
+        self.changes = [] if track else None
+        instrument = self._stats
+        if instrument is None:
+            with self.rng.active():
+                self.rng.prepare(len(self.graph))
+                feedback_cycle(self.graph, self.graphHead, self.changes)
+            self.graph.journal.apply(self.changes)
+        else:
+            before = self.graph.generation
+            with instrument.phase('feedback', self), self.rng.active():
+                self.rng.prepare(len(self.graph))
+                feedback_cycle(
+                    self.graph, self.graphHead, self.changes, instrument.call)
+            with instrument.phase('journal', self):
+                instrument.journal.append(self.graph.journal.apply(self.changes))
+            instrument.mutations.append(self.graph.generation - before)
+        self._generation = None if external else self.graph.generation
+        self.feedback_due = False
 
 
 def validate_new_node(node):
@@ -37,47 +174,198 @@ def validate_new_node(node):
     return node
 
 
-def create_hierarchy_graph(graph_k, graph_d, node_gen_fn):
-    graph = tree.Tree(name='Örg Ås Board')
+BuildStats = collections.namedtuple(
+    'BuildStats', ['nodes', 'edges', 'seconds', 'peak_bytes'])
+
 
-    last_layer = []
-    layer_prefixes = string.ascii_lowercase[:graph_d]
-    for d, layer_prefix in enumerate(layer_prefixes):
-        layer_count = pow(graph_k, d)
-        layer_names = [layer_prefix + str(c) for c in range(layer_count)]
-        layer = [validate_new_node(node_gen_fn(name)) for name in layer_names]
-        graph.add_nodes_from(layer)
+def create_hierarchy_graph(graph_k, graph_d, node_gen_fn, lazy=False,
+                           report=False, graph_cls=None):
+    """Build a hierarchy of graph_d layers.
 
-        for i, parent in enumerate(last_layer):
-            for j in range(graph_k):
-                child = layer[i * graph_k + j]
-                graph.add_edge(parent, child)
+    Nodes are named by layer ('a0', 'b0'..., 'z0', 'aa0'...) and index and
+    are inserted a layer at a time in bulk.
 
+    args:
+        graph_k: children per node; an int, a list with one entry per parent
+            layer, or a function (layer, index) -> count for ragged trees
+        graph_d: how many layers the graph should have
+        node_gen_fn: creates a node from its name
+        lazy: create the nodes as their edges are inserted rather than a
+            layer ahead (the nodes are then not validated)
+        report: record BuildStats (time and peak traced memory) in
+            graph.graph['build_stats'] and log them
+        graph_cls: class of the graph, eg orga.native.NativeTree (default
+            orga.tree.Tree, networkx is only imported then)
+    """
+    if graph_cls is None:
+        from orga import tree
+        graph_cls = tree.Tree
+    if report:
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+    graph = graph_cls(name='Örg Ås Board')
+    head = validate_new_node(node_gen_fn(layer_name(0) + '0'))
+    graph.add_node(head)
+
+    last_layer = [head]
+    for d in range(1, graph_d):
+        counts = fan_out(graph_k, d - 1, len(last_layer))
+        parents = layer_parents(last_layer, counts)
+        names = (layer_name(d) + str(c) for c in itertools.count())
+        if lazy:
+            layer = []
+            graph.add_edges_from(
+                (parent, _append(layer, node_gen_fn(name)))
+                for parent, name in zip(parents, names))
+        else:
+            layer = [
+                validate_new_node(node_gen_fn(name))
+                for name, _ in zip(names, range(layer_size(counts, last_layer)))]
+            graph.add_nodes_from(layer)
+            graph.add_edges_from(zip(parents, layer))
         last_layer = layer
 
+    if report:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        stats = graph.graph['build_stats'] = BuildStats(
+            len(graph), graph.number_of_edges(), seconds, peak)
+        log.info('built {} nodes in {:.3f}s (peak {:.1f}MB)'.format(
+            stats.nodes, stats.seconds, stats.peak_bytes / 2**20))
+
     return graph
 
 
-def work_cycle(graph, node):
-    """Recursive function to apply 'do_work' to each node.
+def layer_name(d):
+    """Name prefix of the nodes in layer d: 'a'...'z', 'aa', 'ab'..."""
+    name = ''
+    d += 1
+    while d:
+        d, r = divmod(d - 1, 26)
+        name = string.ascii_lowercase[r] + name
+    return name
+
+
+def fan_out(graph_k, d, count):
+    """Number of children of each of the count nodes in layer d.
+
+    Returns an int when every node has the same number of children. Any
+    integral graph_k (eg a numpy integer from a sweep grid) is accepted.
+    """
+    if callable(graph_k):
+        return [graph_k(d, i) for i in range(count)]
+    if isinstance(graph_k, numbers.Integral):
+        return int(graph_k)
+    return int(graph_k[d])
+
+
+def layer_size(counts, last_layer):
+    if isinstance(counts, int):
+        return counts * len(last_layer)
+    return sum(counts)
+
+
+def layer_parents(last_layer, counts):
+    """The parent of each node of the next layer, in order."""
+    if isinstance(counts, int):
+        counts = itertools.repeat(counts)
+    return itertools.chain.from_iterable(
+        itertools.repeat(parent, c) for parent, c in zip(last_layer, counts))
+
+
+def _append(layer, node):
+    layer.append(node)
+    return node
+
+
+def work_cycle(graph, node, call=None):
+    """Apply 'do_work' to each node.
 
     Calls the 'do_work' function starting at the leaves first and going
-    towards the head.
+    towards the head, in the graph's cached post-order schedule.
+
+    If given, call(node, 'do_work', children) makes the calls instead (eg
+    orga.stats.Stats.call).
+    """
+    if call is None:
+        for n, children in graph.schedule(node).post_order:
+            n.do_work(children)
+    else:
+        for n, children in graph.schedule(node).post_order:
+            call(n, 'do_work', children)
+
+
+def dirty_work_cycle(graph, nodes, call=None):
+    """Apply 'do_work' to the given nodes and all their managers only.
+
+    The nodes are worked on deepest first so every node comes after its
+    changed reportees (see Tree.work_order). Nodes no longer in the graph
+    are skipped.
     """
-    children = graph.adj[node]
-    for n in children:
-        work_cycle(graph, n)
-    node.do_work(children)
+    adj = graph.adj
+    for n in graph.work_order(nodes):
+        if call is None:
+            n.do_work(adj[n])
+        else:
+            call(n, 'do_work', adj[n])
 
 
-def feedback_cycle(graph, node):
-    """Recursive function to apply 'do_work' to each node.
+def feedback_cycle(graph, node, changes=None, call=None):
+    """Apply 'feedback' to each node.
 
     Calls the 'feedback' function starting at the head first and going
-    towards the leaves.
+    towards the leaves, in the graph's cached pre-order schedule.
+
+    A node's feedback may change the graph below it; the rest of the
+    schedule is then patched (see Schedule.patch) so that the changed
+    subtree is visited as it is now (as recursing over the live graph
+    would).
+
+    If a changes list is given the nodes whose type a feedback changed are
+    appended to it, as are nodes whose feedback changed the graph (with
+    their whole subtree).
+
+    If given, call(node, 'feedback', children, graph) makes the calls.
+
+    A schedule's patch may leave stale entries in place, returning the
+    (node, depth) entries to skip (see orga.dag.LevelSchedule).
     """
-    children = graph.adj[node]
-    node.feedback(children, graph)
-    children = graph.adj[node]
-    for n in children:
-        feedback_cycle(graph, n)
+    schedule = graph.schedule(node)
+    order = schedule.pre_order
+    generation = schedule.generation
+    skip = None
+    i = 0
+    while i < len(order):
+        n, children, depth = order[i]
+        i += 1
+        if generation != graph.generation and n not in graph:
+            continue
+        if skip and (n, depth) in skip:
+            continue
+        before = None
+        if changes is not None and children:
+            before = [node_type(c) for c in children]
+        if call is None:
+            n.feedback(children, graph)
+        else:
+            call(n, 'feedback', children, graph)
+        if before is not None and generation == graph.generation:
+            changes.extend(
+                c for c, t in zip(children, before) if node_type(c) != t)
+        if generation != graph.generation:
+            if changes is not None and n in graph:
+                changes.extend(treebase.subtree(graph, n))
+            if generation == schedule.generation:
+                order = list(order)  # the cached schedule is now stale
+            skip = schedule.patch(graph, order, i, n, depth)
+            generation = graph.generation
+
+
+def node_type(node):
+    """A node's type code if it has one (see orga.compact), else its class."""
+    return getattr(node, 'type', node.__class__)
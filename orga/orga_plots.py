@@ -2,12 +2,31 @@
 Useful shared matplotlib plotting libraries.
 """
 
+import collections
+import random
+
 from matplotlib import animation
+from matplotlib import colors
+from matplotlib.collections import LineCollection
 import networkx as nx
-import random
+import numpy as np
 
 from orga import nxe
 
+
+def positions(orga_engine):
+    """Node positions of the engine's graph.
+
+    Level by level for DAGs (orga.dag.Dag), so nodes the head cannot reach
+    and nodes with several managers are placed too, otherwise the tree
+    below the head.
+    """
+    graph = orga_engine.graph
+    if hasattr(graph, 'levels'):
+        return nxe.dag_pos(graph)
+    return nxe.cached_hierarchy_pos(graph, orga_engine.graphHead)
+
+
 def plot_hierarchy(ax, orga_engine):
     """Plot a directed graph.
 
@@ -16,7 +35,9 @@ def plot_hierarchy(ax, orga_engine):
         orga_engine: orga.Engine
     """
     graph = orga_engine.graph
-    pos = add_noise(nxe.hierarchy_pos(orga_engine.graph, orga_engine.graphHead))
+    pos = add_noise(positions(orga_engine))
+    if not isinstance(graph, nx.Graph):
+        graph = graph.to_networkx()  # eg orga.native.NativeTree
 
     ax.set_title(graph.name)
 
@@ -32,41 +53,215 @@ def plot_hierarchy(ax, orga_engine):
     nx.draw_networkx_edges(graph, pos, ax=ax, width=2, edge_color='r', alpha=0.5)
 
 
-def plot_animation(fig, ax, orga_engine, iterations):
-    """Call plot_hierarchy many times in an animation."""
-    eng_iter = iter(orga_engine)
+Frame = collections.namedtuple(
+    'Frame', 'title label offsets segments facecolors')
+Frame.__doc__ = """What is drawn of a graph at one iteration, as plain arrays.
 
-    ax.tick_params(
-            axis='both', left='off', top='off', right='off', bottom='off',
-            labelleft='off', labeltop='off', labelright='off', labelbottom='off')
+offsets are the (x, y) of every node, segments the ((x0, y0), (x1, y1)) of
+every edge and facecolors the RGBA of every node. Frames of the same
+structure share their offsets and segments.
+"""
+
+
+class Snapshots(object):
+    """Takes Frames of an engine's graph.
+
+    Positions and edges are only worked out again when the graph's
+    structure changed, otherwise a snapshot is just the node colours.
+
+    args:
+        orga_engine: orga.Engine
+    """
+
+    def __init__(self, orga_engine):
+        self.engine = orga_engine
+        self.generation = None
+        self.nodes = []
+        self.offsets = np.empty((0, 2))
+        self.segments = np.empty((0, 2, 2))
+
+    def take(self, label=''):
+        graph = self.engine.graph
+        if self.generation is None or self.generation != graph.generation:
+            self._update_structure()
+        facecolors = colors.to_rgba_array([n.color() for n in self.nodes])
+        facecolors[:, 3] = [n.alpha() for n in self.nodes]
+        return Frame(graph.name, label, self.offsets, self.segments, facecolors)
+
+    def _update_structure(self):
+        graph = self.engine.graph
+        self.generation = getattr(graph, 'generation', None)
+        pos = add_noise(positions(self.engine))
+        self.nodes = list(pos)
+        self.offsets = np.array([pos[n] for n in self.nodes]).reshape(-1, 2)
+        self.segments = np.array([
+            (pos[u], pos[v]) for u, v in graph.edges()
+            if u in pos and v in pos]).reshape(-1, 2, 2)
+
+
+class HierarchyRenderer(object):
+    """Draws an engine's graph once and then only updates what changes.
+
+    The node and edge collections are created once; later draws change the
+    node colours and alphas, and the positions and edges only when the
+    graph's structure changed. Every draw returns the artists it changed so
+    it can be used for blitted animations.
+
+    Without an engine it can only show Frames taken elsewhere (eg in
+    another process, see orga.export).
+
+    The axes limits and title are not among the artists; axes_changed
+    tells whether the last draw changed them, so blitted animations know
+    to redraw the whole figure.
+
+    args:
+        ax: matplotlib axes
+        orga_engine: orga.Engine
+    """
+
+    def __init__(self, ax, orga_engine=None):
+        self.ax = ax
+        self.engine = orga_engine
+        self.snapshots = Snapshots(orga_engine) if orga_engine else None
+        self._offsets = None
+        self.axes_changed = False
+
+        self.node_borders = ax.scatter([], [], s=500, c='w', zorder=2)
+        self.node_faces = ax.scatter([], [], s=400, zorder=3)
+        self.edge_borders = LineCollection([], linewidths=4, colors='w', zorder=0)
+        self.edge_lines = LineCollection(
+            [], linewidths=2, colors='r', alpha=0.5, zorder=1)
+        ax.add_collection(self.edge_borders)
+        ax.add_collection(self.edge_lines)
+        self.label = ax.text(
+            0.01, 0.99, '', transform=ax.transAxes, va='top', zorder=4)
+        if orga_engine:
+            ax.set_title(orga_engine.graph.name)
+
+    @property
+    def artists(self):
+        return [self.edge_borders, self.edge_lines, self.node_borders,
+                self.node_faces, self.label]
+
+    def draw(self, label=None):
+        """Brings the artists up to date with the engine."""
+        if label is None:
+            label = self.label.get_text()
+        return self.show(self.snapshots.take(label))
+
+    def show(self, frame):
+        """Sets the artists to a Frame."""
+        self.axes_changed = False
+        if frame.offsets is not self._offsets:
+            self._set_structure(frame.offsets, frame.segments)
+        if frame.title != self.ax.get_title():
+            self.ax.set_title(frame.title)
+            self.axes_changed = True
+        self.node_faces.set_facecolor(frame.facecolors)
+        self.label.set_text(frame.label)
+        return self.artists
+
+    def _set_structure(self, offsets, segments):
+        self._offsets = offsets
+        self.node_borders.set_offsets(offsets)
+        self.node_faces.set_offsets(offsets)
+        self.edge_borders.set_segments(segments)
+        self.edge_lines.set_segments(segments)
+
+        if len(offsets):
+            (x0, y0), (x1, y1) = offsets.min(axis=0), offsets.max(axis=0)
+            margin = 0.05
+            limits = ((x0 - margin, x1 + margin), (y0 - margin, y1 + margin))
+            if limits != (self.ax.get_xlim(), self.ax.get_ylim()):
+                self.ax.set_xlim(*limits[0])
+                self.ax.set_ylim(*limits[1])
+                self.axes_changed = True
+
+
+def plot_animation(fig, ax, orga_engine, iterations=12, interval=1000,
+                   blit=True):
+    """Animate the engine's graph, one frame per iteration.
+
+    Uses a HierarchyRenderer so artists are not recreated every frame.
+    The frames are driven by the engine: with iterations None the animation
+    runs until the engine stops (eg on convergence). With blit the whole
+    figure is still drawn again on frames where the graph outgrew the axes
+    limits or its name changed, as only the renderer's artists are blitted.
+    """
+    renderer = HierarchyRenderer(ax, orga_engine)
+
+    hide_ticks(ax)
+
+    def frames():
+        steps = iter(orga_engine)
+        if iterations is not None:
+            steps = zip(range(iterations), steps)
+        for i, _ in enumerate(steps):
+            yield i
 
     def init():
-        pass
+        return renderer.draw()
 
     def animate(i):
-        next(eng_iter)
-        plot_hierarchy(ax, orga_engine)
-        ax.set_title(i+1)
+        artists = renderer.draw(label=str(i + 1))
+        if blit and renderer.axes_changed:
+            # the blitted background has the old limits and title
+            fig.canvas.draw()
+        return artists
 
     return animation.FuncAnimation(
-        fig, animate, init_func=init, frames=12, interval=1000)
+        fig, animate, init_func=init, frames=frames, interval=interval,
+        blit=blit, save_count=iterations)
+
+
+def hide_ticks(ax):
+    ax.tick_params(
+            axis='both', left=False, top=False, right=False, bottom=False,
+            labelleft=False, labeltop=False, labelright=False, labelbottom=False)
+
+
+class Jitter(object):
+    """A little random noise per node, remembered for the most recent nodes.
+
+    Keeps nodes in consistent places from one image to the next while
+    holding at most maxsize offsets. Draws from its own random generator
+    (seeded by seed), never from the global one the engines may seed from.
+    """
+
+    def __init__(self, scale=1/30, maxsize=100000, seed=0):
+        self.scale = scale
+        self.maxsize = maxsize
+        self._random = random.Random(seed)
+        self._offsets = collections.OrderedDict()
+
+    def __call__(self, node):
+        offset = self._offsets.get(node)
+        if offset is None:
+            offset = self._offsets[node] = (
+                (-0.5 + self._random.random()) * self.scale,
+                (-0.5 + self._random.random()) * self.scale)
+            if len(self._offsets) > self.maxsize:
+                self._offsets.popitem(last=False)
+        else:
+            self._offsets.move_to_end(node)
+        return offset
+
+    def __len__(self):
+        return len(self._offsets)
 
 
-# Map points to noise added to keep consistent node positions in images.
-NOISE_STORE = {}
+JITTER = Jitter()
 
 
-def add_noise(pos_dict):
+def add_noise(pos_dict, jitter=JITTER):
     """Adds a little noise to node location tuples.
 
     Slightly nicer images when the nodes are not placed in perfect locations.
-    pos_dict should be a dict of node to 2D tuple location.
+    pos_dict should be a dict of node to 2D tuple location, a new dict is
+    returned.
     """
-    def noise(x):
-        return x + (-0.5 + random.random())/30
-    for n in pos_dict.keys():
-        pt = pos_dict[n]
-        if not pt in NOISE_STORE:
-            NOISE_STORE[pt] = (noise(pt[0]), noise(pt[1]))
-        pos_dict[n] = NOISE_STORE[pt]
-    return pos_dict
+    noisy = {}
+    for n, (x, y) in pos_dict.items():
+        dx, dy = jitter(n)
+        noisy[n] = (x + dx, y + dy)
+    return noisy
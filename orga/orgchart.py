@@ -0,0 +1,223 @@
+"""
+Org charts as CSV files of employee, manager rows.
+
+load streams a CSV (or tab separated edge list, optionally gzipped) a chunk
+of rows at a time: each row's node is made by node_gen_fn from its id and
+any other columns asked for, and every chunk is added to the Tree in bulk.
+Managers may come after their reportees. Only the tree and a map of ids are
+kept in memory, however long the file.
+
+The rows must make a tree: unique ids, exactly one row without a manager
+(the head) and every other row's manager an id in the file, with every node
+below the head (no cycles). Blank lines are skipped, ValueError is raised
+for rows missing columns or that do not make a tree.
+
+save writes an engine's nodes back out, managers before their reportees,
+with their type and state, and typed() makes a node_gen_fn reading such a
+file back:
+
+    with stream.active():  # if node_gen_fn draws from orga.rng
+        graph, head = orgchart.load('org.csv', generate_employee)
+    engine = orga.Engine.from_graph(graph, head)
+    orgchart.save(engine, 'org_after.csv.gz')
+"""
+
+import contextlib
+import csv
+import gc
+import gzip
+import itertools
+import logging
+
+from orga import orga
+from orga import stats
+from orga import treebase
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 65536
+# state written by save
+FIELDS = ('tribute', 'perf')
+
+
+def _open(path, mode):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', newline='')
+    return open(path, mode, newline='')
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """Pauses the garbage collector, which would otherwise go over every
+    node made so far again and again while millions are created."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _column(header, name, path):
+    try:
+        return header.index(name)
+    except ValueError:
+        raise ValueError('{} has no {} column'.format(path, name)) from None
+
+
+def load(path, node_gen_fn, id_column='id', manager_column='manager',
+         fields=(), delimiter=',', chunk_size=CHUNK_SIZE, graph_cls=None):
+    """Builds the tree of an org chart file, returning (graph, head).
+
+    args:
+        path: CSV file with a header row (gzipped if it ends in .gz)
+        node_gen_fn: creates a node from its id, and the fields as keyword
+            arguments (strings) if any
+        id_column, manager_column: columns of the employee and manager ids
+            (the head's manager is empty)
+        fields: more columns passed to node_gen_fn
+        delimiter: column separator, eg '\\t' for edge lists
+        chunk_size: rows added to the graph at a time
+        graph_cls: class of the graph, eg orga.dag.Dag (default
+            orga.tree.Tree)
+    """
+    if graph_cls is None:
+        from orga import tree
+        graph_cls = tree.Tree
+    graph = graph_cls()
+    nodes = {}
+    # reportees of managers not read yet, by manager id
+    waiting = {}
+    head = None
+    with _gc_paused(), _open(path, 'r') as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError('{} is empty'.format(path))
+        id_i = _column(header, id_column, path)
+        manager_i = _column(header, manager_column, path)
+        field_is = [(name, _column(header, name, path)) for name in fields]
+        columns = 1 + max([id_i, manager_i] + [i for _, i in field_is])
+        while True:
+            rows = [(reader.line_num, row)
+                    for row in itertools.islice(reader, chunk_size)]
+            if not rows:
+                break
+            new = []
+            edges = []
+            for line, row in rows:
+                if len(row) < columns:
+                    if not any(row):
+                        continue  # blank line
+                    raise ValueError('{} line {}: {} columns, not {}'.format(
+                        path, line, len(row), columns))
+                name = row[id_i]
+                if name in nodes:
+                    raise ValueError('{} line {}: duplicate id {!r}'.format(
+                        path, line, name))
+                if field_is:
+                    node = node_gen_fn(name, **{k: row[i] for k, i in field_is})
+                else:
+                    node = node_gen_fn(name)
+                node = nodes[name] = orga.validate_new_node(node)
+                new.append(node)
+                manager = row[manager_i]
+                if not manager:
+                    if head is not None:
+                        raise ValueError(
+                            '{} line {}: {!r} is a second head'.format(
+                                path, line, name))
+                    head = node
+                elif manager in nodes:
+                    edges.append((nodes[manager], node))
+                else:
+                    waiting.setdefault(manager, []).append(node)
+                reportees = waiting.pop(name, None)
+                if reportees:
+                    edges.extend((node, r) for r in reportees)
+            graph.add_nodes_from(new)
+            graph.add_edges_from(edges)
+    if waiting:
+        manager = next(iter(waiting))
+        raise ValueError('{}: unknown manager {!r} ({} ids missing)'.format(
+            path, manager, len(waiting)))
+    if head is None:
+        raise ValueError('{}: no head (a row without a manager)'.format(path))
+    below = len(treebase.subtree(graph, head))
+    if below != len(graph):
+        raise ValueError('{}: {} rows are in cycles, not below the head'.format(
+            path, len(graph) - below))
+    log.debug('loaded %d nodes from %s', len(graph), path)
+    return graph, head
+
+
+def typed(classes):
+    """node_gen_fn for files written by save, with type and state fields.
+
+    The node is of the class named by its 'type' field, made from its id,
+    and any other field is set on it as a float attribute:
+
+        orgchart.load(path, orgchart.typed(classes),
+                      fields=('type',) + orgchart.FIELDS)
+    """
+    by_name = {c.__name__: c for c in classes}
+
+    def make(name, type, **state):
+        try:
+            cls = by_name[type]
+        except KeyError:
+            raise ValueError('unknown type {!r} of {!r}'.format(
+                type, name)) from None
+        node = cls(name)
+        for attr, value in state.items():
+            setattr(node, attr, float(value))
+        return node
+    return make
+
+
+def save(engine, path, fields=FIELDS, id_column='id',
+         manager_column='manager', delimiter=',', chunk_size=CHUNK_SIZE):
+    """Writes the engine's nodes to path, managers first.
+
+    Each row has the node's id (its name, or its index in the file if it
+    has none), its manager's id, its type name and the fields' values.
+    Only trees can be written: ValueError is raised for a node with more
+    than one manager, or without one besides the head (eg in an
+    orga.dag.Dag).
+    """
+    if hasattr(engine, 'sync'):
+        engine.sync()  # orga.parallel keeps the state in shared memory
+    names = set()
+    # id of each node's manager, noted as the manager is written
+    managers = {}
+
+    def rows(entries):
+        for node, children, _ in entries:
+            name = getattr(node, 'name', None)
+            if name is None:
+                name = len(names)
+            name = str(name)
+            if name in names:
+                raise ValueError('duplicate node name {!r}'.format(name))
+            names.add(name)
+            for child in children:
+                if managers.setdefault(child, name) != name:
+                    raise ValueError('{!r} has more than one manager'.format(
+                        getattr(child, 'name', child)))
+            manager = managers.pop(node, '')
+            if not manager and node is not engine.graphHead:
+                raise ValueError('{!r} has no manager'.format(name))
+            yield [name, manager, stats.type_name(node)] + [
+                getattr(node, attr) for attr in fields]
+
+    order = iter(engine.graph.schedule(engine.graphHead).pre_order)
+    with _open(path, 'w') as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        writer.writerow([id_column, manager_column, 'type'] + list(fields))
+        while True:
+            chunk = list(rows(itertools.islice(order, chunk_size)))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+    log.debug('saved %d nodes to %s', len(names), path)
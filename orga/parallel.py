@@ -0,0 +1,365 @@
+"""
+One organisation run by several processes.
+
+Sibling subtrees only meet at their manager, so a ParallelEngine cuts the
+tree at a depth: every subtree below the cut (a shard) is owned by one worker
+process, which runs the work and feedback cycles of its shards, while the
+engine itself only runs the few nodes above the cut. The state of every node
+(the attributes in 'state' and its type) is kept in shared memory, written
+by the worker owning the node, so the processes only exchange a command per
+phase and the state of the shard roots at the cut:
+
+    work:     workers run do_work on their shards (concurrently), then the
+              engine works up from the shard roots' tributes to the head
+    feedback: the engine gives feedback from the head down to the shard
+              roots, then the workers give feedback within their shards
+
+The structure of the tree must stay fixed while the engine runs (models
+changing the graph or its journal raise RuntimeError). Each shard draws from
+a stream of its own spawned from the engine's, so a run depends on the seed
+and the cut depth, not on the number of workers or how shards are assigned.
+
+The engine's own node objects are not updated by the workers, sync() copies
+the shared state into them (done before observing when the engine has a
+convergence criterion or observers).
+
+    with parallel.ParallelEngine(generate_employee, 10, 6, seed=0) as engine:
+        for _ in zip(range(100), engine):
+            print(engine.graphHead.tribute)
+"""
+
+import logging
+import multiprocessing
+import operator
+import os
+
+import numpy as np
+
+from orga import orga
+from orga import rng
+from orga import vector
+
+log = logging.getLogger(__name__)
+
+# attributes of the nodes kept in shared memory
+STATE = ('tribute', 'perf')
+# the default cut is the shallowest layer with this many shards per worker
+SHARDS_PER_WORKER = 4
+
+
+class ParallelEngine(orga.Engine):
+    """An Engine whose subtrees below a cut depth run in worker processes.
+
+    Use it as a context manager (or call close) to stop the workers.
+    """
+
+    def __init__(self, node_gen_fn, graph_k=3, graph_d=3, seed=None,
+                 convergence=None, stop=True, workers=None, cut_depth=None,
+                 state=STATE, classes=()):
+        """
+        args:
+            graph_k, graph_d, seed, convergence, stop: as for orga.Engine
+            workers: number of worker processes, None for the number of
+                cores or 0 to run the shards in this process
+            cut_depth: depth of the shard roots, by default the shallowest
+                with SHARDS_PER_WORKER shards per worker
+            state: float attributes of the nodes to share
+            classes: node classes that may appear during the run besides
+                those in the initial graph (a node's class is shared as its
+                index in these)
+        """
+        stream = rng.Stream(seed)
+        with stream.active():
+            graph = orga.create_hierarchy_graph(graph_k, graph_d, node_gen_fn)
+        self._start(graph, next(iter(graph.nodes)), stream, convergence, stop,
+                    False)
+        self._partition(workers, cut_depth, state, classes)
+
+    @classmethod
+    def from_graph(cls, graph, head=None, seed=None, convergence=None,
+                   stop=True, workers=None, cut_depth=None, state=STATE,
+                   classes=()):
+        """ParallelEngine over an existing tree, see orga.Engine.from_graph."""
+        engine = super().from_graph(graph, head, seed, convergence, stop)
+        engine._partition(workers, cut_depth, state, classes)
+        return engine
+
+    def _partition(self, workers, cut_depth, state, classes):
+        if workers is None:
+            workers = os.cpu_count()
+        order, parent, offsets = vector.level_order(self.graph, self.graphHead)
+        if cut_depth is None:
+            sizes = np.diff(offsets)
+            wide = np.flatnonzero(sizes >= SHARDS_PER_WORKER * max(workers, 1))
+            cut_depth = int(wide[0]) if len(wide) else len(sizes) - 1
+        cut_depth = max(1, min(cut_depth, len(offsets) - 1))
+
+        self.order = order
+        self.cut_depth = cut_depth
+        self.classes = list(dict.fromkeys(
+            list(classes) + [n.__class__ for n in order]))
+        self._codes = {c: i for i, c in enumerate(self.classes)}
+        self._raw = [multiprocessing.RawArray('d', len(order)) for _ in state]
+        self._raw_types = multiprocessing.RawArray('h', len(order))
+        # views of the shared state, in level order
+        self.state = dict(zip(state, (
+            np.frombuffer(raw, dtype=np.float64) for raw in self._raw)))
+        self.types = np.frombuffer(self._raw_types, dtype=np.int16)
+        self._generation = self.graph.generation
+
+        top = offsets[cut_depth]
+        adj = self.graph.adj
+        self._top = [(n, adj[n]) for n in order[:top]]
+        self._roots = np.arange(top, offsets[cut_depth + 1])
+        self._root_nodes = order[top:offsets[cut_depth + 1]]
+        _write(order, np.arange(len(order)), self._shared(), self._codes)
+
+        # shard of every node below the cut, taken from its parent's
+        shard = np.full(len(order), -1, dtype=np.int64)
+        shard[self._roots] = np.arange(len(self._roots))
+        for d in range(cut_depth + 1, len(offsets) - 1):
+            s, e = offsets[d], offsets[d + 1]
+            shard[s:e] = shard[parent[s:e]]
+        below = np.arange(top, len(order))
+        members = np.split(
+            below[np.argsort(shard[top:], kind='stable')],
+            np.cumsum(np.bincount(shard[top:], minlength=len(self._roots)))[:-1])
+        streams = self.rng.spawn(len(self._roots))
+        shards = [
+            (int(root), index, stream)
+            for root, index, stream in zip(self._roots, members, streams)]
+
+        self._workers = []
+        if not shards:
+            return
+        if workers == 0:
+            self._workers.append(_InProcess(_Shards(
+                self.graph, order, shards, self._shared(), self.classes)))
+            return
+        loads = [0] * min(workers, len(shards))
+        assigned = [[] for _ in loads]
+        # largest shards first, each to the least loaded worker
+        for s in sorted(shards, key=lambda s: -len(s[1])):
+            i = loads.index(min(loads))
+            assigned[i].append(s)
+            loads[i] += len(s[1])
+        log.debug('%d shards at depth %d on %d workers, loads %s',
+                  len(shards), cut_depth, len(loads), loads)
+        for own in assigned:
+            self._workers.append(_Process(
+                self.graph, order, own, self._shared(), self.classes))
+
+    def _shared(self):
+        return ([(name, raw) for name, raw in zip(self.state, self._raw)],
+                self._raw_types)
+
+    def _command(self, command):
+        for worker in self._workers:
+            worker.send(command)
+        errors = [e for e in (w.recv() for w in self._workers) if e is not None]
+        if errors:
+            raise errors[0]
+
+    def _check_structure(self):
+        if self.graph.generation != self._generation or len(self.graph.journal):
+            raise RuntimeError('the structure of a ParallelEngine is fixed')
+
+    def _work(self, call=None):
+        self._check_structure()
+        self._command('work')
+        _read(self._root_nodes, self._roots, self._shared(), self.classes)
+        with self.rng.active():
+            for n, children in reversed(self._top):
+                if call is None:
+                    n.do_work(children)
+                else:
+                    call(n, 'do_work', children)
+        self._write_top()
+
+    def _write_top(self):
+        top = len(self._top)
+        _write(self.order[:top], np.arange(top), self._shared(), self._codes)
+
+    def _observe(self):
+        if self.convergence is not None or self.observers:
+            self.sync()
+        super()._observe()
+
+    def _feedback(self, external):
+        track = self.convergence is not None and self.convergence.needs_changes
+        before = self.types.copy() if track else None
+        instrument = self._stats
+        if instrument is None:
+            self._feedback_cycle()
+        else:
+            with instrument.phase('feedback', self):
+                self._feedback_cycle(instrument.call)
+        if track:
+            self.changes = [
+                self.order[i] for i in np.flatnonzero(self.types != before)]
+        self.feedback_due = False
+
+    def _feedback_cycle(self, call=None):
+        with self.rng.active():
+            self.rng.prepare(len(self._top))
+            for n, children in self._top:
+                if call is None:
+                    n.feedback(children, self.graph)
+                else:
+                    call(n, 'feedback', children, self.graph)
+        self._check_structure()
+        self._write_top()
+        _write(self._root_nodes, self._roots, self._shared(), self._codes)
+        self._command('feedback')
+
+    def sync(self):
+        """Copies the shared state into the engine's node objects."""
+        _read(self.order, np.arange(len(self.order)), self._shared(),
+              self.classes)
+
+    def close(self):
+        """Stops the worker processes."""
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _views(shared):
+    arrays, types = shared
+    return ([(name, np.frombuffer(raw, dtype=np.float64))
+             for name, raw in arrays],
+            np.frombuffer(types, dtype=np.int16))
+
+
+def _write(nodes, index, shared, codes):
+    """Writes the state of the nodes to shared memory at their index."""
+    arrays, types = _views(shared)
+    for name, array in arrays:
+        array[index] = list(map(operator.attrgetter(name), nodes))
+    try:
+        types[index] = list(map(
+            codes.__getitem__, map(operator.attrgetter('__class__'), nodes)))
+    except KeyError as e:
+        raise ValueError(
+            '{} is not one of the engine classes'.format(e.args[0])) from None
+
+
+def _read(nodes, index, shared, classes):
+    """Sets the state of the nodes from shared memory at their index."""
+    arrays, types = _views(shared)
+    values = [(name, array[index].tolist()) for name, array in arrays]
+    codes = types[index].tolist()
+    for k, node in enumerate(nodes):
+        for name, column in values:
+            setattr(node, name, column[k])
+        cls = classes[codes[k]]
+        if node.__class__ is not cls:
+            node.__class__ = cls
+
+
+class _Shards(object):
+    """The shards of one worker and their cycles."""
+
+    def __init__(self, graph, order, shards, shared, classes):
+        self.graph = graph
+        self.order = order
+        self.shared = shared
+        self.classes = classes
+        self.codes = {c: i for i, c in enumerate(classes)}
+        self.shards = [
+            (order[root], [order[i] for i in index], index, stream)
+            for root, index, stream in shards]
+        self.roots = np.array([root for root, _, _ in shards])
+        self.root_nodes = [order[root] for root in self.roots]
+        self.generation = graph.generation
+
+    def work(self):
+        for root, nodes, index, stream in self.shards:
+            with stream.active():
+                orga.work_cycle(self.graph, root)
+            _write(nodes, index, self.shared, self.codes)
+
+    def feedback(self):
+        _read(self.root_nodes, self.roots, self.shared, self.classes)
+        for root, nodes, index, stream in self.shards:
+            with stream.active():
+                stream.prepare(len(index))
+                orga.feedback_cycle(self.graph, root)
+            if (self.graph.generation != self.generation or
+                    len(self.graph.journal)):
+                raise RuntimeError('the structure of a ParallelEngine is fixed')
+            _write(nodes, index, self.shared, self.codes)
+
+
+class _InProcess(object):
+    """Runs the shards in this process, like a worker."""
+
+    def __init__(self, shards):
+        self.shards = shards
+        self._error = None
+
+    def send(self, command):
+        try:
+            getattr(self.shards, command)()
+            self._error = None
+        except Exception as e:
+            self._error = e
+
+    def recv(self):
+        return self._error
+
+    def close(self):
+        pass
+
+
+class _Process(object):
+    """A worker process running some shards on command."""
+
+    def __init__(self, graph, order, shards, shared, classes):
+        self._conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_serve, args=(child, graph, order, shards, shared, classes),
+            daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, command):
+        self._conn.send(command)
+
+    def recv(self):
+        return self._conn.recv()
+
+    def close(self):
+        try:
+            self._conn.send(None)
+        except OSError:
+            pass
+        self._conn.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def _serve(conn, graph, order, shards, shared, classes):
+    """Main of a worker: runs its shards' cycles on command."""
+    shards = _Shards(graph, order, shards, shared, classes)
+    try:
+        while True:
+            command = conn.recv()
+            if command is None:
+                break
+            try:
+                getattr(shards, command)()
+                conn.send(None)
+            except Exception as e:
+                conn.send(e)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
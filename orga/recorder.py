@@ -0,0 +1,272 @@
+"""
+Records observables of engines to disk as they run.
+
+A Recorder is added to an engine's observers and samples the engine every
+'every' iterations. Rows are buffered per column and appended to a
+ColumnStore in chunks, so a recorder holds at most chunk_size rows in
+memory whatever the length or number of runs.
+
+A ColumnStore is a directory with one raw binary file per column of each
+table and a schema.json describing them; read() returns a table as a pandas
+DataFrame. Recorders write three tables, all keyed by run and iteration:
+
+    iterations: the scalar observables (head tribute, node count, depth...)
+    layers: per layer node count and mean perf
+    types: per layer count of each node type
+
+Each recorder opening a store takes the next run number so many runs (eg
+of a parameter sweep) can be appended to the same store, one writer at a
+time.
+"""
+
+import collections
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+from orga import stats
+
+log = logging.getLogger(__name__)
+
+
+def head_tribute(engine):
+    return engine.graphHead.tribute
+
+
+def node_count(engine):
+    return len(engine.graph)
+
+
+def depth(engine):
+    """Number of layers of the tree."""
+    return 1 + max(d for _, _, d in engine.graph.schedule(engine.graphHead).pre_order)
+
+
+OBSERVE = collections.OrderedDict([
+    ('head_tribute', head_tribute),
+    ('nodes', node_count),
+    ('depth', depth),
+])
+
+
+class ColumnStore(object):
+    """Tables of columns appended to files in a directory.
+
+    args:
+        path: directory, created if missing
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(self._schema_path()) as f:
+                self.schema = json.load(f)
+        except FileNotFoundError:
+            self.schema = {'runs': 0, 'tables': {}, 'categories': {}}
+        # tables whose columns were made the same length for appending
+        self._aligned = set()
+
+    def _schema_path(self):
+        return os.path.join(self.path, 'schema.json')
+
+    def _column_path(self, table, column):
+        return os.path.join(self.path, '{}.{}.bin'.format(table, column))
+
+    def new_run(self):
+        run = self.schema['runs']
+        self.schema['runs'] += 1
+        self._write_schema()
+        return run
+
+    def category(self, name, value):
+        """Code of a value of a categorical column."""
+        values = self.schema['categories'].setdefault(name, [])
+        try:
+            return values.index(value)
+        except ValueError:
+            values.append(value)
+            return len(values) - 1
+
+    def append(self, table, columns):
+        """Appends (name, dtype, values) columns of the same length."""
+        if table not in self._aligned:
+            self._align(table)
+        schema = self.schema['tables'].setdefault(table, {})
+        for name, dtype, values in columns:
+            dtype = np.dtype(dtype).str
+            if schema.setdefault(name, dtype) != dtype:
+                raise ValueError('{}.{} is {} not {}'.format(
+                    table, name, schema[name], dtype))
+            with open(self._column_path(table, name), 'ab') as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+        self._write_schema()
+
+    def _align(self, table):
+        """Truncates the table's columns to the rows all of them have.
+
+        An interrupted append may have left some columns longer, which
+        would misalign every row appended after them.
+        """
+        schema = self.schema['tables'].get(table, {})
+        sizes = {}
+        for name in schema:
+            try:
+                sizes[name] = os.path.getsize(self._column_path(table, name))
+            except FileNotFoundError:
+                sizes[name] = 0
+        itemsize = {n: np.dtype(d).itemsize for n, d in schema.items()}
+        rows = min((sizes[n] // itemsize[n] for n in schema), default=0)
+        for name, size in sizes.items():
+            if size != rows * itemsize[name]:
+                log.warning('%s: dropping the unfinished rows of %s.%s',
+                            self.path, table, name)
+                with open(self._column_path(table, name), 'ab') as f:
+                    f.truncate(rows * itemsize[name])
+        self._aligned.add(table)
+
+    def _write_schema(self):
+        tmp = self._schema_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.schema, f)
+        os.replace(tmp, self._schema_path())
+
+    def columns(self, table):
+        """Dict of column name to array, memory mapped."""
+        schema = self.schema['tables'].get(table)
+        if schema is None:
+            raise KeyError(table)
+        columns = collections.OrderedDict()
+        for name, dtype in schema.items():
+            path = self._column_path(table, name)
+            if os.path.getsize(path):
+                columns[name] = np.memmap(path, dtype=dtype, mode='r')
+            else:
+                columns[name] = np.empty(0, dtype=dtype)
+        # an interrupted append may have left some columns longer
+        rows = min(len(c) for c in columns.values())
+        return collections.OrderedDict((n, c[:rows]) for n, c in columns.items())
+
+
+def read(path, table='iterations'):
+    """A table of a ColumnStore as a pandas DataFrame."""
+    import pandas as pd
+
+    store = ColumnStore(path)
+    columns = store.columns(table)
+    for name, values in columns.items():
+        categories = store.schema['categories'].get(name)
+        if categories is not None:
+            columns[name] = pd.Categorical.from_codes(values, categories)
+        else:
+            columns[name] = np.array(values)
+    return pd.DataFrame(columns)
+
+
+class Recorder(object):
+    """Observer of an engine appending samples to a ColumnStore.
+
+    args:
+        path: directory of the ColumnStore
+        every: sample every n iterations
+        observe: dict of name to function of the engine recorded in the
+            iterations table, OBSERVE by default
+        layers: also record the layers and types tables (a pass over the
+            nodes per sample)
+        chunk_size: rows buffered before they are written
+        run: run number, by default the next of the store
+    """
+
+    def __init__(self, path, every=1, observe=None, layers=True,
+                 chunk_size=4096, run=None):
+        self.store = ColumnStore(path)
+        self.every = every
+        self.observe = OBSERVE if observe is None else observe
+        self.layers = layers
+        self.chunk_size = chunk_size
+        self.run = self.store.new_run() if run is None else run
+        self._rows = {'iterations': 0, 'layers': 0, 'types': 0}
+        self._buffers = {
+            'iterations': collections.OrderedDict(
+                [('iteration', [])] + [(n, []) for n in self.observe]),
+            'layers': collections.OrderedDict(
+                (n, []) for n in ('iteration', 'layer', 'nodes', 'mean_perf')),
+            'types': collections.OrderedDict(
+                (n, []) for n in ('iteration', 'layer', 'type', 'count')),
+        }
+
+    def attach(self, engine):
+        """Adds the recorder to the engine's observers."""
+        engine.observers.append(self)
+        return self
+
+    def update(self, engine):
+        if engine.iteration % self.every:
+            return
+        iteration = engine.iteration
+        rows = self._buffers['iterations']
+        rows['iteration'].append(iteration)
+        for name, fn in self.observe.items():
+            rows[name].append(fn(engine))
+        self._rows['iterations'] += 1
+        if self.layers:
+            self._sample_layers(engine, iteration)
+        if max(self._rows.values()) >= self.chunk_size:
+            self.flush()
+
+    def _sample_layers(self, engine, iteration):
+        counts = collections.defaultdict(collections.Counter)
+        perf = collections.defaultdict(float)
+        for node, _, d in engine.graph.schedule(engine.graphHead).pre_order:
+            counts[d][stats.type_name(node)] += 1
+            perf[d] += getattr(node, 'perf', math.nan)
+
+        layers, types = self._buffers['layers'], self._buffers['types']
+        for d in sorted(counts):
+            nodes = sum(counts[d].values())
+            for column, value in zip(
+                    layers.values(), (iteration, d, nodes, perf[d] / nodes)):
+                column.append(value)
+            for name, count in sorted(counts[d].items()):
+                code = self.store.category('type', name)
+                for column, value in zip(
+                        types.values(), (iteration, d, code, count)):
+                    column.append(value)
+        self._rows['layers'] += len(counts)
+        self._rows['types'] += sum(len(c) for c in counts.values())
+
+    def flush(self):
+        """Writes the buffered rows."""
+        for table, buffer in self._buffers.items():
+            rows = self._rows[table]
+            if not rows:
+                continue
+            columns = [('run', np.int32, np.full(rows, self.run))]
+            for name, values in buffer.items():
+                dtype = _DTYPES.get(name, np.float64)
+                columns.append((name, dtype, np.array(values, dtype=dtype)))
+                del values[:]
+            self.store.append(table, columns)
+            self._rows[table] = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_DTYPES = {
+    'iteration': np.int64,
+    'layer': np.int32,
+    'nodes': np.int64,
+    'depth': np.int32,
+    'type': np.int16,
+    'count': np.int64,
+}
@@ -0,0 +1,120 @@
+"""
+Random streams owned by engines.
+
+Each engine owns a Stream and makes it the active stream of its thread while
+it runs its nodes, so models draw with orga.rng.random()/choice() rather than
+from the global random module. Uniforms are drawn from NumPy in batches (one
+per feedback cycle) and handed out by index.
+
+Outside of an engine the functions fall back to the global random module.
+"""
+
+import contextlib
+import random as _random
+import threading
+
+import numpy as np
+
+_local = threading.local()
+
+
+class Stream(object):
+    """A seedable, spawnable source of uniforms drawn in batches.
+
+    With no seed the stream is seeded from the global random module, so
+    random.seed() still makes a run repeatable.
+    """
+
+    def __init__(self, seed=None, batch_size=1024):
+        if seed is None:
+            seed = _random.getrandbits(64)
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed_seq = seed
+        self.generator = np.random.Generator(np.random.PCG64(seed))
+        self.batch_size = batch_size
+        self._uniforms = []
+        self._cursor = 0
+
+    def state(self):
+        """Everything needed to continue the stream, see from_state."""
+        seed_seq = self.seed_seq
+        entropy = seed_seq.entropy
+        if not isinstance(entropy, int):
+            entropy = [int(e) for e in entropy]
+        return {
+            'entropy': entropy,
+            'spawn_key': list(seed_seq.spawn_key),
+            'n_children_spawned': seed_seq.n_children_spawned,
+            'bit_generator': self.generator.bit_generator.state,
+            'batch_size': self.batch_size,
+            'uniforms': list(self._uniforms),
+            'cursor': self._cursor,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """A stream continuing from state()."""
+        seed_seq = np.random.SeedSequence(
+            state['entropy'], spawn_key=tuple(state['spawn_key']),
+            n_children_spawned=state['n_children_spawned'])
+        stream = cls(seed_seq, state['batch_size'])
+        stream.generator.bit_generator.state = state['bit_generator']
+        stream._uniforms = list(state['uniforms'])
+        stream._cursor = state['cursor']
+        return stream
+
+    def spawn(self, n):
+        """n independent child streams."""
+        return [Stream(s, self.batch_size) for s in self.seed_seq.spawn(n)]
+
+    def prepare(self, n):
+        """Draw the next batch of at least n uniforms in one call.
+
+        Anything left of the previous batch is dropped so every batch starts
+        at index 0 (eg a feedback cycle's draws do not depend on how many the
+        previous cycle used).
+        """
+        self._uniforms = self.generator.random(max(n, 1)).tolist()
+        self._cursor = 0
+
+    def random(self):
+        """Next uniform of the current batch."""
+        cursor = self._cursor
+        if cursor == len(self._uniforms):
+            self.prepare(self.batch_size)
+            cursor = 0
+        self._cursor = cursor + 1
+        return self._uniforms[cursor]
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    @contextlib.contextmanager
+    def active(self):
+        """Make this the stream used by the module functions in this thread."""
+        previous = getattr(_local, 'stream', None)
+        _local.stream = self
+        try:
+            yield self
+        finally:
+            _local.stream = previous
+
+
+def active():
+    """The stream of the engine running in this thread, if any."""
+    return getattr(_local, 'stream', None)
+
+
+def random():
+    stream = getattr(_local, 'stream', None)
+    if stream is None:
+        return _random.random()
+    return stream.random()
+
+
+def choice(seq):
+    stream = getattr(_local, 'stream', None)
+    if stream is None:
+        return _random.choice(seq)
+    return stream.choice(seq)
@@ -0,0 +1,126 @@
+"""
+Instrumentation of an Engine.
+
+Engine.start_stats() makes the engine time each phase of its cycles (work,
+observe for the convergence check and observers, feedback and journal),
+every do_work/feedback call by node type and count the graph mutations of
+each feedback cycle. The results are kept in a Stats object (Engine.stats).
+Without it the engine runs its plain loops so the instrumentation costs
+nothing when off.
+
+Functions in Stats.on_start and Stats.on_stop are called around each
+phase, eg to start an external profiler only for the feedback cycles.
+"""
+
+import collections
+import contextlib
+import time
+
+
+def type_name(node):
+    """Name of a node's type, its class name unless it has a type_name."""
+    return getattr(node, 'type_name', None) or node.__class__.__name__
+
+
+class Timing(object):
+    """Count and total, max seconds of something timed."""
+    __slots__ = ('count', 'seconds', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.
+        self.max = 0.
+
+    def add(self, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.seconds / self.count if self.count else 0.
+
+    def as_dict(self):
+        return {'count': self.count, 'seconds': self.seconds,
+                'mean': self.mean, 'max': self.max}
+
+
+class Stats(object):
+    """Timings and counts of an instrumented engine.
+
+    args:
+        per_node: also total the time spent in each node (see hottest)
+
+    attributes:
+        phases: phase name to Timing
+        calls: (type name, method) to Timing of the nodes' calls
+        mutations: graph changes made by each feedback cycle (including
+            applying the journal)
+        journal: journal operations applied after each feedback cycle
+        on_start: functions (phase, engine) called as a phase starts
+        on_stop: functions (phase, engine, seconds) called as it ends
+    """
+
+    def __init__(self, per_node=False):
+        self.phases = collections.OrderedDict()
+        self.calls = collections.defaultdict(Timing)
+        self.nodes = collections.Counter() if per_node else None
+        self.mutations = []
+        self.journal = []
+        self.on_start = []
+        self.on_stop = []
+
+    @contextlib.contextmanager
+    def phase(self, name, engine):
+        """Times the block as the given phase."""
+        for fn in self.on_start:
+            fn(name, engine)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            timing = self.phases.get(name)
+            if timing is None:
+                timing = self.phases[name] = Timing()
+            timing.add(seconds)
+            for fn in self.on_stop:
+                fn(name, engine, seconds)
+
+    def call(self, node, method, *args):
+        """Calls node.method(*args), timing it."""
+        start = time.perf_counter()
+        getattr(node, method)(*args)
+        seconds = time.perf_counter() - start
+        self.calls[(type_name(node), method)].add(seconds)
+        if self.nodes is not None:
+            self.nodes[node] += seconds
+
+    def hottest(self, n=10):
+        """The n nodes most time was spent in, with their seconds."""
+        if self.nodes is None:
+            raise ValueError('per node times are not recorded')
+        return self.nodes.most_common(n)
+
+    def as_dict(self):
+        return {
+            'phases': {k: t.as_dict() for k, t in self.phases.items()},
+            'calls': {
+                '{}.{}'.format(*k): t.as_dict() for k, t in self.calls.items()},
+            'mutations': list(self.mutations),
+            'journal': list(self.journal),
+        }
+
+    def report(self):
+        """The timings as a table, slowest first."""
+        lines = ['{:<24} {:>10} {:>12} {:>12}'.format(
+            'phase / call', 'count', 'seconds', 'mean us')]
+        rows = list(self.phases.items()) + [
+            ('{}.{}'.format(*k), t) for k, t in self.calls.items()]
+        for name, timing in sorted(rows, key=lambda r: -r[1].seconds):
+            lines.append('{:<24} {:>10} {:>12.6f} {:>12.3f}'.format(
+                name, timing.count, timing.seconds, timing.mean * 1e6))
+        lines.append('mutations {} in {} feedback cycles'.format(
+            sum(self.mutations), len(self.mutations)))
+        return '\n'.join(lines)
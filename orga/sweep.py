@@ -0,0 +1,200 @@
+"""
+Parameter sweeps with results cached on disk.
+
+A sweep runs a function over a grid of configs (dicts of JSON values) on a
+pool of processes. Every result is written to the cache directory as soon as
+it is done, under a hash of its config and of the source of the code that
+produced it (including the engine's, see CORE), so running a sweep again
+(after changing the grid or the model, or after an interruption) only
+computes the cells that are new or changed.
+
+    configs = sweep.grid(
+        model='examples.basic_model:generate_employee',
+        graph_k=[3, 5], graph_d=[3, 4], seed=range(10), iterations=75)
+    results = sweep.Sweep(sweep.simulate, 'cache').run(configs)
+"""
+
+import concurrent.futures
+import contextlib
+import hashlib
+import importlib.util
+import inspect
+import itertools
+import json
+import logging
+import os
+import pickle
+import pkgutil
+import sys
+
+from orga import checkpoint
+from orga import orga
+
+log = logging.getLogger(__name__)
+
+# every module of the orga package, loaded or not (eg orga.dag only when a
+# model uses it), is part of every result's key; code outside the package
+# only is when it is fn's module, a config's 'model' or in Sweep's modules
+CORE = tuple(sorted(
+    'orga.' + m.name
+    for m in pkgutil.iter_modules([os.path.dirname(__file__)])))
+
+
+def grid(**params):
+    """Configs of every combination of the params' values.
+
+    Lists, tuples and ranges are values to sweep over, anything else is
+    the same in every config.
+    """
+    names = list(params)
+    values = [
+        list(v) if isinstance(v, (list, tuple, range)) else [v]
+        for v in params.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def simulate(config):
+    """Runs one cell of a model sweep, returning the head tribute trace.
+
+    config keys:
+        model: 'module:function' creating nodes (the node_gen_fn)
+        graph_k, graph_d, seed: as for orga.Engine; seed is required so
+            the cached result is the one a run would give
+        iterations: number of cycles
+        rates: optional {class name: {attribute: value}} set on the model
+            module's classes while running (eg WORK_RATE, MGMT_RATE)
+    """
+    if config.get('seed') is None:
+        raise ValueError('config has no seed: {}'.format(config))
+    node_gen_fn = checkpoint.resolve(config['model'])
+    module = sys.modules[node_gen_fn.__module__]
+    with class_attributes(module, config.get('rates', {})):
+        engine = orga.Engine(
+            node_gen_fn, config.get('graph_k', 3), config.get('graph_d', 3),
+            seed=config['seed'])
+        return [
+            engine.graphHead.tribute
+            for _ in zip(range(config['iterations']), engine)]
+
+
+@contextlib.contextmanager
+def class_attributes(module, attributes):
+    """Sets {class name: {attribute: value}} on a module's classes."""
+    saved = []
+    try:
+        for name, values in attributes.items():
+            cls = getattr(module, name)
+            for attr, value in values.items():
+                saved.append((cls, attr, getattr(cls, attr)))
+                setattr(cls, attr, value)
+        yield
+    finally:
+        for cls, attr, value in reversed(saved):
+            setattr(cls, attr, value)
+
+
+def source_hash(*modules):
+    """Hash of the source of modules (or other objects with source).
+
+    Module names are hashed from their file, without importing them.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        if isinstance(module, str):
+            with open(importlib.util.find_spec(module).origin, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(inspect.getsource(module).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Sweep(object):
+    """Runs fn over configs, caching each result on disk.
+
+    args:
+        fn: picklable function of a config returning a picklable result
+        path: cache directory, created if missing
+        modules: more modules (or module names) whose source is part of
+            every result's key (fn's module and CORE always are, as is the
+            module of a config's 'model'), eg modules the model imports
+        workers: number of processes, None for all cores or 0 to run in
+            this process
+    """
+
+    def __init__(self, fn, path, modules=(), workers=None):
+        self.fn = fn
+        self.path = path
+        self.workers = workers
+        self.code = source_hash(
+            sys.modules[fn.__module__], *(CORE + tuple(modules)))
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, config):
+        digest = hashlib.sha256(self.code.encode('ascii'))
+        digest.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+        model = config.get('model')
+        if isinstance(model, str):
+            digest.update(source_hash(
+                sys.modules[checkpoint.resolve(model).__module__]).encode('ascii'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.path, key + '.pickle')
+
+    def cached(self, config):
+        """(True, result) if the config's result is cached, else (False, None)."""
+        try:
+            with open(self._path(self.key(config)), 'rb') as f:
+                return True, pickle.load(f)['result']
+        except FileNotFoundError:
+            return False, None
+
+    def _store(self, key, config, result):
+        path = self._path(key)
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump({'config': config, 'result': result}, f)
+        os.replace(tmp, path)
+
+    def run(self, configs, callback=None):
+        """Results of fn for each config, in order.
+
+        Cached results are loaded, the others computed and stored as they
+        finish. callback(config, result) is called for each computed cell.
+        """
+        keys = [self.key(c) for c in configs]
+        results = {}
+        todo = {}
+        for key, config in zip(keys, configs):
+            if key in results or key in todo:
+                continue
+            found, result = self.cached(config)
+            if found:
+                results[key] = result
+            else:
+                todo[key] = config
+        log.info('%d cells cached, %d to run', len(results), len(todo))
+
+        def done(key, result):
+            self._store(key, todo[key], result)
+            results[key] = result
+            if callback:
+                callback(todo[key], result)
+
+        if self.workers == 0:
+            for key, config in todo.items():
+                done(key, self.fn(config))
+        elif todo:
+            workers = self.workers or os.cpu_count()
+            with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+                futures = {
+                    pool.submit(self.fn, config): key
+                    for key, config in todo.items()}
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        done(futures[future], future.result())
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+        return [results[key] for key in keys]
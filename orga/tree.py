@@ -1,16 +1,130 @@
+import itertools
+
 import networkx as nx
 
+# the tree structure independent parts, also used as tree.*
+from orga.treebase import (  # noqa: F401
+    CHANGE_LOG_SIZE, Journal, Schedule, TreeBase, preorder, subtree)
+
 
-class Tree(nx.DiGraph):
+class Tree(TreeBase, nx.DiGraph):
     """
     Extends networkx DiGraph to implement a tree.
 
-    Would prefer to implement own b-tree (\o/) but keeping with networkx
-    leaves opening using different graphs for different cases in future.
+    Would prefer to implement own b-tree (\\o/) but keeping with networkx
+    leaves opening using different graphs for different cases in future
+    (see orga.native.NativeTree for a tree of its own).
+
+    See TreeBase for the schedules, change log and journal.
     """
 
+    def __init__(self, *args, **kwargs):
+        self._start_tracking()
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def from_children(cls, nodes, n_children, children, **attr):
+        """Tree of nodes built in bulk from arrays.
+
+        args:
+            nodes: the nodes in graph order
+            n_children: number of children of each node
+            children: flat indices into nodes of every node's children, in
+                order
+        """
+        graph = cls(**attr)
+        succ, pred = graph._succ, graph._pred
+        for node in nodes:
+            graph._node[node] = {}
+            succ[node] = {}
+            pred[node] = {}
+        children = iter(map(nodes.__getitem__, children))
+        for node, count in zip(nodes, n_children):
+            if count:
+                adj = succ[node]
+                for child in itertools.islice(children, count):
+                    adj[child] = pred[child][node] = {}
+        graph._changed()
+        return graph
+
+    def parent(self, node):
+        """The node's manager, None for the head."""
+        for p in self.pred[node]:
+            return p
+        return None
+
+    def add_node(self, node_for_adding, **attr):
+        super().add_node(node_for_adding, **attr)
+        self._changed(())
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        super().add_nodes_from(nodes_for_adding, **attr)
+        self._changed(())
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        super().add_edge(u_of_edge, v_of_edge, **attr)
+        self._changed((u_of_edge,))
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        parents = set()
+        super().add_edges_from(_noting_parents(ebunch_to_add, parents), **attr)
+        self._changed(parents)
+
+    def remove_edge(self, u, v):
+        super().remove_edge(u, v)
+        self._changed((u,))
+
+    def remove_edges_from(self, ebunch):
+        parents = set()
+        super().remove_edges_from(_noting_parents(ebunch, parents))
+        self._changed(parents)
+
     def remove_node(self, node):
-        children = self.adj[node]
-        for n in list(children):
-            self.remove_node(n)
-        super().remove_node(node)
+        """Removes the node and everything below it."""
+        self.remove_subtrees([node])
+
+    def remove_subtrees(self, nodes):
+        """Removes the nodes and everything below them in one pass."""
+        adj = self.adj
+        removed = set()
+        stack = [n for n in nodes if n in self]
+        parents = {self.parent(n) for n in stack}
+        while stack:
+            n = stack.pop()
+            if n not in removed:
+                removed.add(n)
+                stack.extend(adj[n])
+        super().remove_nodes_from(removed)
+        self._changed(parents - removed)
+
+    def replace_node(self, old, new):
+        """Puts new in the place of old, keeping its position and reportees."""
+        parent = self.parent(old)
+        self._node[new] = self._node.pop(old)
+        self._succ[new] = children = self._succ.pop(old)
+        self._pred[new] = self._pred.pop(old)
+        for child in children:
+            pred = self._pred[child]
+            pred[new] = pred.pop(old)
+        if parent is not None:
+            siblings = self._succ[parent]
+            items = list(siblings.items())
+            siblings.clear()
+            siblings.update((new if n == old else n, d) for n, d in items)
+        self._changed((parent, new))
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        parents = {self.parent(n) for n in nodes if n in self}
+        super().remove_nodes_from(nodes)
+        self._changed(parents.difference(nodes))
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
+def _noting_parents(edges, parents):
+    for edge in edges:
+        parents.add(edge[0])
+        yield edge
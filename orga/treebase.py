@@ -0,0 +1,223 @@
+"""
+What the engine needs of a tree, however the tree is stored.
+
+TreeBase gives a tree (orga.tree.Tree, over networkx, or
+orga.native.NativeTree) its generation, change log, cached schedules and
+journal; Schedule, preorder and subtree only walk a graph's adj. Nothing
+here imports networkx, so the simulation core loads without it.
+"""
+
+import collections
+
+# Number of changes remembered for Tree.changes_since
+CHANGE_LOG_SIZE = 1024
+
+
+class TreeBase(object):
+    """What the engine needs of a tree besides its structure.
+
+    Traversal orders are cached per root (see schedule) and dropped whenever
+    the tree is changed through its mutating methods, which call _changed
+    to also bump 'generation' so iterating code can notice changes.
+
+    The nodes whose children changed are also logged per generation so
+    caches of the tree (eg layouts) can update only what changed, see
+    changes_since.
+
+    Changes can also be queued in 'journal' while the tree is being iterated
+    and applied together afterwards.
+    """
+
+    def _start_tracking(self):
+        self.generation = 0
+        self._schedules = {}
+        self._log = collections.deque(maxlen=CHANGE_LOG_SIZE)
+        self.journal = Journal(self)
+
+    def _changed(self, parents=None):
+        """Record a change, parents being the nodes whose children changed.
+
+        None means the change is unknown.
+        """
+        self.generation += 1
+        self._schedules.clear()
+        self._log.append((self.generation, parents))
+
+    def changes_since(self, generation):
+        """Nodes whose children changed since generation.
+
+        Returns None if that is no longer known (too long ago or the tree
+        was cleared).
+        """
+        parents = set()
+        if generation == self.generation:
+            return parents
+        if not self._log or self._log[0][0] > generation + 1:
+            return None
+        for g, changed in reversed(self._log):
+            if g <= generation:
+                break
+            if changed is None:
+                return None
+            parents.update(changed)
+        parents.discard(None)
+        return parents
+
+    def schedule(self, root):
+        """Cached Schedule of the tree below root."""
+        schedule = self._schedules.get(root)
+        if schedule is None:
+            schedule = self._schedules[root] = Schedule(self, root)
+        return schedule
+
+    def work_order(self, nodes):
+        """The nodes in the graph and all their managers, deepest first."""
+        depth = {}
+        for n in nodes:
+            if n in depth or n not in self:
+                continue
+            path = []
+            while n is not None and n not in depth:
+                path.append(n)
+                n = self.parent(n)
+            d = -1 if n is None else depth[n]
+            for p in reversed(path):
+                d += 1
+                depth[p] = d
+        return sorted(depth, key=depth.get, reverse=True)
+
+
+class Journal(object):
+    """Changes to a tree queued while it is iterated.
+
+    Models call these from 'feedback' and the engine applies them all
+    between cycles: replacements first, then additions and finally removals
+    (of whole subtrees, in one pass). Operations on nodes that are no
+    longer in the tree by then are skipped.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._replaced = []
+        self._added = []
+        self._removed = []
+
+    def add_edge(self, parent, child):
+        self._added.append((parent, child))
+
+    def remove_node(self, node):
+        self._removed.append(node)
+
+    def replace_node(self, old, new):
+        self._replaced.append((old, new))
+
+    def __len__(self):
+        return len(self._replaced) + len(self._added) + len(self._removed)
+
+    def apply(self, changes=None):
+        """Applies the queued changes, returning how many there were.
+
+        If a changes list is given the nodes whose work is affected (new
+        nodes and the managers of added or removed ones) are appended to it.
+        """
+        graph = self.graph
+        count = len(self)
+        replaced, self._replaced = self._replaced, []
+        added, self._added = self._added, []
+        removed, self._removed = self._removed, []
+
+        for old, new in replaced:
+            if old in graph:
+                graph.replace_node(old, new)
+                if changes is not None:
+                    changes.append(new)
+
+        added = [(p, c) for p, c in added if p in graph]
+        if added:
+            graph.add_edges_from(added)
+            if changes is not None:
+                changes.extend(c for _, c in added)
+
+        removed = [n for n in removed if n in graph]
+        if removed:
+            if changes is not None:
+                changes.extend(graph.parent(n) for n in removed)
+            graph.remove_subtrees(removed)
+        return count
+
+
+class Schedule(object):
+    """Flat traversal orders of a tree below a root.
+
+    post_order holds (node, children) pairs with the children before their
+    parent, pre_order holds (node, children, depth) triples with the parent
+    before its children. Both follow the child order of the graph, so
+    iterating them is equivalent to recursing over the tree. The children
+    are the graph's own adjacency views.
+    """
+
+    def __init__(self, graph, root):
+        adj = graph.adj
+        self.generation = getattr(graph, 'generation', None)
+        self.root = root
+        self.pre_order = preorder(adj, root)
+
+        post_order = []
+        stack = [(root, iter(adj[root]))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, _END)
+            if child is _END:
+                stack.pop()
+                post_order.append((node, adj[node]))
+            else:
+                stack.append((child, iter(adj[child])))
+        self.post_order = post_order
+
+    def __len__(self):
+        return len(self.pre_order)
+
+    @staticmethod
+    def patch(graph, order, i, node, depth):
+        """Replace the old subtree below order[i-1] (node) in a copy of
+        pre_order with the current one."""
+        end = i
+        while end < len(order) and order[end][2] > depth:
+            end += 1
+        if node in graph:
+            order[i:end] = [
+                entry
+                for child in graph.adj[node]
+                for entry in preorder(graph.adj, child, depth + 1)]
+        else:
+            del order[i:end]
+
+
+_END = object()
+
+
+def preorder(adj, root, depth=0):
+    """(node, children, depth) triples of the subtree below root."""
+    order = []
+    stack = [(root, depth)]
+    while stack:
+        node, depth = stack.pop()
+        children = adj[node]
+        order.append((node, children, depth))
+        stack.extend((c, depth + 1) for c in reversed(list(children)))
+    return order
+
+
+def subtree(graph, node):
+    """All the nodes below and including node, once each."""
+    if hasattr(graph, 'subtree'):
+        return graph.subtree(node)  # eg orga.native.NativeTree
+    adj = graph.adj
+    nodes = [node]
+    seen = {node}
+    for n in nodes:
+        for child in adj[n]:
+            if child not in seen:
+                seen.add(child)
+                nodes.append(child)
+    return nodes
@@ -0,0 +1,262 @@
+"""
+Array backed alternative to orga.orga.Engine.
+
+Rather than walking a graph of node objects the hierarchy is stored as level
+ordered NumPy arrays (parent index, type code, tribute and perf) and each
+layer of the work and feedback cycles is applied as one batched operation.
+
+Nodes are ordered breadth first so that every layer is a contiguous slice and
+the children of a node are a contiguous run inside the next layer. Models are
+described by a RateTable of per-type rates rather than by classes.
+"""
+
+import numpy as np
+
+from orga import orga
+from orga import rng
+
+
+class RateTable(object):
+    """Per-type rates describing a model for the ArrayEngine.
+
+    The position of a type in the table is its type code.
+
+    args:
+        names: name of each type
+        work_rate: tribute of a node of that type with no reportees
+        mgmt_rate: multiplier of the reportees' tribute for managers
+        colors: plotting colour of each type
+        replacements: type codes a node is randomly replaced with after a
+            bad performance review (also used to populate new graphs)
+        head: type code of the head of the graph
+    """
+
+    def __init__(self, names, work_rate, mgmt_rate, colors=None,
+                 replacements=None, head=0):
+        self.names = list(names)
+        self.work_rate = np.asarray(work_rate, dtype=np.float64)
+        self.mgmt_rate = np.asarray(mgmt_rate, dtype=np.float64)
+        self.colors = list(colors) if colors is not None else [None] * len(self.names)
+        if replacements is None:
+            replacements = [c for c in range(len(self.names)) if c != head]
+        self.replacements = np.asarray(replacements, dtype=np.int64)
+        self.head = head
+
+    @classmethod
+    def from_classes(cls, classes, replacements=None, head=None):
+        """Build a table from node classes with WORK_RATE/MGMT_RATE/COLOR.
+
+        args:
+            classes: node classes, in type code order
+            replacements: classes new nodes are drawn from
+            head: class of the head (defaults to the first class)
+        """
+        classes = list(classes)
+        head = classes[0] if head is None else head
+        if replacements is not None:
+            replacements = [classes.index(c) for c in replacements]
+        return cls(
+            names=[c.__name__ for c in classes],
+            work_rate=[c.WORK_RATE for c in classes],
+            mgmt_rate=[c.MGMT_RATE for c in classes],
+            colors=[c.COLOR for c in classes],
+            replacements=replacements,
+            head=classes.index(head))
+
+    def code(self, name):
+        return self.names.index(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class ArrayEngine(object):
+    """A hierarchy held as level ordered arrays that iterates like Engine.
+
+    review_fn(tribute, peer_max, manager_perf) is given the arrays for one
+    layer and returns their new performance; a node is replaced with a
+    random type from the table when a uniform draw exceeds its performance.
+
+    The reviews are exactly those of Engine for the same state, but the
+    replacements are only statistically equivalent, not the same for the
+    same seed: Engine draws in pre-order, a second uniform only for each
+    node replaced, so where a node's draw falls in the stream depends on
+    every review before it. Replaying that takes a step per node, which is
+    what the layer at a time arrays avoid (and replicas have no one Engine
+    run to replay).
+
+    With replicas the engine runs that many independent organisations of the
+    same shape at once: types, tribute and perf are then (replicas, nodes)
+    arrays and every layer operation applies across the replica axis.
+    """
+
+    def __init__(self, table, review_fn, graph_k=3, graph_d=3, seed=None,
+                 replicas=None):
+        """
+        args:
+            table: RateTable describing the node types
+            review_fn: vectorised performance review
+            graph_k: number of children per node (or per layer, see
+                orga.create_hierarchy_graph)
+            graph_d: how many layers the graph should have
+            seed: seed of the engine's random stream (see orga.rng)
+            replicas: number of independent organisations to simulate
+        """
+        self.table = table
+        self.review_fn = review_fn
+        self.rng = rng.Stream(seed)
+        self.replicas = replicas
+
+        parent, offsets = hierarchy_parents(graph_k, graph_d)
+        types = self.table.replacements[self.rng.generator.integers(
+            len(self.table.replacements), size=self._shape(len(parent)))]
+        types[..., 0] = self.table.head
+        self._set_state(parent, offsets, types)
+
+    @classmethod
+    def from_graph(cls, graph, head, table, review_fn, seed=None,
+                   replicas=None):
+        """Copy the structure and state of an object graph (eg Engine.graph).
+
+        Node types are looked up in the table by class name. With replicas
+        every replica starts as a copy of the graph.
+        """
+        order, parent, offsets = level_order(graph, head)
+        types = np.array(
+            [table.code(node.__class__.__name__) for node in order],
+            dtype=np.int64)
+        engine = cls.__new__(cls)
+        engine.table = table
+        engine.review_fn = review_fn
+        engine.rng = rng.Stream(seed)
+        engine.replicas = replicas
+        engine._set_state(
+            parent, offsets, np.broadcast_to(types, engine._shape(len(order))))
+        engine.tribute[:] = [getattr(n, 'tribute', 0) for n in order]
+        engine.perf[:] = [getattr(n, 'perf', 1) for n in order]
+        return engine
+
+    def _shape(self, n):
+        return (n,) if self.replicas is None else (self.replicas, n)
+
+    def _set_state(self, parent, offsets, types):
+        n = len(parent)
+        self.parent = parent
+        self.offsets = offsets
+        self.types = types.astype(np.int16)
+        self.tribute = np.zeros(self._shape(n))
+        self.perf = np.ones(self._shape(n))
+
+        self.n_children = np.bincount(parent[1:], minlength=n)
+        self.is_leaf = self.n_children == 0
+
+        # Per layer (below the head) the start of each sibling run within
+        # the layer and the parent index that run belongs to.
+        self._groups = [None]
+        for d in range(1, len(offsets) - 1):
+            layer_parents = parent[offsets[d]:offsets[d + 1]]
+            starts = np.flatnonzero(np.diff(layer_parents, prepend=-1))
+            self._groups.append((starts, layer_parents[starts]))
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def depth(self):
+        return len(self.offsets) - 1
+
+    @property
+    def head_tribute(self):
+        """Tribute of the head (of every replica)."""
+        if self.replicas is None:
+            return self.tribute[0]
+        return self.tribute[:, 0]
+
+    def __iter__(self):
+        while True:  # Let the caller dictate the duration
+            self.work_cycle()
+            yield None
+            self.feedback_cycle()
+
+    def work_cycle(self):
+        """Aggregate tribute layer by layer from the leaves to the head."""
+        table = self.table
+        child_sum = np.zeros(self.tribute.shape)
+        for d in reversed(range(self.depth)):
+            s, e = self.offsets[d], self.offsets[d + 1]
+            types = self.types[..., s:e]
+            self.tribute[..., s:e] = np.where(
+                self.is_leaf[s:e],
+                table.work_rate[types],
+                table.mgmt_rate[types] * child_sum[..., s:e])
+            if d:
+                starts, parents = self._groups[d]
+                child_sum[..., parents] = np.add.reduceat(
+                    self.tribute[..., s:e], starts, axis=-1)
+
+    def feedback_cycle(self):
+        """Review each layer against its peers from the head to the leaves.
+
+        Each layer's replacements are drawn together from the stream's
+        generator, see the class docstring.
+        """
+        replacements = self.table.replacements
+        generator = self.rng.generator
+        for d in range(1, self.depth):
+            s, e = self.offsets[d], self.offsets[d + 1]
+            starts, _ = self._groups[d]
+            tribute = self.tribute[..., s:e]
+            peer_max = np.maximum.reduceat(tribute, starts, axis=-1)
+            sizes = np.diff(np.append(starts, e - s))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                perf = self.review_fn(
+                    tribute, np.repeat(peer_max, sizes, axis=-1),
+                    self.perf[..., self.parent[s:e]])
+            self.perf[..., s:e] = perf
+
+            replaced = generator.random(self._shape(e - s)) > perf
+            layer = self.types[..., s:e]
+            layer[replaced] = replacements[generator.integers(
+                len(replacements), size=np.count_nonzero(replaced))]
+
+    def type_names(self):
+        """Type name of every node, in level order."""
+        names = np.array(self.table.names, dtype=object)
+        return names[self.types].tolist()
+
+
+def hierarchy_parents(graph_k, graph_d):
+    """Parent indices of a level ordered hierarchy.
+
+    graph_k is as for orga.create_hierarchy_graph. Returns the parent array
+    (-1 for the head) and the offsets at which each layer starts (with the
+    total node count appended).
+    """
+    layers = [np.array([-1], dtype=np.int64)]
+    offsets = [0, 1]
+    for d in range(1, graph_d):
+        counts = orga.fan_out(graph_k, d - 1, offsets[d] - offsets[d - 1])
+        layer = np.repeat(np.arange(offsets[d - 1], offsets[d]), counts)
+        layers.append(layer)
+        offsets.append(offsets[d] + len(layer))
+    return np.concatenate(layers), np.array(offsets, dtype=np.int64)
+
+
+def level_order(graph, head):
+    """Breadth first ordering of a tree.
+
+    Returns the nodes in order, their parent indices and the layer offsets.
+    """
+    order = [head]
+    parent = [-1]
+    offsets = [0]
+    s = 0
+    while s < len(order):
+        offsets.append(len(order))
+        e = len(order)
+        for i in range(s, e):
+            for child in graph.adj[order[i]]:
+                order.append(child)
+                parent.append(i)
+        s = e
+    return order, np.array(parent, dtype=np.int64), np.array(offsets, dtype=np.int64)
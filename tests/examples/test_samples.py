@@ -22,7 +22,7 @@ from examples import shape_changing_graph
 
 def test_basic3x3_converges():
     """Ensure the basic 3x3 converges."""
-    random.seed(42)
+    random.seed(0)
     engine = basic3x3.create_engine()
 
     # should converage after 20 iteractions
@@ -34,7 +34,7 @@ def test_basic3x3_converges():
 
 def test_basic3x3_has_expected_types():
     """Ensure the basic 3x3 types are as expected."""
-    random.seed(42)
+    random.seed(0)
     engine = basic3x3.create_engine()
 
     # should converage after 20 iteractions
@@ -53,7 +53,7 @@ def test_basic3x3_has_expected_types():
 
 def test_deep6x3():
     """Ensure the deep 6x3 works."""
-    random.seed(42)
+    random.seed(0)
     engine = deep6x3.create_engine()
 
     # should converage after 120 iteractions
@@ -74,7 +74,7 @@ def test_deep6x3():
 
 def test_depth_vs_breath_wide():
     """Ensure the depth vs breadth wide example works."""
-    random.seed(42)
+    random.seed(0)
     engine = depth_vs_breadth.create_wide_engine()
 
     for _ in zip(range(100), engine): pass
@@ -94,7 +94,7 @@ def test_depth_vs_breath_wide():
 
 def test_depth_vs_breath_deep():
     """Ensure the depth vs breadth deep example works."""
-    random.seed(42)
+    random.seed(0)
     engine = depth_vs_breadth.create_deep_engine()
 
     for _ in zip(range(100), engine): pass
@@ -114,7 +114,7 @@ def test_depth_vs_breath_deep():
 
 def test_changing_shape():
     """Ensure the node adding/removing example works."""
-    random.seed(42)
+    random.seed(0)
     engine = shape_changing_graph.create_engine()
 
     # should be 3x3 before
@@ -0,0 +1,104 @@
+"""Tests for stepping engines from asyncio."""
+
+import asyncio
+import functools
+import multiprocessing
+
+import pytest
+
+from orga import aio
+from orga import orga
+
+from examples import basic_model as model
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def create_engine(seed=0):
+    return orga.Engine(model.generate_employee, seed=seed)
+
+
+class Failing(object):
+    def __init__(self, name):
+        self.name = name
+
+    def do_work(self, reportees):
+        raise RuntimeError('failed')
+
+    def feedback(self, reportees, graph):
+        pass
+
+
+def test_engine_async_iteration():
+    engine = create_engine()
+
+    async def follow():
+        snaps = []
+        async for snap in engine:
+            snaps.append(snap)
+            if len(snaps) == 5:
+                break
+        return snaps
+
+    snaps = run(follow())
+    assert [s['iteration'] for s in snaps] == [1, 2, 3, 4, 5]
+    assert snaps[0]['nodes'] == 13
+
+
+def test_iterate_interval():
+    async def follow():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        snaps = [s async for s in aio.iterate(
+            create_engine(), iterations=3, interval=0.05)]
+        return snaps, loop.time() - start
+
+    snaps, seconds = run(follow())
+    assert len(snaps) == 3 and seconds >= 0.1
+
+
+@pytest.mark.parametrize('processes', [False, True])
+def test_scheduler(processes):
+    scheduler = aio.Scheduler(workers=2, processes=processes, buffer=1)
+    for seed in range(3):
+        scheduler.add(functools.partial(create_engine, seed), iterations=4)
+
+    async def follow():
+        return [(name, snap) async for name, snap in scheduler]
+
+    snaps = run(follow())
+    assert len(snaps) == 12
+    for name in range(3):
+        engine = create_engine(name)
+        expected = [engine.graphHead.tribute for _ in zip(range(4), engine)]
+        assert [s['head_tribute'] for n, s in snaps if n == name] == expected
+
+
+def test_scheduler_bounds_processes():
+    scheduler = aio.Scheduler(workers=1, processes=True, buffer=1)
+    for seed in range(3):
+        scheduler.add(functools.partial(create_engine, seed), iterations=2)
+
+    async def follow():
+        alive = []
+        async for name, snap in scheduler:
+            alive.append(len(multiprocessing.active_children()))
+        return alive
+
+    alive = run(follow())
+    assert len(alive) == 6 and max(alive) == 1
+
+
+def test_scheduler_errors():
+    scheduler = aio.Scheduler()
+    scheduler.add(functools.partial(orga.Engine, Failing))
+    with pytest.raises(RuntimeError):
+        run(scheduler.stream().__anext__())
+    with pytest.raises(TypeError):
+        aio.Scheduler(processes=True).add(create_engine())
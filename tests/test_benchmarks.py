@@ -0,0 +1,31 @@
+"""Tests for the benchmark suite (on tiny graphs only)."""
+
+import json
+
+from benchmarks import suite
+
+
+def test_run_and_compare():
+    results = suite.run(
+        grid=[(2, 3), (2, 20)], benchmarks=['build', 'cycles', 'layout'],
+        max_nodes=100, repeats=1, min_seconds=0)
+    assert len(results) == 3 * len(suite.MODELS)
+    assert {r['nodes'] for r in results} == {7}
+    assert all(r['seconds'] > 0 for r in results)
+
+    slower = [dict(r, seconds=r['seconds'] / 2) for r in results[:2]]
+    comparisons, regressions = suite.compare(results, slower, noise_floor=0)
+    assert [c['ratio'] for c in comparisons] == [2, 2]
+    assert len(regressions) == 2
+    assert suite.compare(results, results)[1] == []
+
+
+def test_main_writes_results(tmpdir, capsys):
+    output = str(tmpdir.join('bench.json'))
+    argv = ['--max-nodes', '13', '--repeats', '1', '--benchmark', 'layout']
+    assert suite.main(argv + ['--output', output]) == 0
+    with open(output) as f:
+        saved = json.load(f)
+    assert set(saved) == {'environment', 'results'}
+    assert saved['results'][0]['benchmark'] == 'layout'
+    assert 'layout' in capsys.readouterr().out
@@ -0,0 +1,74 @@
+"""Tests for saving and restoring engines."""
+
+import io
+
+import pytest
+
+from orga import checkpoint
+from orga import compact
+from orga import orga
+
+from examples import basic_model as model
+from examples import shape_changing_graph
+
+
+def head_trace(engine, iterations):
+    return [engine.graphHead.tribute for _ in zip(range(iterations), engine)]
+
+
+def saved(engine):
+    f = io.BytesIO()
+    checkpoint.save(engine, f)
+    f.seek(0)
+    return f
+
+
+def test_restored_engine_continues_run():
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=3)
+    head_trace(engine, 10)
+    f = saved(engine)
+    expected = head_trace(engine, 20)
+
+    restored = checkpoint.load(f)
+    assert restored.iteration == 10
+    assert head_trace(restored, 20) == expected
+    assert [n.__class__ for n in restored.graph] == [
+        n.__class__ for n in engine.graph]
+    assert [n.name for n in restored.graph] == [n.name for n in engine.graph]
+
+
+def test_restore_changed_structure():
+    engine = shape_changing_graph.create_engine()
+    for _ in zip(range(15), engine):
+        pass
+    f = saved(engine)
+    restored = checkpoint.load(f)
+    for _ in zip(range(10), engine, restored):
+        assert len(restored.graph) == len(engine.graph)
+    assert ([d for _, _, d in restored.graph.schedule(restored.graphHead).pre_order] ==
+            [d for _, _, d in engine.graph.schedule(engine.graphHead).pre_order])
+
+
+def test_compact_checkpoint():
+    table = model.rate_table()
+    store = compact.NodeStore(table, model.review)
+    engine = orga.Engine(store.new_node, graph_k=3, graph_d=4, seed=2)
+    head_trace(engine, 5)
+    f = saved(engine)
+    expected = head_trace(engine, 10)
+
+    with checkpoint.Checkpoint(f) as saved_run:
+        assert saved_run.iteration == 5 and len(saved_run) == 40
+        with pytest.raises(ValueError):
+            saved_run.engine()
+        restored = saved_run.engine(table=table, review_fn=model.review)
+    assert head_trace(restored, 10) == expected
+    assert restored.graphHead.store.type_names()[0] == 'Ceo'
+
+
+def test_fork():
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=3)
+    head_trace(engine, 10)
+    first, second = checkpoint.Checkpoint(saved(engine)).fork(2)
+    assert first.iteration == second.iteration == 10
+    assert head_trace(first, 30) != head_trace(second, 30)
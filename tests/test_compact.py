@@ -0,0 +1,51 @@
+"""Tests for compact nodes."""
+
+import sys
+
+from orga import compact
+from orga import convergence
+from orga import orga
+
+from examples import basic_model as model
+
+
+def create_engines(seed, criterion=None, **kwargs):
+    """Engines of Employees and of compact nodes, each with its own
+    convergence criterion made by criterion() if given."""
+    store = compact.NodeStore(model.rate_table(), model.review)
+    engines = []
+    for node_gen_fn in (model.generate_employee, store.new_node):
+        if criterion is not None:
+            kwargs['convergence'] = criterion()
+        engines.append(orga.Engine(node_gen_fn, seed=seed, **kwargs))
+    return engines + [store]
+
+
+def test_same_trajectory_as_employees():
+    employees, nodes, store = create_engines(5, graph_k=3, graph_d=4)
+    for _ in zip(range(50), employees, nodes):
+        assert nodes.graphHead.tribute == employees.graphHead.tribute
+
+    assert store.type_names() == [
+        n.__class__.__name__ for n in employees.graph.nodes]
+    assert [n.color() for n in nodes.graph.nodes] == store.colors()
+
+
+def test_type_changes_are_tracked():
+    employees, nodes, store = create_engines(
+        2, graph_k=3, graph_d=4, incremental=True,
+        criterion=lambda: convergence.TypesStable(window=5))
+    assert employees.convergence is not nodes.convergence
+    a = [employees.graphHead.tribute for _ in employees]
+    b = [nodes.graphHead.tribute for _ in nodes]
+    assert a == b
+    assert employees.converged and nodes.converged
+
+
+def test_smaller_than_employees():
+    store = compact.NodeStore(model.rate_table(), model.review)
+    node = store.new_node('a0')
+    employee = model.Red('b0')
+    assert not hasattr(node, '__dict__')
+    assert not hasattr(employee, '__dict__')
+    assert sys.getsizeof(node) <= sys.getsizeof(employee)
@@ -0,0 +1,49 @@
+"""Tests for engine convergence detection."""
+
+from orga import convergence
+from orga import orga
+
+from examples import basic_model as model
+
+
+def create_engine(criterion, stop=True):
+    return orga.Engine(
+        model.generate_employee, graph_k=3, graph_d=4, seed=1,
+        convergence=criterion, stop=stop)
+
+
+def test_types_stable_stops_iteration():
+    engine = create_engine(convergence.TypesStable(window=5))
+    trace = [engine.graphHead.tribute for _ in zip(range(1000), engine)]
+
+    assert engine.converged
+    assert len(trace) == engine.iteration < 1000
+    assert trace[-5:] == [trace[-1]] * 5
+
+
+def test_tribute_stable_window():
+    criterion = convergence.TributeStable(tolerance=0.1, window=3)
+
+    class Head(object):
+        tribute = 0
+
+    class Fake(object):
+        graphHead = Head()
+
+    results = []
+    for value in [1, 5, 5.05, 5.1, 5.0, 9]:
+        Fake.graphHead.tribute = value
+        results.append(criterion.update(Fake))
+    assert results == [False, False, False, True, True, False]
+
+
+def test_signal_without_stopping():
+    engine = create_engine(
+        convergence.AnyOf(
+            convergence.Predicate(lambda e: e.iteration == 7),
+            convergence.TributeStable(window=500)),
+        stop=False)
+    for _ in zip(range(10), engine): pass
+
+    assert engine.converged
+    assert engine.iteration == 10
@@ -0,0 +1,206 @@
+"""Tests for DAG organisations."""
+
+import random
+
+import pytest
+
+from orga import dag
+from orga import nxe
+from orga import orga
+from orga import rng
+
+
+class Node(object):
+    def __init__(self, name=None):
+        self.name = name
+        self.tribute = 0
+        self.work = 0
+        self.reviews = 0
+
+    def do_work(self, reportees):
+        self.work += 1
+        self.tribute = sum(n.tribute for n in reportees) if reportees else 1
+
+    def feedback(self, reportees, graph):
+        for r in reportees:
+            r.reviews += 1
+
+    def __repr__(self):
+        return self.name
+
+
+def matrix_org():
+    """a0 -> b0, b1; b0 and b1 both manage c0..c3."""
+    graph = dag.Dag(orga.create_hierarchy_graph([2, 2], 3, Node))
+    nodes = {n.name: n for n in graph}
+    for c in ('c0', 'c1'):
+        graph.add_edge(nodes['b1'], nodes[c])
+    for c in ('c2', 'c3'):
+        graph.add_edge(nodes['b0'], nodes[c])
+    return graph, nodes
+
+
+def levels_from_scratch(graph):
+    return [set(level) for level in nxe.topological_levels(graph)]
+
+
+def test_every_node_runs_once():
+    graph, nodes = matrix_org()
+    engine = orga.Engine.from_graph(graph, nodes['a0'])
+    for _ in zip(range(3), engine):
+        pass
+    assert {n.work for n in graph} == {3}
+    assert nodes['a0'].tribute == 8  # each leaf counted through both managers
+    assert nodes['c0'].reviews == 2 * 2
+    assert len(graph.schedule()) == len(graph)
+
+
+def test_levels_follow_edge_changes():
+    graph, nodes = matrix_org()
+    d = Node('d')
+    graph.add_edge(nodes['c0'], d)
+    assert graph.level(d) == 3
+    graph.add_edge(d, nodes['c1'])
+    assert graph.level(nodes['c1']) == 4
+    graph.remove_edge(nodes['c0'], d)
+    assert graph.level(d) == 0 and graph.level(nodes['c1']) == 2
+    assert [set(l) for l in graph.levels()] == levels_from_scratch(graph)
+
+
+def test_cycles_are_rejected():
+    graph, nodes = matrix_org()
+    generation = graph.generation
+    with pytest.raises(ValueError):
+        graph.add_edge(nodes['c0'], nodes['a0'])
+    assert not graph.has_edge(nodes['c0'], nodes['a0'])
+    assert graph.level(nodes['a0']) == 0
+    with pytest.raises(ValueError):
+        graph.add_edges_from([(nodes['c1'], nodes['b0'])])
+    assert [set(l) for l in graph.levels()] == levels_from_scratch(graph)
+
+
+def test_remove_keeps_shared_reportees():
+    graph, nodes = matrix_org()
+    extra = Node('extra')
+    graph.add_edge(nodes['c0'], extra)
+    graph.remove_node(nodes['b0'])
+    assert nodes['c0'] in graph and extra in graph
+    graph.remove_node(nodes['b1'])
+    assert len(graph) == 1
+    assert graph.levels() == [[nodes['a0']]]
+
+
+def test_random_changes_match_full_recompute():
+    rand = random.Random(3)
+    graph = dag.Dag(orga.create_hierarchy_graph(3, 4, Node))
+    for _ in range(300):
+        nodes = list(graph)
+        u, v = rand.choice(nodes), rand.choice(nodes)
+        r = rand.random()
+        if r < 0.5:
+            try:
+                graph.add_edge(u, v)
+            except ValueError:
+                pass
+        elif r < 0.8 and graph.has_edge(u, v):
+            graph.remove_edge(u, v)
+        elif r < 0.9 and len(graph) > 10:
+            graph.remove_node(u)
+        else:
+            graph.journal.replace_node(u, Node('new'))
+            graph.journal.apply()
+    assert [set(l) for l in graph.levels()] == levels_from_scratch(graph)
+    for n, _, level in graph.schedule().pre_order:
+        assert all(graph.level(p) < level for p in graph.pred[n])
+
+
+def test_each_level_is_set_once(monkeypatch):
+    # a ladder, each rung managed by the two above it, under a long chain
+    chain = [Node('c{}'.format(i)) for i in range(4)]
+    rungs = [Node('r{}'.format(i)) for i in range(12)]
+    graph = dag.Dag()
+    for a, b in zip(chain, chain[1:] + rungs[:1]):
+        graph.add_edge(a, b)
+    for i, rung in enumerate(rungs[1:], 1):
+        graph.add_edge(rungs[i - 1], rung)
+        if i > 1:
+            graph.add_edge(rungs[i - 2], rung)
+    set_level = graph._set_level
+    moved = []
+    monkeypatch.setattr(graph, '_set_level',
+                        lambda n, l: moved.append(n) or set_level(n, l))
+    graph.remove_edge(chain[-1], rungs[0])
+    assert sorted(moved, key=str) == sorted(rungs, key=str)
+    del moved[:]
+    graph.add_edge(chain[-1], rungs[0])
+    assert sorted(moved, key=str) == sorted(rungs, key=str)
+    assert [set(l) for l in graph.levels()] == levels_from_scratch(graph)
+
+
+def test_work_order_includes_all_managers():
+    graph, nodes = matrix_org()
+    order = graph.work_order([nodes['c0']])
+    assert order[-1] is nodes['a0']
+    assert set(order[1:3]) == {nodes['b0'], nodes['b1']}
+
+
+def test_dag_pos():
+    graph, nodes = matrix_org()
+    pos = nxe.dag_pos(graph)
+    assert pos[nodes['a0']] == (0.5, 0)
+    assert [pos[nodes[c]][1] for c in ('c0', 'c1', 'c2', 'c3')] == (
+        pytest.approx([-0.4] * 4))
+    assert pos[nodes['b0']][0] < pos[nodes['b1']][0]
+
+
+class Churn(Node):
+    """Adds, removes and shares reportees during feedback."""
+    def feedback(self, reportees, graph):
+        graph.graph['visits'].append(self.name)
+        r = rng.random()
+        if r < 0.1:
+            graph.graph['count'] += 1
+            graph.add_edge(self, Churn(str(graph.graph['count'])))
+        elif r < 0.15 and reportees:
+            graph.remove_node(rng.choice(list(reportees)))
+        elif r < 0.25:
+            # deeper nodes are never managers of self, so no cycles
+            deeper = [n for n in graph if graph.level(n) > graph.level(self)
+                      and n not in reportees]
+            if deeper:
+                graph.add_edge(self, rng.choice(deeper))
+        elif r < 0.3 and reportees:
+            graph.remove_edge(self, rng.choice(list(reportees)))
+
+
+def rebuild_patch(schedule, graph, order, i, node, level):
+    """Patching by rebuilding the rest of the schedule, for reference."""
+    visited = {n for n, _, _ in order[:i]}
+    order[i:] = [e for e in graph.schedule().pre_order if e[0] not in visited]
+
+
+def churn_visits(seed):
+    graph = dag.Dag(orga.create_hierarchy_graph(3, 4, Churn))
+    graph.graph.update(visits=[], count=0)
+    engine = orga.Engine.from_graph(graph, seed=seed)
+    cycles = []
+    for _ in zip(range(30), engine):
+        cycles.append(list(graph.graph['visits']))
+        del graph.graph['visits'][:]
+    return cycles
+
+
+def test_patched_schedule_matches_rebuilding(monkeypatch):
+    patches, rebuilds = [], []
+    for name, calls in (('patch', patches), ('_rebuild', rebuilds)):
+        method = getattr(dag.LevelSchedule, name)
+        monkeypatch.setattr(
+            dag.LevelSchedule, name,
+            lambda *args, method=method, calls=calls:
+                calls.append(1) or method(*args))
+    cycles = churn_visits(4)
+    assert [len(set(c)) for c in cycles] == [len(c) for c in cycles]
+    assert len(patches) > 500 and len(rebuilds) < 0.1 * len(patches)
+
+    monkeypatch.setattr(dag.LevelSchedule, 'patch', rebuild_patch)
+    assert churn_visits(4) == cycles
@@ -0,0 +1,80 @@
+"""Tests for rendering runs to files."""
+
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('matplotlib')
+
+from orga import export
+from orga import orga
+
+
+class Node(object):
+    def __init__(self, name=None):
+        self.name = name
+
+    def do_work(self, reportees):
+        pass
+
+    def feedback(self, reportees, graph):
+        pass
+
+    def color(self):
+        return 'b'
+
+    def alpha(self):
+        return 1
+
+
+def test_frames_share_structure():
+    engine = orga.Engine(Node, graph_k=2, graph_d=3)
+    first, second = export.frames(engine, iterations=2)
+    assert first.offsets is second.offsets
+    assert first.facecolors.shape == (7, 4)
+    assert first.segments.shape == (6, 2, 2)
+    assert (first.label, second.label) == ('1', '2')
+    assert engine.iteration == 2
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_export_frames(tmpdir, workers):
+    engine = orga.Engine(Node, graph_k=2, graph_d=3)
+    paths = export.export_frames(
+        engine, str(tmpdir), iterations=3, workers=workers,
+        figsize=(2, 2), dpi=20)
+    assert [os.path.basename(p) for p in paths] == [
+        'frame_00000.png', 'frame_00001.png', 'frame_00002.png']
+    assert all(os.path.getsize(p) for p in paths)
+
+
+def test_export_video_pipes_frames_in_order(tmpdir):
+    path = str(tmpdir.join('frames.raw'))
+    copy = 'import sys; open(sys.argv[1], "wb").write(sys.stdin.buffer.read())'
+    engine = orga.Engine(Node, graph_k=2, graph_d=3)
+    count = export.export_video(
+        engine, path, iterations=3, workers=2, figsize=(2, 1), dpi=20,
+        encoder=[sys.executable, '-c', copy, '{path}'])
+    assert count == 3
+    assert os.path.getsize(path) == 3 * 40 * 20 * 4
+
+
+class Renaming(Node):
+    """Gives the graph a title matplotlib cannot render at its feedback."""
+    def feedback(self, reportees, graph):
+        if graph.name == 'fine':
+            graph.name = r'$\nosuchcommand$'
+
+
+def test_export_video_raises_failed_render(tmpdir):
+    path = str(tmpdir.join('frames.raw'))
+    copy = 'import sys; open(sys.argv[1], "wb").write(sys.stdin.buffer.read())'
+    engine = orga.Engine(Renaming, graph_k=2, graph_d=2)
+    engine.graph.name = 'fine'
+    with pytest.raises(ValueError):
+        export.export_video(
+            engine, path, iterations=3, workers=2, figsize=(2, 1), dpi=20,
+            encoder=[sys.executable, '-c', copy, '{path}'])
+    # only the frame before the feedback
+    assert os.path.getsize(path) == 40 * 20 * 4
@@ -0,0 +1,55 @@
+"""Tests that the simulation core imports quickly, without plotting.
+
+Batch workers (eg orga.sweep) start a fresh interpreter per run, so each
+module is imported in a new process here.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# loaded on first use only: layout and plotting
+LAZY = ['networkx', 'matplotlib', 'scipy', 'orga.nxe', 'orga.orga_plots']
+# generous, a cold import takes ~0.2s (mostly numpy)
+IMPORT_SECONDS = 2.
+
+CHECK = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [m for m in {lazy!r} if m in sys.modules]]))
+'''
+
+
+def cold_import(module):
+    out = subprocess.check_output(
+        [sys.executable, '-c', CHECK.format(module=module, lazy=LAZY)],
+        cwd=ROOT)
+    return json.loads(out.decode())
+
+
+@pytest.mark.parametrize('module', [
+    'orga.orga', 'orga.native', 'orga.checkpoint', 'orga.orgchart',
+    'orga.sweep', 'orga.parallel', 'examples.basic3x3',
+    'examples.shape_changing_graph',
+])
+def test_core_imports_without_plotting(module):
+    seconds, loaded = cold_import(module)
+    assert loaded == []
+    assert seconds < IMPORT_SECONDS
+
+
+def test_tree_loads_networkx_on_first_use():
+    out = subprocess.check_output([sys.executable, '-c', (
+        'import sys\n'
+        'from orga import orga\n'
+        'from examples import basic_model\n'
+        'engine = orga.Engine(basic_model.generate_employee)\n'
+        'print("networkx" in sys.modules, type(engine.graph).__module__)\n'
+    )], cwd=ROOT)
+    assert out.decode().split() == ['True', 'orga.tree']
@@ -0,0 +1,186 @@
+"""Tests for the hierarchy layout and plotting helpers."""
+
+import gc
+import random
+import weakref
+
+import pytest
+
+from orga import dag
+from orga import nxe
+from orga import orga
+from orga import orga_plots
+
+
+class Node(object):
+    def __init__(self, name=None):
+        self.name = name
+
+    def do_work(self, reportees):
+        pass
+
+    def feedback(self, reportees, graph):
+        pass
+
+
+def test_hierarchy_pos():
+    graph = orga.create_hierarchy_graph([2, 1], 3, Node)
+    head, b0, b1, c0, c1 = graph.nodes
+    pos = nxe.hierarchy_pos(graph, head)
+
+    assert pos[head] == (0.5, 0)
+    assert pos[b0] == (0.25, pytest.approx(-0.2))
+    assert pos[b1] == (0.75, pytest.approx(-0.2))
+    assert pos[c1] == (0.75, pytest.approx(-0.4))
+
+
+def test_layout_updates_changed_subtrees():
+    graph = orga.create_hierarchy_graph(3, 4, Node)
+    head = next(iter(graph.nodes))
+    layout = nxe.Layout(graph, head)
+    assert layout.positions() == nxe.hierarchy_pos(graph, head)
+
+    nodes = list(graph.nodes)
+    graph.remove_node(nodes[2])
+    graph.add_edge(nodes[5], Node('new'))
+    graph.add_edge(nodes[6], Node('new'))
+    graph.journal.replace_node(nodes[7], Node('replaced'))
+    graph.journal.apply()
+
+    assert layout.positions() == nxe.hierarchy_pos(graph, head)
+    assert layout.positions() is layout.positions()
+
+
+def test_layout_without_change_log():
+    graph = orga.create_hierarchy_graph(2, 3, Node)
+    graph._log.clear()
+    head = next(iter(graph.nodes))
+    layout = nxe.Layout(graph, head)
+    layout.positions()
+    graph.add_edge(head, Node('new'))
+    graph._log.clear()
+    assert layout.positions() == nxe.hierarchy_pos(graph, head)
+
+
+def test_cached_layouts_are_dropped_with_their_graph():
+    graph = orga.create_hierarchy_graph(2, 3, Node)
+    head = next(iter(graph.nodes))
+    assert nxe.cached_hierarchy_pos(graph, head) == nxe.hierarchy_pos(
+        graph, head)
+    assert graph in nxe._layouts
+    ref = weakref.ref(graph)
+    del graph
+    gc.collect()
+    assert ref() is None
+
+
+def test_jitter_is_bounded():
+    jitter = orga_plots.Jitter(maxsize=10)
+    nodes = [Node() for _ in range(20)]
+    first = jitter(nodes[0])
+    for n in nodes:
+        jitter(n)
+    assert len(jitter) == 10
+    assert jitter(nodes[-1]) == jitter(nodes[-1])
+
+    noisy = orga_plots.add_noise({nodes[0]: (1, 1)}, jitter)
+    assert noisy[nodes[0]] != (1, 1)
+
+
+def test_jitter_leaves_global_random_alone():
+    random.seed(1)
+    expected = random.random()
+    random.seed(1)
+    offsets = [orga_plots.Jitter(seed=2)(Node()) for _ in range(2)]
+    assert random.random() == expected
+    assert offsets[0] == offsets[1]
+
+
+class Coloured(Node):
+    def color(self):
+        return 'b'
+
+    def alpha(self):
+        return 1
+
+
+def test_renderer_reuses_artists():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    engine = orga.Engine(Coloured, graph_k=2, graph_d=3)
+    fig, ax = plt.subplots()
+    renderer = orga_plots.HierarchyRenderer(ax, engine)
+    artists = renderer.draw()
+    assert len(renderer.node_faces.get_offsets()) == 7
+
+    engine.graph.add_edge(engine.graphHead, Coloured('new'))
+    assert renderer.draw(label='1') == artists
+    assert len(renderer.node_faces.get_offsets()) == 8
+    assert len(renderer.edge_lines.get_segments()) == 7
+    assert renderer.label.get_text() == '1'
+    plt.close(fig)
+
+
+def test_animation_steps_engine():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    engine = orga.Engine(Coloured, graph_k=2, graph_d=2)
+    fig, ax = plt.subplots()
+    anim = orga_plots.plot_animation(fig, ax, engine, iterations=3, interval=1)
+    for i in anim.new_frame_seq():
+        anim._draw_next_frame(i, blit=False)
+    assert engine.iteration == 3
+    plt.close(fig)
+
+
+class Growing(Coloured):
+    def feedback(self, reportees, graph):
+        if not reportees:
+            graph.journal.add_edge(self, Growing())
+        graph.name = 'grown'
+
+
+def test_blitted_animation_redraws_when_axes_change():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    engine = orga.Engine(Growing, graph_k=2, graph_d=2)
+    fig, ax = plt.subplots()
+    anim = orga_plots.plot_animation(fig, ax, engine, iterations=3, interval=1)
+    fig.canvas.draw()
+    draws = []
+    fig.canvas.mpl_connect('draw_event', draws.append)
+    for i in anim.new_frame_seq():
+        anim._draw_next_frame(i, blit=True)
+    assert draws
+    assert ax.get_title() == 'grown'
+    nodes = ax.collections[0].get_offsets()
+    assert ax.get_ylim()[0] < nodes[:, 1].min()
+    plt.close(fig)
+
+
+def test_dag_plots_every_node_and_edge():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    graph = dag.Dag(orga.create_hierarchy_graph(2, 3, Coloured))
+    head, b0, b1, c0, c1, c2, c3 = graph.nodes
+    graph.add_edge(b1, c0)  # shared reportee
+    graph.remove_edge(b1, c3)  # c3 has no manager left
+    engine = orga.Engine.from_graph(graph, head)
+
+    fig, ax = plt.subplots()
+    orga_plots.plot_hierarchy(ax, engine)
+    renderer = orga_plots.HierarchyRenderer(ax, engine)
+    renderer.draw()
+    assert len(renderer.node_faces.get_offsets()) == 7
+    assert len(renderer.edge_lines.get_segments()) == 6
+    pos = orga_plots.positions(engine)
+    assert pos[c0][1] < pos[b0][1] and pos[c0][1] < pos[b1][1]
+    plt.close(fig)
@@ -0,0 +1,87 @@
+"""Tests for tributes as sparse linear algebra."""
+
+import numpy as np
+import pytest
+
+from orga import linear
+from orga import orga
+from orga import vector
+
+from examples import basic_model as model
+
+
+def create_operator(graph_k=3, graph_d=4, seed=0, replicas=None):
+    engine = vector.ArrayEngine(
+        model.rate_table(), model.review, graph_k=graph_k, graph_d=graph_d,
+        seed=seed, replicas=replicas)
+    for _ in zip(range(3), engine):
+        pass
+    engine.work_cycle()
+    return engine, linear.TributeOperator.from_array_engine(engine)
+
+
+def test_tributes_match_object_engine():
+    engine = orga.Engine(model.generate_employee, graph_k=4, graph_d=4, seed=1)
+    for _ in zip(range(4), engine):
+        pass
+    orga.work_cycle(engine.graph, engine.graphHead)
+    operator = linear.TributeOperator.from_graph(
+        engine.graph, engine.graphHead, model.rate_table())
+    order, _, _ = vector.level_order(engine.graph, engine.graphHead)
+
+    np.testing.assert_allclose(operator.tributes(), [n.tribute for n in order])
+    assert operator.head_tribute() == pytest.approx(engine.graphHead.tribute)
+
+
+def test_tributes_match_array_engine():
+    engine, operator = create_operator(graph_k=[2, 5, 3], graph_d=4)
+    np.testing.assert_allclose(operator.tributes(), engine.tribute)
+
+
+def test_matrix_solves_tributes():
+    engine, operator = create_operator()
+    n = len(operator)
+    work = np.where(
+        operator.is_leaf, operator.table.work_rate[operator.types], 0)
+    tributes = operator.matrix().dot(operator.tributes()) + work
+    np.testing.assert_allclose(tributes, engine.tribute)
+    assert operator.matrix().shape == (n, n)
+
+
+def test_candidates_in_bulk():
+    engine, operator = create_operator(replicas=5)
+    np.testing.assert_allclose(operator.tributes(engine.types), engine.tribute)
+    heads = operator.head_tribute(engine.types)
+    assert heads.shape == (5,)
+    for types, head in zip(engine.types, heads):
+        assert operator.head_tribute(types) == pytest.approx(head)
+
+
+def test_swap_effects_match_evaluating_each_swap():
+    _, operator = create_operator()
+    effects = operator.swap_effects()
+    assert effects.shape == (len(operator), len(operator.table))
+    for node in [0, 1, 4, 13, len(operator) - 1]:
+        for code in range(len(operator.table)):
+            types = operator.types.copy()
+            types[node] = code
+            assert effects[node, code] == pytest.approx(
+                operator.head_tribute(types))
+
+    nodes = [2, 7, 30]
+    codes = [3, 1, 2]
+    np.testing.assert_allclose(
+        operator.swap(nodes, codes), effects[nodes, codes])
+    with pytest.raises(ValueError):
+        operator.swap_effects(np.stack([operator.types] * 2))
+
+
+def test_influence_is_product_of_managers_rates():
+    _, operator = create_operator()
+    mgmt = operator.table.mgmt_rate[operator.types]
+    for node in [0, 3, 20, len(operator) - 1]:
+        expected, p = 1., operator.parent[node]
+        while p >= 0:
+            expected *= mgmt[p]
+            p = operator.parent[p]
+        assert operator.influence()[node] == pytest.approx(expected)
@@ -0,0 +1,57 @@
+"""Tests for the Monte Carlo runner."""
+
+import random
+
+import numpy as np
+
+from orga import montecarlo
+
+from examples import depth_vs_breadth
+
+
+def test_aggregates_independent_of_workers():
+    runs = [
+        montecarlo.run_samples(
+            depth_vs_breadth.create_wide_engine, 6, 10, workers=workers,
+            seed=3, chunksize=chunksize)
+        for workers, chunksize in ((0, 1), (1, 4), (3, 1))]
+
+    for stats in runs[1:]:
+        np.testing.assert_array_equal(stats.mean, runs[0].mean)
+        np.testing.assert_array_equal(stats.variance, runs[0].variance)
+        np.testing.assert_array_equal(stats.traces, runs[0].traces)
+
+
+def test_caller_random_state_is_kept():
+    random.seed(123)
+    expected = random.random()
+    random.seed(123)
+    montecarlo.run_samples(
+        depth_vs_breadth.create_wide_engine, 2, 3, workers=0, seed=1)
+    assert random.random() == expected
+
+
+def test_trace_stats():
+    traces = np.random.default_rng(0).random((5, 4))
+    stats = montecarlo.TraceStats(5, 4)
+    for trace in traces:
+        stats.add(trace)
+
+    np.testing.assert_allclose(stats.mean, traces.mean(axis=0))
+    np.testing.assert_allclose(stats.variance, traces.var(axis=0, ddof=1))
+    np.testing.assert_allclose(
+        stats.quantiles(0.5), np.median(traces, axis=0))
+
+
+def test_run_replicas():
+    from orga import vector
+    from examples import basic_model as model
+
+    engine = vector.ArrayEngine(
+        model.rate_table(), model.review, graph_k=3, graph_d=3, seed=0,
+        replicas=8)
+    stats = montecarlo.run_replicas(engine, 10)
+
+    assert stats.count == 8
+    assert stats.traces.shape == (8, 10)
+    np.testing.assert_array_equal(stats.traces[:, -1], engine.head_tribute)
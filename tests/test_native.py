@@ -0,0 +1,213 @@
+"""Tests for the array backed tree."""
+
+import io
+import random
+
+import pytest
+
+from orga import checkpoint
+from orga import native
+from orga import orga
+from orga import rng
+from orga import tree
+
+from examples import basic_model as model
+
+
+class Node(object):
+    def __init__(self, name=None):
+        self.name = name
+        self.tribute = 0
+
+    def do_work(self, reportees):
+        self.tribute = 1 + sum(n.tribute for n in reportees)
+
+    def feedback(self, reportees, graph):
+        pass
+
+    def __repr__(self):
+        return 'Node({!r})'.format(self.name)
+
+
+class Churn(Node):
+    """Randomly adds and removes reportees, directly and in the journal."""
+    def feedback(self, reportees, graph):
+        r = rng.random()
+        if r < 0.1:
+            graph.add_edge(self, Churn())
+        elif r < 0.15 and reportees:
+            graph.remove_node(rng.choice(list(reportees)))
+        elif r < 0.2:
+            graph.journal.add_edge(self, Churn())
+        elif r < 0.25 and reportees:
+            graph.journal.replace_node(rng.choice(list(reportees)), Churn())
+
+
+def create_engine(node_gen_fn, graph_cls, graph_k=3, graph_d=4, seed=0,
+                  **kwargs):
+    stream = rng.Stream(seed)
+    with stream.active():
+        graph = orga.create_hierarchy_graph(
+            graph_k, graph_d, node_gen_fn, graph_cls=graph_cls)
+    return orga.Engine.from_graph(graph, seed=stream, **kwargs)
+
+
+def structure(graph, head):
+    return [(n, list(children), d)
+            for n, children, d in graph.schedule(head).pre_order]
+
+
+def test_same_run_as_tree():
+    def trace(graph_cls):
+        engine = create_engine(model.generate_employee, graph_cls, seed=3)
+        return [
+            (engine.graphHead.tribute,
+             [n.__class__ for n, _, _ in
+              engine.graph.schedule(engine.graphHead).pre_order])
+            for _ in zip(range(20), engine)]
+    assert trace(native.NativeTree) == trace(tree.Tree)
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_same_changes_as_tree(incremental):
+    def trace(graph_cls):
+        engine = create_engine(
+            Churn, graph_cls, graph_d=3, seed=4, incremental=incremental)
+        return [(engine.graphHead.tribute, len(engine.graph))
+                for _ in zip(range(30), engine)]
+    expected = trace(tree.Tree)
+    assert trace(native.NativeTree) == expected
+    assert len(set(expected)) > 10
+
+
+def test_schedule_orders():
+    graph = orga.create_hierarchy_graph(
+        [2, 3], 3, Node, graph_cls=native.NativeTree)
+    head = next(iter(graph))
+    expected = tree.Schedule(graph, head)
+    schedule = graph.schedule(head)
+    assert isinstance(schedule, native.NativeSchedule)
+    assert schedule.pre_order == expected.pre_order
+    assert schedule.post_order == expected.post_order
+    assert graph.schedule(head) is schedule
+    graph.add_edge(head, Node('x'))
+    assert graph.schedule(head) is not schedule
+
+
+def test_mutations():
+    graph = native.NativeTree(name='test')
+    a, b, c, d, e = nodes = [Node(n) for n in 'abcde']
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from([(a, b), (a, c), (b, d)])
+    graph.add_edge(c, e)
+    assert graph.name == 'test'
+    assert list(graph.nodes()) == nodes
+    assert graph.adj[a] == (b, c)
+    assert graph.pred[d] == (b,) and graph.pred[a] == ()
+    assert graph.parent(e) is c and graph.parent(a) is None
+    assert sorted(n.name for n in tree.subtree(graph, a)) == list('abcde')
+    assert graph.number_of_edges() == 4
+    assert list(graph.edges()) == [(a, b), (a, c), (b, d), (c, e)]
+
+    with pytest.raises(ValueError):
+        graph.add_edge(a, d)
+    generation = graph.generation
+    graph.add_edge(b, d)  # already there
+    assert graph.adj[b] == (d,)
+
+    x = Node('x')
+    graph.replace_node(b, x)
+    assert graph.adj[a] == (x, c) and graph.parent(d) is x
+    assert graph.changes_since(generation) == {a, x}
+
+    graph.remove_edge(a, x)
+    assert graph.adj[a] == (c,) and graph.parent(x) is None
+    with pytest.raises(KeyError):
+        graph.remove_edge(a, x)
+
+    graph.remove_nodes_from([c])
+    assert c not in graph and graph.parent(e) is None
+    assert graph.adj[a] == ()
+
+    graph.remove_node(x)  # with d below it
+    assert set(graph) == {a, e}
+    y = Node('y')
+    graph.add_edge(a, y)  # reuses a slot
+    assert set(graph) == {a, e, y} and len(graph) == 3
+    assert graph.adj[a] == (y,)
+    assert graph.number_of_edges() == 1
+
+    graph.clear()
+    assert len(graph) == 0 and graph.changes_since(generation) is None
+
+
+def test_random_mutations_match_tree():
+    """Child ranges moved, freed and compacted keep the same structure."""
+    random.seed(5)
+    reference = tree.Tree()
+    graph = native.NativeTree()
+    head = Node('head')
+    for g in (reference, graph):
+        g.add_node(head)
+    names = iter(range(10 ** 6))
+    for _ in range(3000):
+        nodes = list(reference)
+        r = random.random()
+        if r < 0.6:
+            edge = (random.choice(nodes), Node(next(names)))
+            reference.add_edge(*edge)
+            graph.add_edge(*edge)
+        elif r < 0.7:
+            edges = [(random.choice(nodes), Node(next(names)))
+                     for _ in range(random.randrange(1, 20))]
+            reference.add_edges_from(edges)
+            graph.add_edges_from(edges)
+        elif r < 0.95 and len(nodes) > 1:
+            node = random.choice(nodes[1:])
+            reference.remove_node(node)
+            graph.remove_node(node)
+        elif len(nodes) > 1:
+            old, new = random.choice(nodes[1:]), Node(next(names))
+            reference.replace_node(old, new)
+            graph.replace_node(old, new)
+        assert len(graph) == len(reference)
+    assert structure(graph, head) == structure(reference, head)
+    assert graph.number_of_edges() == reference.number_of_edges()
+    assert set(graph.edges()) == set(reference.edges())
+
+
+def test_networkx_conversion():
+    graph = orga.create_hierarchy_graph(
+        3, 3, Node, graph_cls=native.NativeTree)
+    head = next(iter(graph))
+    graph.remove_node(list(graph.adj[head])[0])
+    graph.add_edge(head, Node('x'))
+
+    converted = graph.to_networkx()
+    assert isinstance(converted, tree.Tree)
+    assert converted.name == graph.name
+    assert structure(converted, head) == structure(graph, head)
+
+    back = native.NativeTree.from_networkx(converted)
+    assert structure(back, head) == structure(graph, head)
+
+    dag = tree.Tree()
+    dag.add_edges_from([(1, 3), (2, 3)])
+    with pytest.raises(ValueError):
+        native.NativeTree.from_networkx(dag)
+
+
+def test_checkpoint_restores_native_tree():
+    engine = create_engine(
+        model.generate_employee, native.NativeTree, graph_k=3, graph_d=4)
+    for _ in zip(range(5), engine):
+        pass
+    f = io.BytesIO()
+    checkpoint.save(engine, f)
+    f.seek(0)
+    expected = [engine.graphHead.tribute for _ in zip(range(5), engine)]
+
+    restored = checkpoint.load(f, graph_cls=native.NativeTree)
+    assert isinstance(restored.graph, native.NativeTree)
+    assert [restored.graphHead.tribute
+            for _ in zip(range(5), restored)] == expected
@@ -0,0 +1,183 @@
+"""Tests for the orga engine and its graph."""
+
+import sys
+
+import numpy as np
+
+from orga import orga
+from orga import rng
+from orga import tree
+
+
+class Counter(object):
+    """Counts its calls, tribute is the size of its subtree."""
+
+    def __init__(self, name=None):
+        self.name = name
+        self.tribute = 0
+        self.feedbacks = 0
+
+    def do_work(self, reportees):
+        self.tribute = 1 + sum(n.tribute for n in reportees)
+
+    def feedback(self, reportees, graph):
+        self.feedbacks += 1
+
+
+def chain(length):
+    graph = tree.Tree()
+    nodes = [Counter(i) for i in range(length)]
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(zip(nodes, nodes[1:]))
+    return graph, nodes
+
+
+def test_deep_chain_beyond_recursion_limit():
+    length = 3 * sys.getrecursionlimit()
+    graph, nodes = chain(length)
+
+    orga.work_cycle(graph, nodes[0])
+    orga.feedback_cycle(graph, nodes[0])
+
+    assert nodes[0].tribute == length
+    assert all(n.feedbacks == 1 for n in nodes)
+
+    graph.remove_node(nodes[1])
+    assert list(graph.nodes) == [nodes[0]]
+
+
+def test_schedule_cached_until_mutation():
+    graph, nodes = chain(3)
+    schedule = graph.schedule(nodes[0])
+    assert graph.schedule(nodes[0]) is schedule
+    assert [n for n, _ in schedule.post_order] == nodes[::-1]
+
+    extra = Counter(3)
+    graph.add_edge(nodes[0], extra)
+    assert graph.schedule(nodes[0]) is not schedule
+    orga.work_cycle(graph, nodes[0])
+    assert nodes[0].tribute == 4
+
+
+def test_feedback_sees_subtree_changes():
+    """Children added during feedback get their feedback in the same cycle."""
+    class Grower(Counter):
+        def feedback(self, reportees, graph):
+            super().feedback(reportees, graph)
+            if self.name < 3:
+                child = Grower(self.name + 1)
+                graph.add_edge(self, child)
+
+    graph = tree.Tree()
+    head = Grower(0)
+    graph.add_node(head)
+    orga.feedback_cycle(graph, head)
+
+    assert len(graph) == 4
+    assert all(n.feedbacks == 1 for n in graph.nodes)
+
+
+def test_create_hierarchy_graph_deeper_than_alphabet():
+    graph = orga.create_hierarchy_graph(1, 30, Counter)
+    names = [n.name for n in graph.nodes]
+    assert len(names) == 30
+    assert names[:2] == ['a0', 'b0']
+    assert names[26:28] == ['aa0', 'ab0']
+
+
+def test_create_hierarchy_graph_fan_out():
+    per_layer = orga.create_hierarchy_graph([2, 3], 3, Counter)
+    lazy = orga.create_hierarchy_graph([2, 3], 3, Counter, lazy=True)
+    for graph in (per_layer, lazy):
+        assert [n.name for n in graph.nodes][:4] == ['a0', 'b0', 'b1', 'c0']
+        assert len(graph) == 1 + 2 + 6
+        assert [len(graph.adj[n]) for n in graph.nodes] == [2, 3, 3] + [0] * 6
+
+    ragged = orga.create_hierarchy_graph(
+        lambda d, i: i + 1, 3, Counter, report=True)
+    assert [len(ragged.adj[n]) for n in ragged.nodes][:3] == [1, 1, 0]
+    stats = ragged.graph['build_stats']
+    assert (stats.nodes, stats.edges) == (3, 2)
+
+    # eg from a numpy sweep grid
+    assert len(orga.create_hierarchy_graph(np.int64(3), 3, Counter)) == 13
+    assert len(orga.create_hierarchy_graph(np.array([2, 3]), 3, Counter)) == 9
+
+
+def test_incremental_matches_full_work():
+    from examples import basic_model as model
+
+    def trace(incremental):
+        engine = orga.Engine(
+            model.generate_employee, graph_k=4, graph_d=4, seed=3,
+            incremental=incremental)
+        return [
+            (engine.graphHead.tribute,
+             [n.__class__ for n in engine.graph.nodes])
+            for _ in zip(range(60), engine)]
+
+    assert trace(True) == trace(False)
+
+
+def test_incremental_with_graph_changes():
+    class Churn(Counter):
+        """Randomly adds and removes reportees."""
+        def feedback(self, reportees, graph):
+            r = rng.random()
+            if r < 0.1:
+                graph.add_edge(self, Churn())
+            elif r < 0.15 and reportees:
+                graph.remove_node(rng.choice(list(reportees)))
+
+    def trace(incremental):
+        engine = orga.Engine(Churn, seed=4, incremental=incremental)
+        trace = []
+        for i, _ in zip(range(40), engine):
+            trace.append(engine.graphHead.tribute)
+            if i == 20:  # changes outside of feedback too
+                engine.graph.add_edge(engine.graphHead, Churn())
+        return trace
+
+    expected = trace(False)
+    assert trace(True) == expected
+    assert len(set(expected)) > 1
+
+
+def test_journal_applies_queued_changes():
+    graph = orga.create_hierarchy_graph(2, 3, Counter)
+    head, b0, b1, c0, c1, c2, c3 = graph.nodes
+    new_b0, extra = Counter('B0'), Counter('x')
+
+    graph.journal.replace_node(b0, new_b0)
+    graph.journal.add_edge(b1, extra)
+    graph.journal.remove_node(c1)
+    graph.journal.remove_node(b1)
+    graph.journal.add_edge(c0, Counter('removed before it is added'))
+    generation = graph.generation
+    assert len(graph) == 7
+
+    changes = []
+    assert graph.journal.apply(changes) == 5
+    assert len(graph.journal) == 0
+
+    assert list(graph.adj[head]) == [new_b0]
+    assert list(graph.adj[new_b0]) == [c0]
+    assert list(graph.adj[c0])[0].name == 'removed before it is added'
+    assert len(graph) == 4
+    assert new_b0 in changes and head in changes
+    assert graph.generation > generation
+
+
+def test_journal_replacement_in_engine():
+    class Replacer(Counter):
+        def feedback(self, reportees, graph):
+            super().feedback(reportees, graph)
+            for n in reportees:
+                if n.name == 'c1':
+                    graph.journal.replace_node(n, Counter('C1'))
+
+    engine = orga.Engine(Replacer, graph_k=2, graph_d=3, incremental=True)
+    for _ in zip(range(2), engine): pass
+
+    assert [n.name for n in engine.graph.adj[list(engine.graph.nodes)[1]]] == ['c0', 'C1']
+    assert engine.graphHead.tribute == 7
@@ -0,0 +1,123 @@
+"""Tests for loading and saving org charts."""
+
+import pytest
+
+from orga import dag
+from orga import orga
+from orga import orgchart
+
+from examples import basic_model as model
+
+CLASSES = [model.Ceo, model.Red, model.Gre, model.Blu]
+
+
+def write(path, text):
+    path.write(text)
+    return str(path)
+
+
+class Node(object):
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+
+    def do_work(self, reportees):
+        pass
+
+    def feedback(self, reportees, graph):
+        pass
+
+
+def test_load_with_managers_after_reportees(tmpdir):
+    path = write(tmpdir.join('org.csv'), (
+        'id,manager,dept\n'
+        'c,b,x\n'
+        'a,,y\n'
+        'd,b,x\n'
+        'b,a,z\n'
+        'e,a,y\n'))
+    graph, head = orgchart.load(path, Node, fields=('dept',), chunk_size=2)
+
+    assert head.name == 'a'
+    assert len(graph) == 5
+    children = {n.name: [c.name for c in graph.adj[n]] for n in graph}
+    assert children == {'a': ['b', 'e'], 'b': ['c', 'd'], 'c': [], 'd': [],
+                        'e': []}
+    assert {n.name: n.fields['dept'] for n in graph}['b'] == 'z'
+
+
+@pytest.mark.parametrize('text, error', [
+    ('id,manager\na,\nb,a\nb,a\n', 'duplicate'),
+    ('id,manager\na,\nb,\n', 'second head'),
+    ('id,manager\na,\nb,x\n', 'unknown manager'),
+    ('id,manager\na,b\nb,a\n', 'no head'),
+    ('id,manager\na,\nb,c\nc,b\n', 'cycles'),
+    ('id,boss\na,\n', 'no manager column'),
+    ('', 'empty'),
+])
+def test_invalid_trees(tmpdir, text, error):
+    path = write(tmpdir.join('org.csv'), text)
+    with pytest.raises(ValueError, match=error):
+        orgchart.load(path, Node)
+
+
+def test_blank_and_short_rows(tmpdir):
+    path = write(tmpdir.join('org.csv'), 'id,manager\na,\n\nb,a\n\n')
+    graph, head = orgchart.load(path, Node)
+    assert [n.name for n in graph.adj[head]] == ['b']
+
+    path = write(tmpdir.join('short.csv'), 'id,manager\na,\nb,a\nc\nd,a\n')
+    with pytest.raises(ValueError, match='line 4: 1 columns, not 2'):
+        orgchart.load(path, Node, chunk_size=2)
+
+
+def test_edge_lists(tmpdir):
+    path = write(tmpdir.join('org.tsv'), 'id\tmanager\na\t\nb\ta\n')
+    graph, head = orgchart.load(path, Node, delimiter='\t', graph_cls=dag.Dag)
+    assert isinstance(graph, dag.Dag)
+    assert [n.name for n in graph.adj[head]] == ['b']
+
+
+@pytest.mark.parametrize('name', ['org.csv', 'org.csv.gz'])
+def test_save_and_load_round_trip(tmpdir, name):
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=2)
+    for _ in zip(range(3), engine):
+        pass
+    path = str(tmpdir.join(name))
+    orgchart.save(engine, path)
+
+    graph, head = orgchart.load(
+        path, orgchart.typed(CLASSES), fields=('type',) + orgchart.FIELDS)
+    assert len(graph) == len(engine.graph)
+    assert head.tribute == engine.graphHead.tribute
+
+    def rows(graph, head):
+        return [(n.name, n.__class__, n.tribute, n.perf,
+                 [c.name for c in children])
+                for n, children, _ in graph.schedule(head).pre_order]
+    assert rows(graph, head) == rows(engine.graph, engine.graphHead)
+
+    restored = orga.Engine.from_graph(graph, head, seed=0)
+    next(iter(restored))
+
+
+def test_save_rejects_duplicate_names(tmpdir):
+    engine = orga.Engine(model.generate_employee, graph_k=2, graph_d=2)
+    for node in engine.graph:
+        node.name = 'same'
+    with pytest.raises(ValueError, match='duplicate'):
+        orgchart.save(engine, str(tmpdir.join('org.csv')))
+
+
+def test_save_rejects_dags(tmpdir):
+    graph = dag.Dag(orga.create_hierarchy_graph(2, 3, model.generate_employee))
+    head, b0, b1, c0, c1, c2, c3 = graph.nodes
+    graph.add_edge(b1, c0)
+    engine = orga.Engine.from_graph(graph, head)
+    with pytest.raises(ValueError, match='more than one manager'):
+        orgchart.save(engine, str(tmpdir.join('org.csv')))
+
+    graph.remove_edge(b1, c0)
+    graph.remove_edge(b1, c3)
+    with pytest.raises(ValueError, match='no manager'):
+        orgchart.save(engine, str(tmpdir.join('org.csv')))
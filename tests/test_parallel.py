@@ -0,0 +1,97 @@
+"""Tests for the shared memory parallel engine."""
+
+import pytest
+
+from orga import convergence
+from orga import orga
+from orga import parallel
+
+from examples import basic_model as model
+from examples import shape_changing_graph
+
+CLASSES = [model.Ceo, model.Red, model.Gre, model.Blu]
+
+
+def create_engine(workers, cut_depth=2, seed=3, **kwargs):
+    return parallel.ParallelEngine(
+        model.generate_employee, 4, 5, seed=seed, workers=workers,
+        cut_depth=cut_depth, classes=CLASSES, **kwargs)
+
+
+def run(engine, iterations=8):
+    with engine:
+        return [engine.graphHead.tribute for _ in zip(range(iterations), engine)]
+
+
+def test_same_run_whatever_the_workers():
+    expected = run(create_engine(0))
+    assert run(create_engine(1)) == expected
+    assert run(create_engine(3)) == expected
+    assert run(create_engine(0, seed=4)) != expected
+
+
+def test_shared_state_matches_a_serial_work_cycle():
+    with create_engine(2) as engine:
+        for _ in zip(range(5), engine):
+            pass
+        head = engine.graphHead.tribute
+        engine.sync()
+        assert engine.state['tribute'][0] == head
+        orga.work_cycle(engine.graph, engine.graphHead)
+        assert engine.graphHead.tribute == pytest.approx(head)
+        names = [n.__class__ for n in engine.order]
+        assert [engine.classes[c] for c in engine.types] == names
+
+
+def test_default_cut_depth():
+    engine = parallel.ParallelEngine(
+        model.generate_employee, 3, 5, seed=0, workers=2, classes=CLASSES)
+    with engine:
+        # the first layer with 4 shards per worker
+        assert engine.cut_depth == 2
+        assert len(engine._workers) == 2
+
+
+def test_changes_tracked_for_convergence():
+    engine = create_engine(0, convergence=convergence.TypesStable(window=3))
+    with engine:
+        for _ in zip(range(3), engine):
+            assert all(n in engine.graph for n in engine.changes or ())
+        assert isinstance(engine.changes, list)
+
+
+def test_structure_is_fixed():
+    engine = parallel.ParallelEngine(
+        shape_changing_graph.RandomChildrenModel, 3, 4, seed=0, workers=0,
+        state=())
+    with engine, pytest.raises(RuntimeError):
+        for _ in zip(range(20), engine):
+            pass
+
+
+class Failing(model.Red):
+    __slots__ = ()
+
+    def do_work(self, reportees):
+        raise KeyError('failed')
+
+
+class Other(model.Red):
+    __slots__ = ()
+
+
+def test_worker_errors_are_raised():
+    graph = orga.create_hierarchy_graph(3, 4, model.generate_employee)
+    leaf = list(graph.nodes)[-1]
+    leaf.__class__ = Failing
+    engine = parallel.ParallelEngine.from_graph(graph, workers=1, cut_depth=1)
+    with engine, pytest.raises(KeyError):
+        next(iter(engine))
+
+
+def test_unknown_classes_are_rejected():
+    with create_engine(0, seed=0) as engine:
+        engine.graphHead.__class__ = Other
+        with pytest.raises(ValueError):
+            for _ in zip(range(2), engine):
+                pass
@@ -0,0 +1,63 @@
+"""Tests for recording runs to disk."""
+
+import pytest
+
+from orga import orga
+from orga import recorder
+
+from examples import basic_model as model
+
+
+def test_records_sampled_iterations(tmpdir):
+    path = str(tmpdir.join('runs'))
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=3, seed=1)
+    with recorder.Recorder(path, every=2, chunk_size=3).attach(engine) as rec:
+        tributes = [engine.graphHead.tribute for _ in zip(range(10), engine)]
+    assert engine.observers == [rec]
+
+    pd = pytest.importorskip('pandas')
+    iterations = recorder.read(path)
+    assert list(iterations.iteration) == [2, 4, 6, 8, 10]
+    assert list(iterations.head_tribute) == tributes[1::2]
+    assert set(iterations.nodes) == {13} and set(iterations.depth) == {3}
+
+    layers = recorder.read(path, 'layers')
+    assert list(layers[layers.iteration == 2].nodes) == [1, 3, 9]
+
+    types = recorder.read(path, 'types')
+    assert isinstance(types.type.dtype, pd.CategoricalDtype)
+    assert types.groupby(['iteration', 'layer'])['count'].sum().tolist() == [1, 3, 9] * 5
+    assert list(types[types.layer == 0].type) == ['Ceo'] * 5
+
+
+def test_runs_append_to_store(tmpdir):
+    pytest.importorskip('pandas')
+    path = str(tmpdir)
+    for seed in range(3):
+        engine = orga.Engine(model.generate_employee, seed=seed)
+        observe = {'tribute': recorder.head_tribute}
+        with recorder.Recorder(path, observe=observe, layers=False).attach(engine):
+            for _ in zip(range(4), engine):
+                pass
+
+    iterations = recorder.read(path)
+    assert list(iterations.columns) == ['run', 'iteration', 'tribute']
+    assert iterations.groupby('run').size().tolist() == [4, 4, 4]
+    with pytest.raises(KeyError):
+        recorder.read(path, 'layers')
+
+
+def test_append_after_interrupted_append(tmpdir):
+    store = recorder.ColumnStore(str(tmpdir))
+    store.append('t', [('a', 'i8', [1, 2]), ('b', 'f8', [.1, .2])])
+    # as if interrupted after writing a and part of b
+    with open(store._column_path('t', 'a'), 'ab') as f:
+        f.write(bytes(8))
+    with open(store._column_path('t', 'b'), 'ab') as f:
+        f.write(bytes(3))
+
+    store = recorder.ColumnStore(str(tmpdir))
+    store.append('t', [('a', 'i8', [3]), ('b', 'f8', [.3])])
+    columns = store.columns('t')
+    assert list(columns['a']) == [1, 2, 3]
+    assert list(columns['b']) == [.1, .2, .3]
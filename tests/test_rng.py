@@ -0,0 +1,45 @@
+"""Tests for the engines' random streams."""
+
+import concurrent.futures
+import random
+
+from orga import orga
+from orga import rng
+
+from examples import basic_model as model
+
+
+def run(seed, iterations=30):
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=seed)
+    return [engine.graphHead.tribute for _ in zip(range(iterations), engine)]
+
+
+def test_engines_repeatable_across_threads():
+    expected = [run(seed) for seed in range(4)]
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(run, range(4))) == expected
+
+
+def test_unseeded_stream_follows_global_random():
+    random.seed(3)
+    a = rng.Stream()
+    random.seed(3)
+    b = rng.Stream()
+    assert [a.random() for _ in range(5)] == [b.random() for _ in range(5)]
+
+
+def test_spawned_streams_differ():
+    first, second = rng.Stream(1).spawn(2)
+    assert first.random() != second.random()
+
+
+def test_active_stream():
+    stream = rng.Stream(5)
+    expected = rng.Stream(5)
+    expected.prepare(2)
+    with stream.active():
+        stream.prepare(2)
+        assert rng.active() is stream
+        assert rng.random() == expected.random()
+        assert rng.choice('abc') == 'abc'[int(expected.random() * 3)]
+    assert rng.active() is None
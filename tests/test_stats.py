@@ -0,0 +1,58 @@
+"""Tests for engine instrumentation."""
+
+import pytest
+
+from orga import orga
+
+from examples import basic_model as model
+from examples import shape_changing_graph
+
+
+def test_stats_off_by_default():
+    engine = orga.Engine(model.generate_employee)
+    for _ in zip(range(2), engine):
+        pass
+    assert engine.stats is None
+
+
+def test_counts_calls_and_phases():
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=3, seed=1)
+    stats = engine.start_stats(per_node=True)
+    phases = []
+    stats.on_start.append(lambda phase, e: phases.append(phase))
+    for _ in zip(range(3), engine):
+        pass
+    engine.stop_stats()
+    for _ in zip(range(3), engine):
+        pass
+
+    assert engine.stats is stats
+    assert phases[:5] == ['work', 'observe', 'feedback', 'journal', 'work']
+    assert stats.phases['work'].count == 3
+    assert stats.phases['feedback'].count == 2
+    work_calls = sum(t.count for (_, method), t in stats.calls.items()
+                     if method == 'do_work')
+    assert work_calls == 3 * 13
+    assert stats.calls[('Ceo', 'feedback')].count == 2
+    assert len(stats.hottest(5)) == 5
+    assert 'Ceo.do_work' in stats.report()
+    assert set(stats.as_dict()) == {'phases', 'calls', 'mutations', 'journal'}
+
+
+def test_instrumented_run_is_unchanged():
+    plain = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=2)
+    timed = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=2)
+    timed.start_stats()
+    for _ in zip(range(20), plain, timed):
+        assert plain.graphHead.tribute == timed.graphHead.tribute
+
+
+def test_counts_mutations():
+    engine = shape_changing_graph.create_engine()
+    stats = engine.start_stats()
+    for _ in zip(range(10), engine):
+        pass
+    assert len(stats.mutations) == len(stats.journal) == 9
+    assert sum(stats.journal) > 0 and sum(stats.mutations) > 0
+    with pytest.raises(ValueError):
+        stats.hottest()
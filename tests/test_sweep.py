@@ -0,0 +1,75 @@
+"""Tests for parameter sweeps."""
+
+import pytest
+
+from orga import rng
+from orga import sweep
+
+from examples import basic_model as model
+
+MODEL = 'examples.basic_model:generate_employee'
+
+
+def test_grid():
+    configs = sweep.grid(graph_k=[2, 3], seed=range(2), iterations=5)
+    assert configs == [
+        {'graph_k': 2, 'seed': 0, 'iterations': 5},
+        {'graph_k': 2, 'seed': 1, 'iterations': 5},
+        {'graph_k': 3, 'seed': 0, 'iterations': 5},
+        {'graph_k': 3, 'seed': 1, 'iterations': 5}]
+
+
+def test_simulate_rates():
+    config = {'model': MODEL, 'seed': 1, 'iterations': 5}
+    trace = sweep.simulate(config)
+    assert len(trace) == 5
+    rates = {name: {'WORK_RATE': 2.0 * cls.WORK_RATE}
+             for name, cls in [('Red', model.Red), ('Gre', model.Gre),
+                               ('Blu', model.Blu)]}
+    doubled = sweep.simulate(dict(config, rates=rates))
+    assert doubled == [2 * t for t in trace]
+    assert model.Red.WORK_RATE == 0.1
+
+    with pytest.raises(ValueError, match='no seed'):
+        sweep.simulate({'model': MODEL, 'iterations': 5})
+
+
+calls = []
+
+
+def count_calls(config):
+    calls.append(config)
+    return config['x'] * 2
+
+
+def test_results_are_cached(tmpdir):
+    path = str(tmpdir)
+    configs = sweep.grid(x=[1, 2, 3, 2])
+    assert sweep.Sweep(count_calls, path, workers=0).run(configs) == [2, 4, 6, 4]
+    assert len(calls) == 3
+
+    del calls[:]
+    configs = sweep.grid(x=[1, 2, 3, 4])
+    assert sweep.Sweep(count_calls, path, workers=0).run(configs) == [2, 4, 6, 8]
+    assert calls == [{'x': 4}]
+
+    changed = sweep.Sweep(count_calls, path, modules=[model], workers=0)
+    assert changed.cached({'x': 1}) == (False, None)
+
+
+def test_engine_source_is_in_key(tmpdir, monkeypatch):
+    assert {'orga.orga', 'orga.checkpoint', 'orga.dag'} <= set(sweep.CORE)
+    key = sweep.Sweep(count_calls, str(tmpdir), workers=0).key({'x': 1})
+    monkeypatch.setattr(sweep, 'CORE', sweep.CORE[:-1])
+    assert sweep.Sweep(count_calls, str(tmpdir), workers=0).key({'x': 1}) != key
+    assert sweep.source_hash('orga.rng') == sweep.source_hash(rng)
+
+
+def test_sweep_on_workers(tmpdir):
+    configs = sweep.grid(model=MODEL, seed=[0, 1], iterations=3)
+    seen = []
+    results = sweep.Sweep(sweep.simulate, str(tmpdir), workers=2).run(
+        configs, callback=lambda c, r: seen.append(c))
+    assert results == [sweep.simulate(c) for c in configs]
+    assert len(seen) == 2
+    assert sweep.Sweep(sweep.simulate, str(tmpdir)).cached(configs[0])[0]
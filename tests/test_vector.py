@@ -0,0 +1,106 @@
+"""Tests for the array backed engine."""
+
+import pytest
+import random
+
+import numpy as np
+
+from orga import orga
+from orga import vector
+
+from examples import basic_model as model
+
+
+def create_engine(graph_k, graph_d, seed=42):
+    return vector.ArrayEngine(
+        model.rate_table(), model.review,
+        graph_k=graph_k, graph_d=graph_d, seed=seed)
+
+
+def test_work_cycle_matches_object_engine():
+    """Same types should give exactly the same tributes as Engine."""
+    random.seed(42)
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4)
+    for _ in zip(range(5), engine): pass
+
+    arrays = vector.ArrayEngine.from_graph(
+        engine.graph, engine.graphHead, model.rate_table(), model.review)
+    expected = arrays.tribute.copy()
+    arrays.tribute[:] = 0
+    arrays.work_cycle()
+
+    np.testing.assert_allclose(arrays.tribute, expected)
+    assert arrays.head_tribute == engine.graphHead.tribute
+
+
+def test_reviews_match_object_engine():
+    """The same state gives the same perf, whatever the replacements."""
+    engine = orga.Engine(model.generate_employee, graph_k=3, graph_d=4, seed=3)
+    for _ in zip(range(5), engine): pass
+
+    arrays = vector.ArrayEngine.from_graph(
+        engine.graph, engine.graphHead, model.rate_table(), model.review)
+    order, _, _ = vector.level_order(engine.graph, engine.graphHead)
+    arrays.feedback_cycle()
+    with engine.rng.active():
+        orga.feedback_cycle(engine.graph, engine.graphHead)
+
+    np.testing.assert_allclose(arrays.perf, [n.perf for n in order])
+
+
+def test_basic3x3_converges():
+    """Ensure the array version of basic 3x3 converges like Engine."""
+    engine = create_engine(3, 3, seed=1)
+    for _ in zip(range(20), engine): pass
+
+    assert engine.head_tribute == pytest.approx(9.0, 0.001)
+    names = engine.type_names()
+    assert names[0] == 'Ceo'
+    assert set(names[1:4]) == {'Red'}
+    assert set(names[4:]) == {'Blu'}
+
+
+def test_deep6x3_converges():
+    engine = create_engine(3, 6)
+    for _ in zip(range(120), engine): pass
+
+    assert engine.head_tribute == pytest.approx(243.0, 0.1)
+
+
+def test_seed_repeatability():
+    a = create_engine(4, 5, seed=7)
+    b = create_engine(4, 5, seed=7)
+    for _ in zip(range(10), a, b): pass
+
+    np.testing.assert_array_equal(a.types, b.types)
+    np.testing.assert_array_equal(a.tribute, b.tribute)
+
+
+def test_replicas_independent():
+    engine = vector.ArrayEngine(
+        model.rate_table(), model.review, graph_k=3, graph_d=4, seed=2,
+        replicas=50)
+    assert engine.types.shape == (50, 40)
+    for _ in zip(range(100), engine): pass
+
+    assert engine.head_tribute.shape == (50,)
+    assert len(set(map(bytes, engine.types))) > 1
+    # most replicas converge to red managers and blue workers
+    assert np.median(engine.head_tribute) == pytest.approx(27.0)
+
+
+def test_replicas_match_single_work_cycle():
+    random.seed(0)
+    engine = orga.Engine(model.generate_employee, graph_k=2, graph_d=5)
+    for _ in zip(range(3), engine): pass
+
+    single = vector.ArrayEngine.from_graph(
+        engine.graph, engine.graphHead, model.rate_table(), model.review)
+    batch = vector.ArrayEngine.from_graph(
+        engine.graph, engine.graphHead, model.rate_table(), model.review,
+        replicas=4)
+    single.work_cycle()
+    batch.work_cycle()
+
+    for tribute in batch.tribute:
+        np.testing.assert_array_equal(tribute, single.tribute)